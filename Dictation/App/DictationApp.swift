@@ -11,7 +11,7 @@ struct DictationApp: App {
 
     @Environment(\.scenePhase) private var scenePhase
 
-    @State private var allItems: [DictationItem] = []
+    @State private var isDataReady = false
 
     private let notificationDelegate = NotificationTapDelegate()
 
@@ -23,10 +23,10 @@ struct DictationApp: App {
     var body: some Scene {
         WindowGroup {
             ZStack {
-                if allItems.isEmpty {
+                if !isDataReady {
                     AppColors.background.ignoresSafeArea()
                 } else {
-                    MainTabView(allItems: allItems)
+                    MainTabView()
                 }
 
                 if let card = cardZoomStore.zoomCard {
@@ -48,26 +48,24 @@ struct DictationApp: App {
                 let t0 = Date()
                 AppLogger.debug("[起動] .task 開始")
 
+                // 索引だけを読む（問題はセット単位で必要になったときにデコードする）
                 let t1 = Date()
-                let items = await Task.detached(priority: .userInitiated) {
-                    DictationDataLoader.shared.load()
+                let questionCount = await Task.detached(priority: .userInitiated) {
+                    DictationDataLoader.shared.loadIndex()
                 }.value
-                AppLogger.debug("[起動] データ読み込み完了: \(String(format: "%.3f", Date().timeIntervalSince(t1)))s (\(items.count)問)")
+                AppLogger.debug("[起動] 索引読み込み完了: \(String(format: "%.3f", Date().timeIntervalSince(t1)))s (\(questionCount)問)")
+                isDataReady = questionCount > 0
 
                 let t2 = Date()
-                allItems = items
-                AppLogger.debug("[起動] allItems セット完了: \(String(format: "%.3f", Date().timeIntervalSince(t2)))s")
-
-                let t3 = Date()
                 async let notificationSetup: Void = {
                     await NotificationManager.requestAuthorization()
-                    if let item = items.randomElement() {
+                    if let item = DictationDataLoader.shared.randomItem() {
                         await NotificationManager.scheduleDailyPractice(item: item)
                     }
                 }()
                 async let productLoad: Void = iapManager.loadProducts()
                 _ = await (notificationSetup, productLoad)
-                AppLogger.debug("[起動] 通知+IAP並列完了: \(String(format: "%.3f", Date().timeIntervalSince(t3)))s")
+                AppLogger.debug("[起動] 通知+IAP並列完了: \(String(format: "%.3f", Date().timeIntervalSince(t2)))s")
 
                 AppLogger.debug("[起動] .task 全体: \(String(format: "%.3f", Date().timeIntervalSince(t0)))s")
             }
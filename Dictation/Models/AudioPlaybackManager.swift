@@ -1,10 +1,69 @@
 import AVFoundation
 import Combine
 
+// MARK: - AudioPack
+
+/// dictation_audio.pack（"DCAU" | version | ヘッダー長 | {"files": {名前: [offset, length]}} | 本体）。
+/// メモリマップして、再生する 1 問分だけを切り出す。知らない version なら使わず、個別の MP3 を読む
+private final class AudioPack {
+    /// tools/build_audio.py の AUDIO_PACK_VERSION と一致させる
+    static let supportedVersion: UInt32 = 1
+
+    static let shared: AudioPack? = {
+        guard let url = Bundle.main.url(forResource: "dictation_audio", withExtension: "pack", subdirectory: "Assets/Audio") else {
+            return nil
+        }
+        do {
+            return try AudioPack(url: url)
+        } catch {
+            AppLogger.warning("[AudioPlayback] dictation_audio.pack: 読み込みエラー: \(error)")
+            return nil
+        }
+    }()
+
+    private struct Header: Decodable {
+        let version: Int
+        let files: [String: [Int]]
+    }
+
+    private enum PackError: Error {
+        case invalidHeader
+        case unsupportedVersion(UInt32)
+    }
+
+    private let data: Data
+    private let bodyStart: Int
+    private let files: [String: [Int]]
+
+    private init(url: URL) throws {
+        data = try Data(contentsOf: url, options: .alwaysMapped)
+        guard data.count >= 12, data.prefix(4) == Data("DCAU".utf8) else {
+            throw PackError.invalidHeader
+        }
+        let version = data.withUnsafeBytes {
+            UInt32(littleEndian: $0.loadUnaligned(fromByteOffset: 4, as: UInt32.self))
+        }
+        guard version == Self.supportedVersion else { throw PackError.unsupportedVersion(version) }
+        let headerLength = data.withUnsafeBytes {
+            Int(UInt32(littleEndian: $0.loadUnaligned(fromByteOffset: 8, as: UInt32.self)))
+        }
+        guard 12 + headerLength <= data.count else { throw PackError.invalidHeader }
+        bodyStart = 12 + headerLength
+        files = try JSONDecoder().decode(Header.self, from: data.subdata(in: 12..<bodyStart)).files
+    }
+
+    func data(for name: String) -> Data? {
+        guard let range = files[name], range.count == 2 else { return nil }
+        let start = bodyStart + range[0]
+        guard range[0] >= 0, start + range[1] <= data.count else { return nil }
+        return data.subdata(in: start..<(start + range[1]))
+    }
+}
+
 // MARK: - AudioPlaybackManager
 
 /// ディクテーション音声の再生管理。
-/// バンドルMP3がある場合はそれを再生、なければ AVSpeechSynthesizer でTTSフォールバック。
+/// 音声パック → バンドルMP3 の順に探して再生、どちらもなければ AVSpeechSynthesizer でTTSフォールバック。
 @MainActor
 final class AudioPlaybackManager: NSObject, ObservableObject {
 
@@ -48,6 +107,22 @@ final class AudioPlaybackManager: NSObject, ObservableObject {
         let name = (audioFile as NSString).deletingPathExtension
         let ext = (audioFile as NSString).pathExtension.isEmpty ? "mp3" : (audioFile as NSString).pathExtension
 
+        // 音声パック（tools/build_audio.py --pack）があれば、そこから切り出す
+        if let data = AudioPack.shared?.data(for: audioFile) {
+            do {
+                let player = try AVAudioPlayer(data: data, fileTypeHint: AVFileType.mp3.rawValue)
+                player.enableRate = true
+                player.delegate = self
+                player.prepareToPlay()
+                self.audioPlayer = player
+                self.duration = player.duration
+                AppLogger.debug("[AudioPlayback] パックから読み込み成功: \(audioFile)")
+                return
+            } catch {
+                AppLogger.warning("[AudioPlayback] パック音声の再生準備エラー: \(error)")
+            }
+        }
+
         if let url = Bundle.main.url(forResource: name, withExtension: ext, subdirectory: "Assets/Audio/Dictation") {
             do {
                 let player = try AVAudioPlayer(contentsOf: url)
@@ -1,6 +1,6 @@
 import Foundation
 
-// MARK: - Level JSON 構造体
+// MARK: - Level JSON 構造体（コンテンツパックがないときのフォールバック）
 
 private struct LevelJSON: Decodable {
     let level: String
@@ -20,22 +20,303 @@ private struct LevelQuestionJSON: Decodable {
     let explanation: String
 }
 
+// MARK: - コンテンツパック構造体（tools/build_content_pack.py が生成）
+
+private struct PackHeader: Decodable {
+    let version: Int
+    let questionsPerSet: Int
+    let strings: [String]
+    let levels: [PackLevel]
+}
+
+private struct PackLevel: Decodable {
+    let level: String
+    let count: Int
+    let sets: [PackSetEntry]
+}
+
+/// [setIndex, offset, length, count]
+private struct PackSetEntry: Decodable {
+    let setIndex: Int
+    let offset: Int
+    let length: Int
+    let count: Int
+
+    init(from decoder: Decoder) throws {
+        var c = try decoder.unkeyedContainer()
+        setIndex = try c.decode(Int.self)
+        offset = try c.decode(Int.self)
+        length = try c.decode(Int.self)
+        count = try c.decode(Int.self)
+    }
+}
+
+/// 文字列テーブルの番号、または文字列そのもの
+private enum PackString: Decodable {
+    case ref(Int)
+    case inline(String)
+
+    init(from decoder: Decoder) throws {
+        let c = try decoder.singleValueContainer()
+        if let index = try? c.decode(Int.self) {
+            self = .ref(index)
+        } else {
+            self = .inline(try c.decode(String.self))
+        }
+    }
+
+    func resolve(_ strings: [String]) -> String {
+        switch self {
+        case .ref(let index): return strings.indices.contains(index) ? strings[index] : ""
+        case .inline(let value): return value
+        }
+    }
+}
+
+/// [id, question_text, answer_text, blanks, japanese, pattern, explanation]
+private struct PackQuestion: Decodable {
+    let id: Int
+    let questionText: String
+    let answerText: String
+    let blanks: [String]
+    let japanese: String
+    let pattern: PackString
+    let explanation: PackString
+
+    init(from decoder: Decoder) throws {
+        var c = try decoder.unkeyedContainer()
+        id = try c.decode(Int.self)
+        questionText = try c.decode(String.self)
+        answerText = try c.decode(String.self)
+        blanks = try c.decode([String].self)
+        japanese = try c.decode(String.self)
+        pattern = try c.decode(PackString.self)
+        explanation = try c.decode(PackString.self)
+    }
+}
+
+private enum ContentPackError: Error {
+    case invalidHeader
+    case unsupportedVersion(Int)
+    case setOutOfRange(String, Int)
+}
+
+// MARK: - ContentPack
+
+/// dictation.pack をメモリマップし、索引だけ先に読む。セット本体は要求されたときにデコードする
+private final class ContentPack {
+    static let magic = Data("DCPK".utf8)
+    static let supportedVersion = 1
+
+    private let data: Data
+    private let bodyStart: Int
+    let header: PackHeader
+    private let entries: [String: [Int: PackSetEntry]]
+
+    init(url: URL) throws {
+        data = try Data(contentsOf: url, options: .alwaysMapped)
+        guard data.count >= 12, data.prefix(4) == Self.magic else {
+            throw ContentPackError.invalidHeader
+        }
+        let (version, headerLength) = data.withUnsafeBytes { raw in
+            (Int(UInt32(littleEndian: raw.loadUnaligned(fromByteOffset: 4, as: UInt32.self))),
+             Int(UInt32(littleEndian: raw.loadUnaligned(fromByteOffset: 8, as: UInt32.self))))
+        }
+        guard version == Self.supportedVersion else {
+            throw ContentPackError.unsupportedVersion(version)
+        }
+        guard 12 + headerLength <= data.count else {
+            throw ContentPackError.invalidHeader
+        }
+        bodyStart = 12 + headerLength
+        header = try JSONDecoder().decode(PackHeader.self, from: data.subdata(in: 12..<bodyStart))
+        entries = Dictionary(uniqueKeysWithValues: header.levels.map { level in
+            (level.level, Dictionary(uniqueKeysWithValues: level.sets.map { ($0.setIndex, $0) }))
+        })
+    }
+
+    func setIndices(level: String) -> [Int] {
+        header.levels.first(where: { $0.level == level })?.sets.map(\.setIndex) ?? []
+    }
+
+    func items(level: String, setIndex: Int) throws -> [DictationItem] {
+        guard let entry = entries[level]?[setIndex] else { return [] }
+        let start = bodyStart + entry.offset
+        guard entry.offset >= 0, start + entry.length <= data.count else {
+            throw ContentPackError.setOutOfRange(level, setIndex)
+        }
+        let questions = try JSONDecoder().decode([PackQuestion].self, from: data.subdata(in: start..<(start + entry.length)))
+        return questions.map { q in
+            DictationItem(
+                id: "\(level)_\(q.id)",
+                level: level,
+                setIndex: setIndex,
+                questionText: q.questionText,
+                answerText: q.answerText,
+                blanks: q.blanks,
+                japanese: q.japanese,
+                pattern: q.pattern.resolve(header.strings),
+                explanation: q.explanation.resolve(header.strings),
+                audioFile: "\(level)_\(String(format: "%03d", q.id)).mp3"
+            )
+        }
+    }
+}
+
 // MARK: - DictationDataLoader
 
 final class DictationDataLoader {
     static let shared = DictationDataLoader()
     private init() {}
 
-    private var cachedItems: [DictationItem]?
+    private struct SetKey: Hashable {
+        let level: String
+        let setIndex: Int
+    }
 
-    func load() -> [DictationItem] {
-        if let cached = cachedItems { return cached }
+    /// loadIndex() は起動時にバックグラウンドから、それ以外はメインから呼ばれる
+    private let lock = NSLock()
+    private var cachedSets: [SetKey: [DictationItem]] = [:]
+    private var questionCounts: [String: Int]?
+    private var packLoaded = false
+    private var pack: ContentPack?
 
-        let levelFiles = AppConfig.levelFiles
+    /// 起動時に呼ぶ。パックがあれば索引（ヘッダー）だけを読み、セット本体はデコードしない。全問題数を返す
+    @discardableResult
+    func loadIndex() -> Int {
+        lock.lock()
+        defer { lock.unlock() }
+        return indexLocked().values.reduce(0, +)
+    }
+
+    /// レベルの問題数（索引から。問題はデコードしない）
+    func questionCount(level: String) -> Int {
+        lock.lock()
+        defer { lock.unlock() }
+        return indexLocked()[level] ?? 0
+    }
+
+    /// 1 セット分の問題。パックがあれば索引から該当セットだけをデコードする
+    func items(level: String, setIndex: Int) -> [DictationItem] {
+        lock.lock()
+        defer { lock.unlock() }
+        return itemsLocked(SetKey(level: level, setIndex: setIndex))
+    }
+
+    /// レベルの全問題（テストモード）。そのレベルのセットだけをデコードする
+    func items(level: String) -> [DictationItem] {
+        lock.lock()
+        defer { lock.unlock() }
+        return setIndicesLocked(level: level).flatMap { itemsLocked(SetKey(level: level, setIndex: $0)) }
+    }
+
+    /// ID（"level1_12"）の問題。その問題を含むセットだけをデコードする
+    func item(id: String) -> DictationItem? {
+        lock.lock()
+        defer { lock.unlock() }
+        return itemLocked(id: id)
+    }
+
+    /// 復習モード用。ID を含むセットだけをデコードする
+    func items(ids: Set<String>) -> [DictationItem] {
+        lock.lock()
+        defer { lock.unlock() }
+        return ids.compactMap { itemLocked(id: $0) }
+    }
 
+    /// ランダムな 1 問（通知用）。ランダムに選んだ 1 セットだけをデコードする
+    func randomItem() -> DictationItem? {
+        lock.lock()
+        defer { lock.unlock() }
+        let keys = AppConfig.levelFiles.flatMap { level in
+            setIndicesLocked(level: level).map { SetKey(level: level, setIndex: $0) }
+        }
+        guard let key = keys.randomElement() else { return nil }
+        return itemsLocked(key).randomElement()
+    }
+
+    /// サブレベル一覧（AppConfig.subLevels から静的に生成）
+    func levels(from items: [DictationItem]) -> [Level] {
+        Level.allLevels()
+    }
+
+    // MARK: - Private
+
+    /// lock を持った状態で呼ぶ。パックがなければここでレベルJSONを全件読み、全セットをキャッシュする
+    private func indexLocked() -> [String: Int] {
+        if let counts = questionCounts { return counts }
+
+        let counts: [String: Int]
+        if let pack = openPack() {
+            counts = Dictionary(pack.header.levels.map { ($0.level, $0.count) }, uniquingKeysWith: +)
+        } else {
+            let allItems = loadLevelJSONs()
+            cachedSets = Dictionary(grouping: allItems) { SetKey(level: $0.level, setIndex: $0.setIndex) }
+            counts = Dictionary(grouping: allItems, by: \.level).mapValues(\.count)
+        }
+        questionCounts = counts
+        return counts
+    }
+
+    /// lock を持った状態で呼ぶ
+    private func setIndicesLocked(level: String) -> [Int] {
+        _ = indexLocked()
+        if let pack {
+            return pack.setIndices(level: level)
+        }
+        return cachedSets.keys.filter { $0.level == level }.map(\.setIndex).sorted()
+    }
+
+    /// lock を持った状態で呼ぶ
+    private func itemsLocked(_ key: SetKey) -> [DictationItem] {
+        _ = indexLocked()
+        if let cached = cachedSets[key] { return cached }
+        guard let pack else { return [] }
+        do {
+            let items = try pack.items(level: key.level, setIndex: key.setIndex)
+            cachedSets[key] = items
+            return items
+        } catch {
+            AppLogger.warning("[DictationDataLoader] \(key.level) セット\(key.setIndex): デコードエラー: \(error)")
+            return []
+        }
+    }
+
+    /// lock を持った状態で呼ぶ。セット番号は ID の問題番号から（パック・レベルJSON とも同じ規則）
+    private func itemLocked(id: String) -> DictationItem? {
+        guard let separator = id.lastIndex(of: "_"),
+              let number = Int(id[id.index(after: separator)...]), number > 0 else { return nil }
+        let key = SetKey(level: String(id[..<separator]), setIndex: (number - 1) / AppConstants.questionsPerSet + 1)
+        return itemsLocked(key).first { $0.id == id }
+    }
+
+    /// lock を持った状態で呼ぶ。開けなければ以降は元 JSON を読む
+    private func openPack() -> ContentPack? {
+        if packLoaded { return pack }
+        packLoaded = true
+
+        guard let url = Bundle.main.url(forResource: "dictation", withExtension: "pack", subdirectory: "Assets/Dictation") else {
+            AppLogger.warning("[DictationDataLoader] dictation.pack: URLが見つからない（レベルJSONを読む）")
+            return nil
+        }
+        do {
+            let opened = try ContentPack(url: url)
+            guard opened.header.questionsPerSet == AppConstants.questionsPerSet else {
+                AppLogger.warning("[DictationDataLoader] dictation.pack: questionsPerSet が一致しない（レベルJSONを読む）")
+                return nil
+            }
+            pack = opened
+            AppLogger.info("[DictationDataLoader] dictation.pack: 索引読み込み完了（\(opened.header.levels.count) レベル）")
+        } catch {
+            AppLogger.warning("[DictationDataLoader] dictation.pack: 読み込みエラー: \(error)（レベルJSONを読む）")
+        }
+        return pack
+    }
+
+    private func loadLevelJSONs() -> [DictationItem] {
         var allItems: [DictationItem] = []
 
-        for filename in levelFiles {
+        for filename in AppConfig.levelFiles {
             guard let url = Bundle.main.url(forResource: filename, withExtension: "json", subdirectory: "Assets/Dictation") else {
                 AppLogger.warning("[DictationDataLoader] \(filename).json: URLが見つからない")
                 continue
@@ -72,12 +353,6 @@ final class DictationDataLoader {
             }
         }
 
-        cachedItems = allItems
         return allItems
     }
-
-    /// サブレベル一覧（AppConfig.subLevels から静的に生成）
-    func levels(from items: [DictationItem]) -> [Level] {
-        Level.allLevels()
-    }
 }
@@ -33,6 +33,9 @@ final class DictationViewModel: ObservableObject {
     // MARK: - Private
 
     private var items: [DictationItem] = []
+
+    /// このセッションの問題（結果画面の一覧用）
+    var sessionItems: [DictationItem] { items }
     private var mode: DictationMode = .exam(level: "level1")
     private let progressStore: UserProgressStore
 
@@ -44,9 +47,9 @@ final class DictationViewModel: ObservableObject {
 
     // MARK: - Session setup
 
-    func start(mode: DictationMode, allItems: [DictationItem]) {
+    func start(mode: DictationMode) {
         self.mode = mode
-        self.items = buildItemList(mode: mode, allItems: allItems)
+        self.items = buildItemList(mode: mode)
         self.currentIndex = 0
         self.correctCount = 0
         self.sessionResults = []
@@ -66,28 +69,27 @@ final class DictationViewModel: ObservableObject {
         // テストモードはタイマーなし
     }
 
-    private func buildItemList(mode: DictationMode, allItems: [DictationItem]) -> [DictationItem] {
+    /// 問題はセット単位の索引から引く（必要なセットだけをデコードする）
+    private func buildItemList(mode: DictationMode) -> [DictationItem] {
+        let loader = DictationDataLoader.shared
         switch mode {
         case .practice(let level, let setIndex):
-            return allItems
-                .filter { $0.level == level && $0.setIndex == setIndex }
+            return loader.items(level: level, setIndex: setIndex)
                 .shuffled()
         case .review:
-            let wrongIDs = progressStore.progress.wrongItemIDs
-            return allItems
-                .filter { wrongIDs.contains($0.id) }
+            return loader.items(ids: progressStore.progress.wrongItemIDs)
                 .shuffled()
         case .exam(let level):
             return Array(
-                allItems.filter { $0.level == level }
+                loader.items(level: level)
                     .shuffled()
                     .prefix(AppConstants.examQuestionCount)
             )
         case .daily(let itemId):
-            if let item = allItems.first(where: { $0.id == itemId }) {
+            if let item = loader.item(id: itemId) {
                 return [item]
             }
-            return allItems.randomElement().map { [$0] } ?? []
+            return loader.randomItem().map { [$0] } ?? []
         }
     }
 
@@ -1,12 +1,30 @@
 import SwiftUI
 
+// MARK: - CardImageVariant
+
+/// tools/build_card_images.py が生成する派生サイズ。なければ原寸を読む
+enum CardImageVariant {
+    case thumbnail   // コレクション一覧（幅 512px）
+    case display     // ガチャ画面（幅 768px）
+    case original    // 拡大表示
+
+    var subdirectory: String? {
+        switch self {
+        case .thumbnail: return "thumb"
+        case .display:   return "display"
+        case .original:  return nil
+        }
+    }
+}
+
 // MARK: - CardImageView
 
 struct CardImageView: View {
     let filename: String
+    var variant: CardImageVariant = .original
 
     var body: some View {
-        if let uiImage = Self.loadImage(filename: filename) {
+        if let uiImage = Self.loadImage(filename: filename, variant: variant) {
             Image(uiImage: uiImage)
                 .resizable()
                 .scaledToFill()
@@ -17,11 +35,36 @@ struct CardImageView: View {
         }
     }
 
-    static func loadImage(filename: String) -> UIImage? {
+    /// デコード済み画像のキャッシュ（スクロールのたびに JPEG をデコードし直さない）。上限はピクセルのバイト数
+    private static let cache: NSCache<NSString, UIImage> = {
+        let cache = NSCache<NSString, UIImage>()
+        cache.totalCostLimit = 64 * 1024 * 1024
+        return cache
+    }()
+
+    private static func store(_ image: UIImage, forKey key: NSString) -> UIImage {
+        let pixels = image.size.width * image.scale * image.size.height * image.scale
+        cache.setObject(image, forKey: key, cost: Int(pixels) * 4)
+        return image
+    }
+
+    static func loadImage(filename: String, variant: CardImageVariant = .original) -> UIImage? {
+        let key = "\(variant.subdirectory ?? "original")/\(filename)" as NSString
+        if let cached = cache.object(forKey: key) {
+            return cached
+        }
+
         let dir = (Bundle.main.bundlePath as NSString).appendingPathComponent("Assets/Cards")
+        if let subdirectory = variant.subdirectory {
+            let path = ((dir as NSString).appendingPathComponent(subdirectory) as NSString).appendingPathComponent(filename)
+            if let image = UIImage(contentsOfFile: path) {
+                return store(image, forKey: key)
+            }
+        }
+
         let path = (dir as NSString).appendingPathComponent(filename)
         if let image = UIImage(contentsOfFile: path) {
-            return image
+            return store(image, forKey: key)
         }
 
         // フォールバック: forResource で検索
@@ -30,7 +73,7 @@ struct CardImageView: View {
         let ext  = ns.pathExtension
         if let url = Bundle.main.url(forResource: name, withExtension: ext, subdirectory: "Assets/Cards"),
            let image = UIImage(contentsOfFile: url.path) {
-            return image
+            return store(image, forKey: key)
         }
 
         AppLogger.warning("[CardImage] NOT FOUND in bundle: \(filename)")
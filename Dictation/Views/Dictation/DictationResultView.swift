@@ -6,7 +6,7 @@ struct DictationResultView: View {
     let correctCount: Int
     let totalCount: Int
     let results: [DictationResult]
-    let allItems: [DictationItem]
+    let items: [DictationItem]
     let isExamMode: Bool
     let onDismiss: () -> Void
 
@@ -80,7 +80,7 @@ struct DictationResultView: View {
         .navigationBarTitleDisplayMode(.inline)
         .navigationBarBackButtonHidden(true)
         .fullScreenCover(isPresented: $showGacha) {
-            CardGachaScreen(cardCount: gachaCardCount, sourceLevel: allItems.first?.level ?? "level1") {
+            CardGachaScreen(cardCount: gachaCardCount, sourceLevel: items.first?.level ?? "level1") {
                 showGacha = false
                 onDismiss()
             }
@@ -191,7 +191,7 @@ struct DictationResultView: View {
 
             ForEach(results.indices, id: \.self) { idx in
                 let result = results[idx]
-                if let item = allItems.first(where: { $0.id == result.itemID }) {
+                if let item = items.first(where: { $0.id == result.itemID }) {
                     DictationResultRowView(index: idx + 1, item: item, result: result)
                 }
             }
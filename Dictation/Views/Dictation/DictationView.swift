@@ -4,7 +4,6 @@ import SwiftUI
 
 struct DictationView: View {
     let mode: DictationMode
-    let allItems: [DictationItem]
 
     @Environment(\.dismiss) private var dismiss
 
@@ -40,14 +39,14 @@ struct DictationView: View {
                     correctCount: vm.correctCount,
                     totalCount: vm.totalCount,
                     results: vm.sessionResults,
-                    allItems: allItems,
+                    items: vm.sessionItems,
                     isExamMode: vm.isExamMode,
                     onDismiss: { showResult = false }
                 )
             }
         }
         .onAppear {
-            vm.start(mode: mode, allItems: allItems)
+            vm.start(mode: mode)
         }
     }
 
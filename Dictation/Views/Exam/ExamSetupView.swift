@@ -12,8 +12,6 @@ private struct ExamOption: Identifiable {
 // MARK: - ExamSetupView
 
 struct ExamSetupView: View {
-    let allItems: [DictationItem]
-
     @EnvironmentObject var iapManager: IAPManager
     @EnvironmentObject var ownedStore: OwnedCardsStore
     @State private var showCollection = false
@@ -44,7 +42,7 @@ struct ExamSetupView: View {
 
             VStack(spacing: 12) {
                 ForEach(examOptions) { opt in
-                    let questionCount = allItems.filter { $0.level == opt.id }.count
+                    let questionCount = DictationDataLoader.shared.questionCount(level: opt.id)
 
                     if iapManager.isPurchased {
                         NavigationLink(value: DictationDestination(mode: .exam(level: opt.id))) {
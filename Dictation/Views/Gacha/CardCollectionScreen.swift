@@ -89,7 +89,7 @@ struct CardCollectionScreen: View {
             let w = geo.size.width
             let h = w / cardAspect
 
-            CardImageView(filename: card.filename)
+            CardImageView(filename: card.filename, variant: .thumbnail)
                 .frame(width: w, height: h)
                 .clipShape(RoundedRectangle(cornerRadius: 10))
                 .shadow(color: .black.opacity(0.18), radius: 6, x: 0, y: 3)
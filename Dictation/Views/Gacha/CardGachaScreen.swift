@@ -106,7 +106,7 @@ struct CardGachaScreen: View {
             let cardW = min(byWidth, byHeight)
             let cardH = cardW / aspect
 
-            CardImageView(filename: card.filename)
+            CardImageView(filename: card.filename, variant: .display)
                 .frame(width: cardW, height: cardH)
                 .clipShape(RoundedRectangle(cornerRadius: 16))
                 .shadow(color: .black.opacity(0.30), radius: 20, x: 0, y: 10)
@@ -67,8 +67,6 @@ struct DictationDestination: Hashable {
 // MARK: - MainTabView
 
 struct MainTabView: View {
-    let allItems: [DictationItem]
-
     @EnvironmentObject var progressStore: UserProgressStore
     @EnvironmentObject var iapManager: IAPManager
     @EnvironmentObject var appState: AppState
@@ -119,31 +117,28 @@ struct MainTabView: View {
         ZStack {
             if selectedTab == .practice {
                 NavigationStack(path: $practicePath) {
-                    LevelListView(allItems: allItems)
+                    LevelListView()
                         .navigationDestination(for: LevelDestination.self) { dest in
-                            SetIndexView(
-                                level: dest.level,
-                                allItems: allItems
-                            )
+                            SetIndexView(level: dest.level)
                         }
                         .navigationDestination(for: DictationDestination.self) { dest in
-                            DictationView(mode: dest.mode, allItems: allItems)
+                            DictationView(mode: dest.mode)
                         }
                 }
                 .id(resetTokens[.practice])
             } else if selectedTab == .review {
                 NavigationStack(path: $reviewPath) {
-                    ReviewListView(allItems: allItems)
+                    ReviewListView()
                         .navigationDestination(for: DictationDestination.self) { dest in
-                            DictationView(mode: dest.mode, allItems: allItems)
+                            DictationView(mode: dest.mode)
                         }
                 }
                 .id(resetTokens[.review])
             } else {
                 NavigationStack(path: $examPath) {
-                    ExamSetupView(allItems: allItems)
+                    ExamSetupView()
                         .navigationDestination(for: DictationDestination.self) { dest in
-                            DictationView(mode: dest.mode, allItems: allItems)
+                            DictationView(mode: dest.mode)
                         }
                 }
                 .id(resetTokens[.exam])
@@ -161,7 +156,7 @@ struct MainTabView: View {
         .fullScreenCover(isPresented: $showDailyPractice) {
             if let itemId = dailyItemId {
                 NavigationStack {
-                    DictationView(mode: .daily(itemId: itemId), allItems: allItems)
+                    DictationView(mode: .daily(itemId: itemId))
                 }
             }
         }
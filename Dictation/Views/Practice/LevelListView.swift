@@ -3,8 +3,6 @@ import SwiftUI
 // MARK: - LevelListView
 
 struct LevelListView: View {
-    let allItems: [DictationItem]
-
     @EnvironmentObject var progressStore: UserProgressStore
 
     private var levels: [Level] {
@@ -4,7 +4,6 @@ import SwiftUI
 
 struct SetIndexView: View {
     let level: Level
-    let allItems: [DictationItem]
 
     @EnvironmentObject var progressStore: UserProgressStore
     @EnvironmentObject var iapManager: IAPManager
@@ -3,8 +3,6 @@ import SwiftUI
 // MARK: - ReviewListView
 
 struct ReviewListView: View {
-    let allItems: [DictationItem]
-
     @EnvironmentObject var progressStore: UserProgressStore
     @State private var showResetConfirm = false
 
@@ -47,7 +47,7 @@ struct DebugMenuView: View {
 
                 Button {
                     Task {
-                        if let item = DictationDataLoader.shared.load().randomElement() {
+                        if let item = DictationDataLoader.shared.randomItem() {
                             let center = UNUserNotificationCenter.current()
                             let content = UNMutableNotificationContent()
                             content.title = AppConfig.notificationTestTitle
@@ -25,7 +25,7 @@ struct SettingsView: View {
                     Task {
                         if enabled {
                             await NotificationManager.requestAuthorization()
-                            if let item = DictationDataLoader.shared.load().randomElement() {
+                            if let item = DictationDataLoader.shared.randomItem() {
                                 await NotificationManager.scheduleDailyPractice(item: item)
                             }
                         } else {
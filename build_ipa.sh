@@ -18,6 +18,13 @@ EXPORT_OPTIONS_PLIST="./build/config/ExportOptions_Distribution.plist"
 # Create output directory
 mkdir -p build/output
 
+# 生成物（コミットしない）はアーカイブの前に作り直す。フォルダ参照の Assets がそのままバンドルに入る
+echo "Step 0: Preparing assets..."
+python3 tools/build_card_images.py
+# 再エンコードした音声を Assets/Audio/dictation_audio.pack に詰める（個別の MP3 はバンドルから外れる）
+python3 tools/build_audio.py --encode --pack
+echo ""
+
 echo "Step 1: Archiving project..."
 xcodebuild archive \
     -scheme "$SCHEME" \
@@ -73,6 +80,11 @@ if [ -f "$EXPORT_PATH/Dictation.ipa" ]; then
     echo "IPA successfully created! ($IPA_SIZE)"
     echo ""
     echo "Location: $EXPORT_PATH/Dictation.ipa"
+    echo ""
+
+    # カテゴリ別のサイズ・ベースラインとの差分。上限を超えたらここで失敗する
+    echo "Size report:"
+    python3 tools/ipa_size_report.py "$EXPORT_PATH/Dictation.ipa" --record
 else
     echo "IPA file not found!"
     exit 1
@@ -0,0 +1,587 @@
+#!/usr/bin/env python3
+"""App Store Connect API スタブサーバー
+
+register_app.py が使うエンドポイントをメモリ上で再現するローカルサーバー。
+Apple に接続せずに登録フロー全体（スクリーンショットの Reserve / PUT / Commit を含む）
+を実行・計測するために使う。
+
+Usage:
+    python3 store/asc_stub_server.py --port 8765
+    python3 store/asc_stub_server.py --port 8765 --latency-ms 80 --fail-rate 0.02 --rate-limit-rate 0.05
+
+    ASC_BASE_URL=http://127.0.0.1:8765 ASC_TOKEN=stub \\
+        python3 store/register_app.py store/dictation.json
+
+管理用エンドポイント:
+    GET  /__stats   リクエスト数・エンドポイント別件数
+    POST /__reset   状態と統計をクリア
+"""
+
+import base64
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Screenshot のパート分割サイズ（複数パートのアップロードを再現する）
+UPLOAD_PART_SIZE = 1024 * 1024
+
+# 1 時間あたりのリクエスト上限（X-Rate-Limit ヘッダで通知）
+HOURLY_QUOTA = 3600
+
+# (親リソース type, 関連名) → (子リソース type, 子から親への relationship 名, to-one か)
+CHILD_ROUTES = {
+    ("apps", "appInfos"): ("appInfos", "app", False),
+    ("apps", "appStoreVersions"): ("appStoreVersions", "app", False),
+    ("apps", "inAppPurchasesV2"): ("inAppPurchases", "app", False),
+    ("appInfos", "appInfoLocalizations"): ("appInfoLocalizations", "appInfo", False),
+    ("appStoreVersions", "appStoreVersionLocalizations"): (
+        "appStoreVersionLocalizations", "appStoreVersion", False),
+    ("appStoreVersions", "appStoreReviewDetail"): (
+        "appStoreReviewDetails", "appStoreVersion", True),
+    ("inAppPurchases", "inAppPurchaseLocalizations"): (
+        "inAppPurchaseLocalizations", "inAppPurchaseV2", False),
+    ("inAppPurchases", "iapPriceSchedule"): (
+        "inAppPurchasePriceSchedules", "inAppPurchase", True),
+    ("inAppPurchasePriceSchedules", "manualPrices"): (
+        "inAppPurchasePrices", "inAppPurchasePriceSchedule", False),
+    ("appStoreVersionLocalizations", "appScreenshotSets"): (
+        "appScreenshotSets", "appStoreVersionLocalization", False),
+    ("appScreenshotSets", "appScreenshots"): ("appScreenshots", "appScreenshotSet", False),
+}
+
+# 作成時の既定属性
+DEFAULT_ATTRIBUTES = {
+    "appStoreVersions": {"appStoreState": "PREPARE_FOR_SUBMISSION"},
+    "inAppPurchases": {"state": "MISSING_METADATA"},
+}
+
+# URL パスの ID 部分をテンプレート化する（統計用）
+_ID_SEGMENT = re.compile(r"/(?=[^/]*\d)[A-Za-z0-9_=\-]{6,}(?=/|$)")
+
+
+def path_template(path):
+    return _ID_SEGMENT.sub("/{id}", path)
+
+
+def _png_size(data):
+    """PNG の IHDR から (width, height) を返す。PNG でなければ None"""
+    if len(data) < 24 or data[:8] != b"\x89PNG\r\n\x1a\n":
+        return None
+    return int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+
+
+# ─────────────────────────────────────────────
+# メモリ上のリソースストア
+# ─────────────────────────────────────────────
+class Store:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.resources = {}  # type -> {id: resource}
+        self.uploads = {}  # screenshot_id -> {part_index: bytes}
+        self.next_id = 1
+
+    def new_id(self, type_):
+        value = f"{type_[:3]}{self.next_id:06d}"
+        self.next_id += 1
+        return value
+
+    def table(self, type_):
+        return self.resources.setdefault(type_, {})
+
+    def create(self, type_, attributes=None, relationships=None):
+        rid = self.new_id(type_)
+        resource = {
+            "type": type_,
+            "id": rid,
+            "attributes": {**DEFAULT_ATTRIBUTES.get(type_, {}), **(attributes or {})},
+            "relationships": relationships or {},
+        }
+        self.table(type_)[rid] = resource
+        return resource
+
+    def children(self, child_type, parent_rel, parent_id):
+        result = []
+        for res in self.table(child_type).values():
+            ref = res["relationships"].get(parent_rel, {}).get("data") or {}
+            if ref.get("id") == parent_id:
+                result.append(res)
+        if child_type == "appScreenshots" and parent_id in self.table("appScreenshotSets"):
+            # スクリーンショットはセットの表示順（include でも一覧でも同じ順に返す）
+            order = self.table("appScreenshotSets")[parent_id]["attributes"].get("_order", [])
+            result.sort(key=lambda r: order.index(r["id"]) if r["id"] in order else len(order))
+        return result
+
+    def delete(self, type_, rid):
+        return self.table(type_).pop(rid, None) is not None
+
+
+def _rel_id(relationships, name):
+    return ((relationships or {}).get(name) or {}).get("data", {}).get("id")
+
+
+def _price_points(iap_id, territory):
+    """IAP ごとの価格ポイント一覧（ID は IAP・地域・ティアを埋め込んだ不透明値）"""
+    prices = list(range(0, 1000, 10)) + list(range(1000, 10000, 100)) + \
+        list(range(10000, 100001, 1000))
+    points = []
+    for tier, price in enumerate(prices):
+        raw = json.dumps({"s": iap_id, "t": territory, "p": str(10000 + tier)},
+                         separators=(",", ":"))
+        points.append({
+            "type": "inAppPurchasePricePoints",
+            "id": base64.urlsafe_b64encode(raw.encode()).decode().rstrip("="),
+            "attributes": {
+                "customerPrice": f"{price}.0" if territory == "JPN" else f"{price / 100:.2f}",
+                "proceeds": f"{price * 0.7:.1f}",
+            },
+        })
+    return points
+
+
+# ─────────────────────────────────────────────
+# リクエストハンドラ
+# ─────────────────────────────────────────────
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "ASCStub/1.0"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    # --- 共通 ---
+    def _send(self, status, body=None, extra_headers=None):
+        data = b"" if body is None else json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        if body is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        remaining = max(0, HOURLY_QUOTA - self.server.stats["requests"])
+        self.send_header("X-Rate-Limit", f"user-hour-lim:{HOURLY_QUOTA};user-hour-rem:{remaining};")
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, detail):
+        self._send(status, {"errors": [{"status": str(status), "detail": detail}]})
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _dispatch(self, method):
+        server = self.server
+        parts = urlsplit(self.path)
+        path = parts.path
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        body = self._read_body()
+
+        if path.startswith("/__"):
+            return self._admin(method, path)
+
+        template = path_template(path)
+        with server.stats_lock:
+            server.stats["requests"] += 1
+            key = f"{method} {template}"
+            server.stats["endpoints"][key] = server.stats["endpoints"].get(key, 0) + 1
+            server.stats["bytesIn"] += len(body)
+
+        if server.latency:
+            time.sleep(server.latency * (0.5 + server.rng.random()))
+        if server.rate_limit_rate and not path.startswith("/upload/") and \
+                server.rng.random() < server.rate_limit_rate:
+            with server.stats_lock:
+                server.stats["injected429"] += 1
+            return self._send(429, {"errors": [{"status": "429", "detail": "rate limited"}]},
+                              {"Retry-After": "1"})
+        if server.fail_rate and server.rng.random() < server.fail_rate:
+            with server.stats_lock:
+                server.stats["injected5xx"] += 1
+            return self._error(503, "injected failure")
+
+        if not path.startswith("/upload/") and not self.headers.get("Authorization"):
+            return self._error(401, "missing token")
+
+        payload = json.loads(body) if body and path.startswith("/v") else None
+        try:
+            with server.store.lock:
+                return self._route(method, path, query, payload, body)
+        except (KeyError, ValueError, TypeError) as e:
+            return self._error(400, f"bad request: {e!r}")
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    # --- 管理用 ---
+    def _admin(self, method, path):
+        if path == "/__stats":
+            with self.server.stats_lock:
+                return self._send(200, self.server.stats)
+        if path == "/__reset" and method == "POST":
+            with self.server.store.lock:
+                self.server.store.reset()
+            with self.server.stats_lock:
+                self.server.reset_stats()
+            return self._send(204)
+        return self._error(404, "unknown admin path")
+
+    # --- ルーティング ---
+    def _route(self, method, path, query, payload, raw):
+        store = self.server.store
+        segs = [s for s in path.split("/") if s]
+
+        if segs[0] == "upload" and method == "PUT":
+            return self._upload_part(segs[1], int(segs[2]), raw)
+
+        segs = segs[1:]  # "v1" / "v2" を除去
+
+        # /vN/<type>
+        if len(segs) == 1:
+            type_ = segs[0]
+            if method == "GET":
+                return self._list(list(store.table(type_).values()), query)
+            if method == "POST":
+                return self._create(type_, payload)
+
+        # /vN/<type>/<id>
+        if len(segs) == 2:
+            type_, rid = segs
+            resource = store.table(type_).get(rid)
+            if resource is None:
+                return self._error(404, f"{type_}/{rid} not found")
+            if method == "GET":
+                return self._send(200, self._document(resource, query))
+            if method == "PATCH":
+                return self._update(resource, payload)
+            if method == "DELETE":
+                store.delete(type_, rid)
+                if type_ == "appScreenshots":
+                    for shot_set in store.table("appScreenshotSets").values():
+                        order = shot_set["attributes"].get("_order", [])
+                        if rid in order:
+                            order.remove(rid)
+                return self._send(204)
+
+        # /vN/<type>/<id>/relationships/<rel>
+        if len(segs) == 4 and segs[2] == "relationships" and method == "PATCH":
+            return self._reorder(segs[0], segs[1], segs[3], payload)
+
+        # /vN/<type>/<id>/<rel>
+        if len(segs) == 3 and method == "GET":
+            type_, rid, rel = segs
+            if store.table(type_).get(rid) is None:
+                return self._error(404, f"{type_}/{rid} not found")
+            if (type_, rel) == ("inAppPurchases", "pricePoints"):
+                territory = query.get("filter[territory]", "JPN")
+                return self._list(_price_points(rid, territory), query)
+            route = CHILD_ROUTES.get((type_, rel))
+            if route is None:
+                return self._error(404, f"unknown relationship {rel}")
+            child_type, parent_rel, to_one = route
+            children = store.children(child_type, parent_rel, rid)
+            if to_one:
+                if not children:
+                    if child_type == "inAppPurchasePriceSchedules":
+                        return self._error(404, "no price schedule")
+                    return self._send(200, {"data": None})
+                return self._send(200, self._document(children[0], query))
+            return self._list(children, query)
+
+        return self._error(404, f"unknown path {path}")
+
+    # --- 表現 ---
+    def _serialize(self, resource, query):
+        fields = query.get(f"fields[{resource['type']}]")
+        attrs = {k: v for k, v in resource["attributes"].items() if not k.startswith("_")}
+        if fields:
+            wanted = set(fields.split(","))
+            attrs = {k: v for k, v in attrs.items() if k in wanted}
+        return {
+            "type": resource["type"],
+            "id": resource["id"],
+            "attributes": attrs,
+            "relationships": {
+                name: {"data": rel.get("data")} for name, rel in resource["relationships"].items()
+            },
+        }
+
+    def _included_children(self, resource, query):
+        """include= で指定された関連ごとに (関連名, 子リソース, to-one か) を返す（limit[関連名] を適用）"""
+        store = self.server.store
+        for rel in filter(None, query.get("include", "").split(",")):
+            route = CHILD_ROUTES.get((resource["type"], rel))
+            if route is None:
+                # 子ルートでない to-one 関連（価格 → 価格ポイントなど）は参照先がストアにあれば載せる
+                ref = (resource["relationships"].get(rel) or {}).get("data")
+                target = store.table(ref["type"]).get(ref["id"]) if isinstance(ref, dict) else None
+                if target is not None:
+                    yield rel, [target], 1, True
+                continue
+            child_type, parent_rel, to_one = route
+            children = store.children(child_type, parent_rel, resource["id"])
+            limit = 1 if to_one else min(int(query.get(f"limit[{rel}]", 10)), 50)
+            yield rel, children, limit, to_one
+
+    def _with_relationships(self, serialized, resource, query):
+        """include した関連の参照（と件数）を親リソースの relationships に載せる"""
+        for rel, children, limit, to_one in self._included_children(resource, query):
+            refs = [{"type": c["type"], "id": c["id"]} for c in children[:limit]]
+            if to_one:
+                serialized["relationships"][rel] = {"data": refs[0] if refs else None}
+            else:
+                serialized["relationships"][rel] = {
+                    "data": refs,
+                    "meta": {"paging": {"total": len(children), "limit": limit}},
+                }
+        return serialized
+
+    def _included(self, resources, query):
+        included = []
+        for resource in resources:
+            for _, children, limit, _ in self._included_children(resource, query):
+                included.extend(self._serialize(child, query) for child in children[:limit])
+        return included
+
+    def _document(self, resource, query):
+        doc = {"data": self._with_relationships(self._serialize(resource, query), resource, query)}
+        included = self._included([resource], query)
+        if included:
+            doc["included"] = included
+        return doc
+
+    def _list(self, resources, query):
+        for key, value in query.items():
+            m = re.fullmatch(r"filter\[(\w+)\]", key)
+            if not m or m.group(1) == "territory":
+                continue
+            accepted = set(value.split(","))
+            resources = [r for r in resources
+                         if str(r.get("attributes", {}).get(m.group(1))) in accepted]
+        limit = min(int(query.get("limit", 50)), 200)
+        offset = int(query.get("cursor", 0))
+        page = resources[offset:offset + limit]
+        doc = {
+            "data": [
+                self._with_relationships(self._serialize(r, query), r, query)
+                if "relationships" in r else r
+                for r in page
+            ],
+            "links": {"self": self.path},
+            "meta": {"paging": {"total": len(resources), "limit": limit}},
+        }
+        stored = [r for r in page if "relationships" in r]
+        included = self._included(stored, query)
+        if included:
+            doc["included"] = included
+        if offset + limit < len(resources):
+            parts = urlsplit(self.path)
+            params = dict(query, cursor=str(offset + limit))
+            qs = "&".join(f"{k}={v}" for k, v in params.items())
+            doc["links"]["next"] = f"{self.server.base_url}{parts.path}?{qs}"
+        return self._send(200, doc)
+
+    # --- 作成・更新 ---
+    def _create(self, type_, payload):
+        store = self.server.store
+        data = payload["data"]
+        attrs = dict(data.get("attributes") or {})
+        rels = data.get("relationships") or {}
+
+        if type_ == "apps" and store.children("apps", "bundleId", _rel_id(rels, "bundleId")):
+            return self._error(409, "app already exists for bundleId")
+        if type_ in ("appInfoLocalizations", "appStoreVersionLocalizations",
+                     "inAppPurchaseLocalizations"):
+            parent_rel = next(iter(rels))
+            siblings = store.children(type_, parent_rel, _rel_id(rels, parent_rel))
+            if any(s["attributes"].get("locale") == attrs.get("locale") for s in siblings):
+                return self._error(409, "locale already exists")
+
+        if type_ == "appScreenshots":
+            set_id = _rel_id(rels, "appScreenshotSet")
+            if set_id not in store.table("appScreenshotSets"):
+                return self._error(404, "screenshot set not found")
+            attrs.setdefault("assetDeliveryState", {"state": "AWAITING_UPLOAD"})
+
+        resource = store.create(type_, attrs, rels)
+
+        if type_ == "inAppPurchasePriceSchedules":
+            self._create_manual_prices(resource, payload.get("included") or [])
+        if type_ == "apps":
+            store.create("appInfos", {"state": "PREPARE_FOR_SUBMISSION"},
+                         {"app": {"data": {"type": "apps", "id": resource["id"]}}})
+        if type_ == "appScreenshots":
+            resource["attributes"]["uploadOperations"] = self._upload_operations(
+                resource["id"], int(attrs.get("fileSize", 0)))
+            shot_set = store.table("appScreenshotSets")[_rel_id(rels, "appScreenshotSet")]
+            shot_set["attributes"].setdefault("_order", []).append(resource["id"])
+        return self._send(201, {"data": self._serialize(resource, {})})
+
+    def _create_manual_prices(self, schedule, included):
+        """価格スケジュールと一緒に送られた inAppPurchasePrices（"${price1}" などの仮 ID）を保存する"""
+        store = self.server.store
+        iap_id = _rel_id(schedule["relationships"], "inAppPurchase")
+        refs = []
+        for item in included:
+            if item.get("type") != "inAppPurchasePrices":
+                continue
+            point_id = _rel_id(item.get("relationships"), "inAppPurchasePricePoint")
+            padded = point_id + "=" * (-len(point_id) % 4)
+            territory = json.loads(base64.urlsafe_b64decode(padded))["t"]
+            point = next(p for p in _price_points(iap_id, territory) if p["id"] == point_id)
+            store.table(point["type"])[point_id] = {**point, "relationships": {}}
+            price = store.create("inAppPurchasePrices", item.get("attributes"), {
+                "inAppPurchasePriceSchedule": {
+                    "data": {"type": "inAppPurchasePriceSchedules", "id": schedule["id"]}},
+                "inAppPurchasePricePoint": {
+                    "data": {"type": "inAppPurchasePricePoints", "id": point_id}},
+                "territory": {"data": {"type": "territories", "id": territory}},
+            })
+            refs.append({"type": price["type"], "id": price["id"]})
+        schedule["relationships"]["manualPrices"] = {"data": refs}
+
+    def _update(self, resource, payload):
+        attrs = (payload.get("data") or {}).get("attributes") or {}
+        rels = (payload.get("data") or {}).get("relationships") or {}
+        resource["attributes"].update(attrs)
+        resource["relationships"].update(rels)
+        if resource["type"] == "appScreenshots" and attrs.get("uploaded"):
+            self._commit_screenshot(resource)
+        return self._send(200, {"data": self._serialize(resource, {})})
+
+    def _reorder(self, type_, rid, rel, payload):
+        store = self.server.store
+        resource = store.table(type_).get(rid)
+        if resource is None:
+            return self._error(404, f"{type_}/{rid} not found")
+        ids = [item["id"] for item in payload["data"]]
+        if type_ == "appScreenshotSets" and rel == "appScreenshots":
+            current = {r["id"] for r in store.children("appScreenshots", "appScreenshotSet", rid)}
+            if set(ids) != current:
+                return self._error(409, "reorder must list every screenshot in the set")
+            resource["attributes"]["_order"] = ids
+        return self._send(204)
+
+    # --- スクリーンショット ---
+    def _upload_operations(self, screenshot_id, filesize):
+        ops = []
+        for index, offset in enumerate(range(0, max(filesize, 1), UPLOAD_PART_SIZE)):
+            length = min(UPLOAD_PART_SIZE, filesize - offset)
+            ops.append({
+                "method": "PUT",
+                "url": f"{self.server.upload_base_url}/upload/{screenshot_id}/{index}",
+                "offset": offset,
+                "length": length,
+                "requestHeaders": [{"name": "Content-Type", "value": "image/png"}],
+            })
+        self.server.store.uploads[screenshot_id] = {}
+        return ops
+
+    def _upload_part(self, screenshot_id, index, raw):
+        store = self.server.store
+        if screenshot_id not in store.uploads:
+            return self._error(404, "unknown upload")
+        store.uploads[screenshot_id][index] = raw
+        return self._send(200)
+
+    def _commit_screenshot(self, resource):
+        parts = self.server.store.uploads.pop(resource["id"], {})
+        data = b"".join(parts[i] for i in sorted(parts))
+        attrs = resource["attributes"]
+        errors = []
+        if len(data) != int(attrs.get("fileSize", -1)):
+            errors.append("size mismatch")
+        if hashlib.md5(data).hexdigest() != attrs.get("sourceFileChecksum"):
+            errors.append("checksum mismatch")
+        if _png_size(data) is None:
+            errors.append("not a PNG")
+        attrs.pop("uploadOperations", None)
+        attrs["assetDeliveryState"] = {
+            "state": "FAILED" if errors else "COMPLETE",
+            "errors": [{"code": "IMAGE_INCORRECT", "description": e} for e in errors],
+        }
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=0, fail_rate=0.0, rate_limit_rate=0.0,
+                 seed=0, verbose=False):
+        super().__init__(address, StubHandler)
+        self.store = Store()
+        self.latency = latency_ms / 1000.0
+        self.fail_rate = fail_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rng = random.Random(seed)
+        self.verbose = verbose
+        self.stats_lock = threading.Lock()
+        self.reset_stats()
+        host, port = self.server_address[:2]
+        self.base_url = f"http://127.0.0.1:{port}"
+        # アップロード先は別ホスト名にして、API とは別の接続プールを使わせる
+        self.upload_base_url = f"http://localhost:{port}"
+
+    def reset_stats(self):
+        self.stats = {"requests": 0, "endpoints": {}, "bytesIn": 0,
+                      "injected429": 0, "injected5xx": 0}
+
+
+def start_server(port=0, **kwargs):
+    """バックグラウンドスレッドでサーバーを起動して返す"""
+    server = StubServer(("127.0.0.1", port), **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def option_value(name, default=None):
+    """`--name VALUE` 形式のオプション値を返す"""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+def main():
+    port = int(option_value("--port", 8765))
+    server = StubServer(
+        ("127.0.0.1", port),
+        latency_ms=float(option_value("--latency-ms", 0)),
+        fail_rate=float(option_value("--fail-rate", 0)),
+        rate_limit_rate=float(option_value("--rate-limit-rate", 0)),
+        seed=int(option_value("--seed", 0)),
+        verbose="--verbose" in sys.argv,
+    )
+    print(f"ASC スタブサーバー起動: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""register_app.py ベンチマーク
+
+ASC スタブサーバー（asc_stub_server.py）を同じプロセスで起動し、
+単一アプリ・フリートの登録フローを繰り返し実行して計測する。
+スクリーンショットは合成 PNG を一時ディレクトリに生成して実際に Reserve / PUT / Commit する。
+
+出力: シナリオごとの wall time・リクエスト数、ステップ別の p50 / p99
+startup シナリオは register_app.py を別プロセスで起動し、--validate / --dry-run の
+起動時間と、重い依存（jwt・requests・aiohttp）を読み込んだかどうかを計測する。
+
+Usage:
+    python3 store/bench_register_app.py
+    python3 store/bench_register_app.py --runs 10 --latency-ms 80
+    python3 store/bench_register_app.py --scenario fleet --fleet-apps 8 --rate-limit-rate 0.02
+    python3 store/bench_register_app.py --scenario startup --runs 20
+    python3 store/bench_register_app.py --json bench_output.txt
+"""
+
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+import asc_stub_server
+
+STORE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_CONFIG = os.path.join(STORE_DIR, "dictation.json")
+REGISTER_APP = os.path.join(STORE_DIR, "register_app.py")
+
+# 起動時間の計測対象と、起動時に読み込まれていないはずの重い依存
+STARTUP_MODES = ["import", "--validate", "--dry-run"]
+HEAVY_MODULES = ("jwt", "cryptography", "requests", "aiohttp")
+
+# 合成スクリーンショット（デバイス → (幅, 高さ)）と 1 デバイスあたりの枚数
+SCREENSHOT_SIZES = {
+    "iphone": (1290, 2796),
+    "ipad": (2048, 2732),
+}
+SCREENSHOTS_PER_DEVICE = 5
+
+
+# ─────────────────────────────────────────────
+# 入力データ生成
+# ─────────────────────────────────────────────
+def _png_chunk(kind, data):
+    return (struct.pack(">I", len(data)) + kind + data
+            + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+
+def write_png(path, width, height, seed):
+    """上部にノイズを入れた RGB PNG（実機のスクリーンショットに近い 1〜数 MB）"""
+    rng = random.Random(seed)
+    noise_rows = height // 4
+    row_bytes = width * 3
+    flat = b"\x00" + bytes([seed % 256]) * row_bytes
+    raw = b"".join(
+        b"\x00" + rng.randbytes(row_bytes) if y < noise_rows else flat
+        for y in range(height)
+    )
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(_png_chunk(b"IDAT", zlib.compress(raw, 1)))
+        f.write(_png_chunk(b"IEND", b""))
+
+
+def make_screenshots(base_dir):
+    for index, (device_type, (width, height)) in enumerate(SCREENSHOT_SIZES.items()):
+        device_dir = os.path.join(base_dir, device_type)
+        os.makedirs(device_dir, exist_ok=True)
+        for i in range(1, SCREENSHOTS_PER_DEVICE + 1):
+            write_png(os.path.join(device_dir, f"{i:02d}.png"), width, height, seed=index * 100 + i)
+
+
+def make_configs(config_dir, screenshot_dir, count):
+    """テンプレート設定から Bundle ID / SKU / 名前を変えた設定を count 個作る"""
+    with open(TEMPLATE_CONFIG, "r", encoding="utf-8") as f:
+        template = json.load(f)
+    os.makedirs(config_dir, exist_ok=True)
+    paths = []
+    for i in range(count):
+        config = json.loads(json.dumps(template))
+        config["app"]["bundleId"] = f"{template['app']['bundleId']}.bench{i}"
+        config["app"]["sku"] = f"{template['app'].get('sku', 'bench')}-bench{i}"
+        config["app"]["name"] = f"{template['app']['name']} {i}"
+        for iap in config.get("inAppPurchases", []):
+            iap["productId"] = f"{iap['productId']}.bench{i}"
+        config["screenshotDir"] = screenshot_dir
+        path = os.path.join(config_dir, f"bench{i}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(config, f, ensure_ascii=False, indent=2)
+        paths.append(path)
+    return paths
+
+
+# ─────────────────────────────────────────────
+# 計測
+# ─────────────────────────────────────────────
+def _reset(ra, server):
+    """毎回まっさらな状態（スタブの中身・レート制限・ID キャッシュ・事前検証のメモ）から始める"""
+    with server.store.lock:
+        server.store.reset()
+    with server.stats_lock:
+        server.reset_stats()
+    ra.rate_limiter = ra.RateLimiter(ra.RATE_LIMIT_PER_HOUR)
+    ra.tracer = ra.Tracer()
+    ra._id_cache_entries = None
+    ra._price_point_indexes = {}
+    # 残っていると 2 回目以降はスクリーンショットの検証・チェックサム計算を飛ばし、速く見えてしまう
+    with ra._preflight_memo_lock:
+        ra._preflight_memo.clear()
+
+
+def run_scenario(ra, server, name, config_paths, runs):
+    walls = []
+    requests_per_run = []
+    step_samples = {}
+    failures = 0
+    for _ in range(runs):
+        _reset(ra, server)
+        started = time.perf_counter()
+        # register_app の進捗ログは計測結果の邪魔になるので捨てる
+        with contextlib.redirect_stdout(io.StringIO()):
+            if len(config_paths) == 1:
+                reports = [ra.run_app(config_paths[0])]
+            else:
+                reports = ra.run_fleet(os.path.dirname(config_paths[0]))
+            ra.close_sessions()
+        walls.append(time.perf_counter() - started)
+        requests_per_run.append(server.stats["requests"])
+        for report in reports:
+            if report["failed"] or report["error"]:
+                failures += 1
+            for step_name, result in report["results"].items():
+                if result["status"] == "ok":
+                    step_samples.setdefault(step_name, []).append(result["seconds"])
+    return {
+        "scenario": name,
+        "apps": len(config_paths),
+        "runs": runs,
+        "failures": failures,
+        "wall": {"p50": ra.percentile(walls, 50), "p99": ra.percentile(walls, 99)},
+        "requests": {"p50": ra.percentile(requests_per_run, 50), "max": max(requests_per_run)},
+        "steps": {
+            step_name: {"p50": ra.percentile(samples, 50), "p99": ra.percentile(samples, 99)}
+            for step_name, samples in step_samples.items()
+        },
+    }
+
+
+def _startup_command(mode, config_path):
+    if mode == "import":
+        return [sys.executable, "-c", "import register_app"]
+    return [sys.executable, REGISTER_APP, config_path, mode]
+
+
+def run_startup(ra, config_path, runs):
+    """CLI の起動時間（別プロセス）。ASC_TOKEN を外すので、トークンを作ろうとすれば失敗する"""
+    env = {k: v for k, v in os.environ.items() if k not in ("ASC_TOKEN", "ASC_BASE_URL")}
+    modes = {}
+    for mode in STARTUP_MODES:
+        command = _startup_command(mode, config_path)
+        walls = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            subprocess.run(command, cwd=STORE_DIR, env=env,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            walls.append(time.perf_counter() - started)
+        # -X importtime の出力から、読み込まれた重い依存を拾う
+        profile = subprocess.run([command[0], "-X", "importtime"] + command[1:], cwd=STORE_DIR,
+                                 env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                 text=True)
+        loaded = sorted({
+            line.rsplit("|", 1)[-1].strip().split(".")[0]
+            for line in profile.stderr.splitlines()
+            if line.startswith("import time:")
+        } & set(HEAVY_MODULES))
+        modes[mode] = {
+            "p50": ra.percentile(walls, 50),
+            "p99": ra.percentile(walls, 99),
+            "heavy_modules": loaded,
+        }
+    return {"scenario": "startup", "runs": runs, "modes": modes}
+
+
+def print_startup(ra, result):
+    print(f"\n=== startup: {result['runs']} 回 ===")
+    print(f"  {ra.pad('モード', 12)} {'p50':>8} {'p99':>8}  重い依存")
+    for mode, timing in result["modes"].items():
+        heavy = ", ".join(timing["heavy_modules"]) or "なし"
+        print(f"  {mode:<12} {timing['p50']:>7.3f}s {timing['p99']:>7.3f}s  {heavy}")
+
+
+def print_result(ra, result):
+    print(f"\n=== {result['scenario']}: {result['apps']} アプリ × {result['runs']} 回 ===")
+    print(f"  wall:       p50 {result['wall']['p50']:.2f}s  p99 {result['wall']['p99']:.2f}s")
+    print(f"  リクエスト: {result['requests']['p50']} / 回（最大 {result['requests']['max']}）")
+    if result["failures"]:
+        print(f"  [WARN] 失敗したアプリ: {result['failures']} 件")
+    print(f"  {ra.pad('ステップ', 32)} {'p50':>8} {'p99':>8}")
+    for step_name, timing in result["steps"].items():
+        print(f"  {ra.pad(step_name, 32)} {timing['p50']:>7.3f}s {timing['p99']:>7.3f}s")
+
+
+def main():
+    runs = int(asc_stub_server.option_value("--runs", 5))
+    scenario = asc_stub_server.option_value("--scenario", "all")
+    fleet_apps = int(asc_stub_server.option_value("--fleet-apps", 4))
+    json_path = asc_stub_server.option_value("--json")
+
+    server = asc_stub_server.start_server(
+        latency_ms=float(asc_stub_server.option_value("--latency-ms", 20)),
+        fail_rate=float(asc_stub_server.option_value("--fail-rate", 0)),
+        rate_limit_rate=float(asc_stub_server.option_value("--rate-limit-rate", 0)),
+        seed=int(asc_stub_server.option_value("--seed", 0)),
+    )
+    work_dir = tempfile.mkdtemp(prefix="bench_register_app_")
+
+    # BASE_URL / トークンはインポート時に読まれるため、スタブ起動後に読み込む
+    os.environ["ASC_BASE_URL"] = server.base_url
+    os.environ["ASC_TOKEN"] = "bench"
+    import register_app as ra
+
+    ra.ID_CACHE_PATH = os.path.join(work_dir, "resource_ids.json")
+    ra.PRICE_POINT_CACHE_PATH = os.path.join(work_dir, "price_points.json")
+    ra.JOURNAL_DIR = os.path.join(work_dir, "journal")
+    ra.USE_ID_CACHE = False
+
+    try:
+        screenshot_dir = os.path.join(work_dir, "screenshot")
+        make_screenshots(screenshot_dir)
+        print(f"スタブ: {server.base_url}  latency {server.latency * 1000:.0f}ms"
+              f"  fail {server.fail_rate}  429 {server.rate_limit_rate}")
+
+        results = []
+        if scenario in ("single", "all"):
+            paths = make_configs(os.path.join(work_dir, "single"), screenshot_dir, 1)
+            results.append(run_scenario(ra, server, "single", paths, runs))
+        if scenario in ("fleet", "all"):
+            paths = make_configs(os.path.join(work_dir, "fleet"), screenshot_dir, fleet_apps)
+            results.append(run_scenario(ra, server, "fleet", paths, runs))
+        if scenario in ("startup", "all"):
+            paths = make_configs(os.path.join(work_dir, "startup"), screenshot_dir, 1)
+            results.append(run_startup(ra, paths[0], runs))
+
+        for result in results:
+            if result["scenario"] == "startup":
+                print_startup(ra, result)
+            else:
+                print_result(ra, result)
+        print()
+
+        if json_path:
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            print(f"結果を保存: {json_path}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,63 +7,606 @@
 Usage:
     python3 store/register_app.py store/apps/fukushi2.json
     python3 store/register_app.py store/apps/fukushi2.json --dry-run
+    python3 store/register_app.py store/apps/fukushi2.json --upload-concurrency 8
+    python3 store/register_app.py --fleet store/apps/ --fleet-concurrency 8
+    python3 store/register_app.py store/apps/fukushi2.json --resume
+    python3 store/register_app.py store/apps/fukushi2.json --trace trace.json
+    python3 store/register_app.py store/apps/fukushi2.json --fix
+    python3 store/register_app.py store/apps/fukushi2.json --validate
+    python3 store/register_app.py store/apps/fukushi2.json --export
+    python3 store/register_app.py --fleet store/apps/ --export store/snapshots/
 """
 
-import jwt
 import time
-import requests
 import json
 import sys
 import os
+import base64
+import contextlib
+import contextvars
+import functools
 import hashlib
-import mimetypes
+import math
+import mmap
+import random
+import struct
+import threading
+import unicodedata
+import zlib
+from decimal import Decimal
+from types import MappingProxyType
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:  # Windows ではトークンキャッシュをロックなしで使う
+    fcntl = None
+
+# jwt（cryptography）・requests・aiohttp・asyncio・ProcessPoolExecutor（multiprocessing）は読み込みが
+# 重いため、実際に使うときに読み込む。--dry-run / --validate では一切読み込まず、トークンも作らない
 
 # === 設定 ===
 KEY_ID = "7P39336774"
 ISSUER_ID = "35a2f02c-136f-4b1b-aadb-c196cc50a08a"
 KEY_FILE = "/Users/shinichikinuwaki/Desktop/private_key.p8"
 
-BASE_URL = "https://api.appstoreconnect.apple.com"
+# ASC_BASE_URL / ASC_TOKEN でスタブサーバー（store/asc_stub_server.py）に向けられる
+BASE_URL = os.environ.get("ASC_BASE_URL", "https://api.appstoreconnect.apple.com")
+STATIC_TOKEN = os.environ.get("ASC_TOKEN")
 
-# スクリーンショット表示タイプ
+# スクリーンショット表示タイプ（デバイスのディレクトリ名 → 表示タイプ）。設定の
+# screenshotDisplayTypes で置き換えられる
 SCREENSHOT_DISPLAY_TYPES = {
     "iphone": "APP_IPHONE_67",
     "ipad": "APP_IPAD_PRO_6GEN_129",
 }
 
+# 表示タイプごとに受け付けるピクセル寸法（縦向き。横向きは幅と高さを入れ替えて判定）
+SCREENSHOT_DIMENSIONS = {
+    "APP_IPHONE_67": [(1290, 2796), (1284, 2778), (1320, 2868)],
+    "APP_IPHONE_65": [(1242, 2688), (1284, 2778)],
+    "APP_IPHONE_55": [(1242, 2208)],
+    "APP_IPAD_PRO_6GEN_129": [(2048, 2732)],
+    "APP_IPAD_PRO_3GEN_129": [(2048, 2732)],
+}
+SCREENSHOT_MAX_BYTES = 10 * 1024 * 1024
+SCREENSHOT_MAX_PER_SET = 10
+
+# 事前検証のワーカープロセス数と、--fix で自動修正するか
+PREFLIGHT_WORKERS = os.cpu_count() or 4
+FIX_SCREENSHOTS = False
+
 DRY_RUN = False
 
+# screenshotDir が相対パスの場合の基準（プロジェクトルート）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# MD5 を計算するときの読み込み単位
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# スクリーンショットの同時アップロード数（--upload-concurrency で変更可）
+UPLOAD_CONCURRENCY = 4
+
+# 依存関係のないステップ（App Info / Version / IAP の各系列）を並列実行する数
+STEP_CONCURRENCY = 4
+
+# フリートモードで同時に処理するアプリ数（--fleet-concurrency で変更可）
+FLEET_CONCURRENCY = 4
+
+# プロセス全体で同時に送信する HTTP リクエストの上限（--max-in-flight で変更可）
+MAX_IN_FLIGHT = 16
+
+# HTTP 接続プールサイズ（ホストごと）
+# api: api.appstoreconnect.apple.com / upload: スクリーンショットのアップロード先
+HTTP_POOL_SIZE = {
+    "api": 16,
+    "upload": 16,
+}
+
+# App Store Connect API の時間あたりクォータ（X-Rate-Limit ヘッダの値で上書きされる）
+RATE_LIMIT_PER_HOUR = 3600
+
+# 429 / 5xx のリトライ（ジッター付き指数バックオフ）
+RETRY_MAX = 5
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# 不変なリソース ID のキャッシュ（--no-cache で読み出しを無効化）
+USE_ID_CACHE = True
+ID_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "resource_ids.json")
+ID_CACHE_TTL = 7 * 24 * 3600
+# Web UI などからも変わる値（バージョンの状態・ローカライズや審査情報の内容ハッシュ）は短い TTL にする
+ID_CACHE_STATE_TTL = 10 * 60
+# 書き込みがこれらで拒否されたら、キャッシュの ID が古いとみなしてアプリ分を破棄する
+# （403・422 などの検証エラーは通常のステップの失敗として扱い、キャッシュは残す）
+ID_CACHE_REJECTED_STATUSES = (404, 409)
+
+# IAP 価格ポイント表のキャッシュ（地域ごとに全 IAP で共有。--no-cache で読み出しを無効化）
+PRICE_POINT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "price_points.json")
+PRICE_POINT_CACHE_TTL = 24 * 3600
+
+# 署名済み JWT のキャッシュ（KEY_ID・ISSUER_ID ごと。並列・連続して起動したプロセスで共有）
+USE_TOKEN_CACHE = True
+TOKEN_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "tokens.json")
+TOKEN_LIFETIME = 1200
+# 有効期限まで TOKEN_REFRESH_MARGIN 秒を切ったら裏で作り直し、TOKEN_MIN_VALIDITY 秒を切ったら待って作り直す
+TOKEN_REFRESH_MARGIN = 300
+TOKEN_MIN_VALIDITY = 60
+
+# --export で App Store Connect の現状を書き出す先と、1 アプリ内で並列に取得する数
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots")
+EXPORT_CONCURRENCY = 8
+
+# True のあいだは GET 以外のリクエストを送らない（--export）
+READ_ONLY = False
+
+# 途中で失敗したランを --resume で再開するためのジャーナル
+RESUME = False
+JOURNAL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "journal")
+
 
 # ─────────────────────────────────────────────
 # JWT トークン生成
 # ─────────────────────────────────────────────
 def generate_token():
+    if STATIC_TOKEN:
+        return STATIC_TOKEN
+    import jwt
+
     with open(KEY_FILE, "r") as f:
         private_key = f.read()
     now = int(time.time())
     payload = {
         "iss": ISSUER_ID,
         "iat": now,
-        "exp": now + 1200,
+        "exp": now + TOKEN_LIFETIME,
         "aud": "appstoreconnect-v1",
     }
     return jwt.encode(payload, private_key, algorithm="ES256", headers={"kid": KEY_ID})
 
 
+@contextlib.contextmanager
+def _token_file_lock():
+    """トークンキャッシュのプロセス間ロック"""
+    os.makedirs(os.path.dirname(TOKEN_CACHE_PATH), exist_ok=True)
+    with open(TOKEN_CACHE_PATH + ".lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_token_cache():
+    try:
+        with open(TOKEN_CACHE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_or_sign_token():
+    """(トークン, exp) を返す。
+
+    ディスクキャッシュに十分長く有効なトークンがあればそれを使い、なければ署名して保存する。
+    ロックを取ってから読み直すので、同時に起動したプロセスのうち署名するのは 1 つだけ。
+    """
+    if not USE_TOKEN_CACHE:
+        signed_at = int(time.time())
+        return generate_token(), signed_at + TOKEN_LIFETIME
+
+    key = f"{KEY_ID}:{ISSUER_ID}"
+    with _token_file_lock():
+        entries = _read_token_cache()
+        entry = entries.get(key)
+        if entry and entry["exp"] - time.time() > TOKEN_REFRESH_MARGIN:
+            return entry["token"], entry["exp"]
+
+        # generate_token の iat はこれ以降なので、実際の exp はこれより短くならない
+        signed_at = int(time.time())
+        token = generate_token()
+        exp = signed_at + TOKEN_LIFETIME
+        now = time.time()
+        entries = {k: v for k, v in entries.items() if v.get("exp", 0) > now}
+        entries[key] = {"token": token, "exp": exp}
+        tmp_path = f"{TOKEN_CACHE_PATH}.{os.getpid()}.tmp"
+        try:
+            # 有効なベアラートークンなので本人だけが読めるようにする
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, TOKEN_CACHE_PATH)
+        except OSError as e:
+            print(f"  [WARN] トークンキャッシュの保存に失敗: {e}")
+    return token, exp
+
+
+# ─────────────────────────────────────────────
+# HTTP トランスポート（keep-alive 接続プール）
+# ─────────────────────────────────────────────
+_sessions = {}
+_sessions_lock = threading.Lock()
+_in_flight = threading.BoundedSemaphore(MAX_IN_FLIGHT)
+
+
+def get_session(url):
+    """ホストごとに keep-alive の Session を共有する"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    host = urlsplit(url).netloc
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            kind = "api" if host == urlsplit(BASE_URL).netloc else "upload"
+            pool_size = HTTP_POOL_SIZE[kind]
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+    return session
+
+
+def _is_api_url(url):
+    return urlsplit(url).netloc == urlsplit(BASE_URL).netloc
+
+
+def _retry_delay(attempt, resp=None):
+    """Retry-After があれば優先し、なければフルジッターの指数バックオフ"""
+    retry_after = resp.headers.get("Retry-After") if resp is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), RETRY_MAX_DELAY)
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def _is_retryable(method, resp):
+    # POST は重複作成を避けるため、処理されていないことが確実な 429 のみリトライ
+    return resp.status_code == 429 or (
+        method != "POST" and resp.status_code in RETRY_STATUSES
+    )
+
+
+def _is_retryable_error(method, connect_failed):
+    # 送信中の例外: POST は接続の確立に失敗した（サーバーに届いていない）ときだけリトライする。
+    # 送信後のタイムアウト・切断はサーバー側で作成済みかもしれず、再送すると重複する
+    return method != "POST" or connect_failed
+
+
+def _requests_connect_failed(error):
+    from urllib3.exceptions import NewConnectionError
+    import requests
+
+    reason = getattr(error.args[0] if error.args else None, "reason", None)
+    return isinstance(error, requests.ConnectTimeout) or isinstance(reason, NewConnectionError)
+
+
+def http_request(method, url, **kwargs):
+    """共有セッション経由で送信する。API 宛てはレート制限を通し、429 / 5xx はリトライする"""
+    import requests
+
+    is_api = _is_api_url(url)
+    started = time.perf_counter()
+    sent = _request_size(kwargs)
+    queue_wait = 0.0
+    for attempt in range(RETRY_MAX + 1):
+        if is_api:
+            queue_wait += rate_limiter.acquire()
+        try:
+            queued = time.perf_counter()
+            with _in_flight:
+                queue_wait += time.perf_counter() - queued
+                resp = get_session(url).request(method, url, **kwargs)
+        except requests.ConnectionError as e:
+            if attempt == RETRY_MAX or not _is_retryable_error(method, _requests_connect_failed(e)):
+                tracer.record(method, url, started, None, sent, 0, attempt, queue_wait)
+                raise
+            delay = _retry_delay(attempt)
+            rate_limiter.record_retry(delay)
+            time.sleep(delay)
+            continue
+
+        if is_api:
+            rate_limiter.update(resp)
+        if not _is_retryable(method, resp) or attempt == RETRY_MAX:
+            tracer.record(method, url, started, resp.status_code, sent, len(resp.content),
+                          attempt, queue_wait)
+            return resp
+
+        delay = _retry_delay(attempt, resp)
+        if resp.status_code == 429 and is_api:
+            rate_limiter.pause(delay)
+        rate_limiter.record_retry(delay)
+        time.sleep(delay)
+    return resp
+
+
+# ─────────────────────────────────────────────
+# レート制限（全アプリ・全ステップで共有するトークンバケット）
+# ─────────────────────────────────────────────
+class RateLimiter:
+    """App Store Connect の時間あたりクォータを配分するトークンバケット。
+
+    トークンが尽きると残高が負になり、後続の呼び出しは順番に補充を待つ。
+    待ち時間は予約順に積み上がるため、並列のアプリ・ステップに先着順で公平に配分される。
+    """
+
+    def __init__(self, limit_per_hour):
+        self._lock = threading.Lock()
+        self._limit = limit_per_hour
+        self._tokens = float(limit_per_hour)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self.remaining = None
+        self.requests = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.retries = 0
+        self.retry_seconds = 0.0
+        self.throttled = 0
+
+    def _refill(self, now):
+        rate = self._limit / 3600.0
+        self._tokens = min(float(self._limit), self._tokens + (now - self._updated) * rate)
+        self._updated = now
+
+    def acquire(self):
+        """1 リクエスト分のトークンを予約し、必要なら補充まで待つ（待った秒数を返す）"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def reserve(self):
+        """1 リクエスト分のトークンを予約し、送信までに待つべき秒数を返す"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            self.requests += 1
+            delay = max(0.0, self._paused_until - now)
+            if self._tokens < 0:
+                delay = max(delay, -self._tokens * 3600.0 / self._limit)
+            if delay > 0:
+                self.waits += 1
+                self.wait_seconds += delay
+        return delay
+
+    def update(self, resp):
+        """X-Rate-Limit ヘッダ（user-hour-lim:3600;user-hour-rem:3599;）を反映する"""
+        if resp.status_code == 429:
+            with self._lock:
+                self.throttled += 1
+        header = resp.headers.get("X-Rate-Limit")
+        if not header:
+            return
+        values = {}
+        for item in header.split(";"):
+            key, _, value = item.partition(":")
+            if value.strip().isdigit():
+                values[key.strip()] = int(value)
+        with self._lock:
+            self._refill(time.monotonic())
+            if values.get("user-hour-lim"):
+                self._limit = values["user-hour-lim"]
+            if "user-hour-rem" in values:
+                self.remaining = values["user-hour-rem"]
+                self._tokens = min(self._tokens, float(self.remaining))
+
+    def pause(self, seconds):
+        """429 を受けたら全呼び出し元をまとめて待たせる"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def record_retry(self, delay):
+        with self._lock:
+            self.retries += 1
+            self.retry_seconds += delay
+
+
+rate_limiter = RateLimiter(RATE_LIMIT_PER_HOUR)
+
+
+def print_rate_limit_stats():
+    remaining = rate_limiter.remaining if rate_limiter.remaining is not None else "-"
+    print("  API レート制限:")
+    print(f"    リクエスト: {rate_limiter.requests}  残りクォータ: {remaining}")
+    print(f"    待機: {rate_limiter.waits} 回 ({rate_limiter.wait_seconds:.1f}s)"
+          f"  リトライ: {rate_limiter.retries} 回 ({rate_limiter.retry_seconds:.1f}s)"
+          f"  429: {rate_limiter.throttled} 回")
+
+
+def close_sessions():
+    close_event_loop()
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+# ─────────────────────────────────────────────
+# リクエストトレース（--trace out.json / out.jsonl）
+# ─────────────────────────────────────────────
+_current_app = contextvars.ContextVar("current_app", default=None)
+_current_step = contextvars.ContextVar("current_step", default=None)
+
+
+def path_template(url):
+    """/v1/apps/123/appInfos → /v1/apps/{id}/appInfos（アップロード先は (upload)）"""
+    if not _is_api_url(url):
+        return "(upload)"
+    segments = urlsplit(url).path.split("/")
+    # /vN/<type>/<id>/... の <id> を置き換える
+    if len(segments) > 3:
+        segments[3] = "{id}"
+    return "/".join(segments)
+
+
+def _request_size(kwargs):
+    if kwargs.get("data") is not None:
+        return len(kwargs["data"])
+    if kwargs.get("json") is not None:
+        return len(json.dumps(kwargs["json"]).encode("utf-8"))
+    return 0
+
+
+def percentile(values, pct):
+    """最近傍順位法のパーセンタイル"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class Tracer:
+    """API 呼び出し・アップロードパート 1 件ごとの所要時間を記録する。
+
+    アプリ名・ステップ名は contextvars から取るので、呼び出し側で渡す必要はない。
+    dur はリトライのバックオフを含む合計、queueWait はレート制限と同時実行数の待ち時間。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self.events = []
+
+    def record(self, method, url, started, status, sent, received, retries, queue_wait):
+        event = {
+            "ts": started - self._origin,
+            "dur": time.perf_counter() - started,
+            "app": _current_app.get(),
+            "step": _current_step.get(),
+            "method": method,
+            "path": path_template(url),
+            "status": status,
+            "bytesSent": sent,
+            "bytesReceived": received,
+            "retries": retries,
+            "queueWait": queue_wait,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def snapshot(self, app=None):
+        with self._lock:
+            return [e for e in self.events if app is None or e["app"] == app]
+
+    def write(self, path):
+        """.jsonl なら 1 行 1 イベント、それ以外は Chrome トレース形式（Perfetto で開ける）"""
+        events = sorted(self.snapshot(), key=lambda e: e["ts"])
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".jsonl"):
+                for event in events:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+                return
+            json.dump({"traceEvents": _chrome_trace_events(events), "displayTimeUnit": "ms"},
+                      f, ensure_ascii=False)
+
+
+def _chrome_trace_events(events):
+    # アプリごとに 1 プロセス。重なる呼び出しは空いているレーン（tid）に割り当てる
+    pids = {}
+    lanes = {}
+    trace = []
+    for event in events:
+        pid = pids.setdefault(event["app"] or "-", len(pids) + 1)
+        ends = lanes.setdefault(pid, [])
+        tid = next((i for i, end in enumerate(ends) if end <= event["ts"]), len(ends))
+        if tid == len(ends):
+            ends.append(0.0)
+        ends[tid] = event["ts"] + event["dur"]
+        trace.append({
+            "name": f"{event['method']} {event['path']}",
+            "cat": event["step"] or "-",
+            "ph": "X",
+            "ts": round(event["ts"] * 1e6),
+            "dur": round(event["dur"] * 1e6),
+            "pid": pid,
+            "tid": tid + 1,
+            "args": {key: event[key] for key in
+                     ("step", "status", "bytesSent", "bytesReceived", "retries", "queueWait")},
+        })
+    for app, pid in pids.items():
+        trace.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": app}})
+    return trace
+
+
+tracer = Tracer()
+
+
+def write_trace(path):
+    if not path:
+        return
+    tracer.write(path)
+    print(f"トレースを保存: {path}（{len(tracer.events)} 件）")
+
+
+def print_trace_summary(app=None, top=5):
+    events = tracer.snapshot(app)
+    if not events:
+        return
+    by_step = {}
+    for event in events:
+        by_step.setdefault(event["step"] or "-", []).append(event)
+
+    print("  API 呼び出し（ステップ別）:")
+    print(f"    {pad('ステップ', 30)} {'calls':>5} {'p50':>7} {'p99':>7} {'wait':>6}"
+          f" {'retry':>5} {'sentKB':>8} {'recvKB':>7}")
+    for step_name, step_events in by_step.items():
+        durations = [e["dur"] for e in step_events]
+        print(
+            f"    {pad(step_name, 30)} {len(step_events):>5}"
+            f" {percentile(durations, 50):>6.3f}s {percentile(durations, 99):>6.3f}s"
+            f" {sum(e['queueWait'] for e in step_events):>5.1f}s"
+            f" {sum(e['retries'] for e in step_events):>5}"
+            f" {sum(e['bytesSent'] for e in step_events) / 1024:>8.0f}"
+            f" {sum(e['bytesReceived'] for e in step_events) / 1024:>7.0f}"
+        )
+
+    print(f"  遅い呼び出し Top {top}:")
+    for event in sorted(events, key=lambda e: e["dur"], reverse=True)[:top]:
+        retries = f" リトライ {event['retries']}" if event["retries"] else ""
+        print(f"    {event['dur']:6.3f}s  {event['method']} {event['path']} -> {event['status']}"
+              f"  [{event['step'] or '-'}]{retries}")
+
+
 # ─────────────────────────────────────────────
 # API ヘルパー
 # ─────────────────────────────────────────────
 _token = None
-_token_created = 0
+_token_exp = 0
+_token_lock = threading.Lock()
+_token_refreshing = False
+
+
+def _refresh_token():
+    """期限が近いトークンを裏で作り直す（その間のリクエストは今のトークンで送る）"""
+    global _token, _token_exp, _token_refreshing
+    try:
+        token, exp = load_or_sign_token()
+        with _token_lock:
+            _token, _token_exp = token, exp
+    except Exception as e:
+        print(f"  [WARN] トークンの更新に失敗（期限直前に再試行）: {e!r}")
+    finally:
+        with _token_lock:
+            _token_refreshing = False
 
 
 def get_token():
-    global _token, _token_created
-    now = time.time()
-    if _token is None or now - _token_created > 1000:
-        _token = generate_token()
-        _token_created = now
-    return _token
+    global _token, _token_exp, _token_refreshing
+    if STATIC_TOKEN:
+        return STATIC_TOKEN
+    with _token_lock:
+        remaining = _token_exp - time.time()
+        if _token is None or remaining < TOKEN_MIN_VALIDITY:
+            _token, _token_exp = load_or_sign_token()
+        elif remaining < TOKEN_REFRESH_MARGIN and not _token_refreshing:
+            _token_refreshing = True
+            threading.Thread(target=_refresh_token, daemon=True).start()
+        return _token
 
 
 def headers():
@@ -74,86 +617,566 @@ def headers():
 
 
 def api_get(path, params=None):
-    url = f"{BASE_URL}{path}"
-    if DRY_RUN:
-        print(f"  [DRY-RUN] GET {url} params={params}")
-        return None
-    resp = requests.get(url, headers=headers(), params=params or {})
-    if resp.status_code == 200:
-        return resp.json()
-    if resp.status_code == 404:
-        return None
-    print(f"  [ERROR] GET {path} -> {resp.status_code}: {resp.text[:300]}")
-    return None
+    return run_sync(async_client.get(path, params))
 
 
 def api_post(path, payload):
-    url = f"{BASE_URL}{path}"
-    if DRY_RUN:
-        print(f"  [DRY-RUN] POST {url}")
-        print(f"    payload: {json.dumps(payload, ensure_ascii=False)[:500]}")
-        return {"data": {"id": "dry-run-id", "attributes": {}}}
-    resp = requests.post(url, headers=headers(), json=payload)
-    if resp.status_code in (200, 201):
-        return resp.json()
-    print(f"  [ERROR] POST {path} -> {resp.status_code}: {resp.text[:500]}")
-    return None
+    return run_sync(async_client.post(path, payload))
 
 
 def api_patch(path, payload):
-    url = f"{BASE_URL}{path}"
-    if DRY_RUN:
-        print(f"  [DRY-RUN] PATCH {url}")
-        print(f"    payload: {json.dumps(payload, ensure_ascii=False)[:500]}")
-        return {"data": {"id": "dry-run-id", "attributes": {}}}
-    resp = requests.patch(url, headers=headers(), json=payload)
-    if resp.status_code == 200:
-        return resp.json()
-    print(f"  [ERROR] PATCH {path} -> {resp.status_code}: {resp.text[:500]}")
-    return None
+    return run_sync(async_client.patch(path, payload))
+
+
+def api_delete(path):
+    return run_sync(async_client.delete(path))
 
 
 def api_put_binary(url, data, content_type):
     """バイナリアップロード用"""
-    if DRY_RUN:
-        print(f"  [DRY-RUN] PUT {url} ({len(data)} bytes)")
-        return True
-    h = {"Content-Type": content_type}
-    resp = requests.put(url, headers=h, data=data)
-    if resp.status_code in (200, 201):
-        return True
-    print(f"  [ERROR] PUT -> {resp.status_code}: {resp.text[:300]}")
-    return False
+    return run_sync(async_client.put_binary(url, data, content_type))
+
+
+def iter_pages(path, params=None):
+    """links.next をたどって 1 ページずつ返す（見つかった時点で打ち切れる）"""
+    page = api_get(path, params)
+    while page:
+        yield page
+        next_url = (page.get("links") or {}).get("next")
+        page = api_get(next_url) if next_url else None
+
+
+def api_get_all(path, params=None):
+    """全ページの data / included をまとめて返す。1 ページ目が取れなければ None"""
+    merged = None
+    for page in iter_pages(path, params):
+        if merged is None:
+            merged = {"data": [], "included": []}
+        merged["data"].extend(page.get("data") or [])
+        merged["included"].extend(page.get("included") or [])
+    return merged
+
+
+# ─────────────────────────────────────────────
+# 非同期クライアント（1 つのイベントループで全リクエストを多重化）
+# ─────────────────────────────────────────────
+@functools.lru_cache(maxsize=None)
+def optional_aiohttp():
+    """aiohttp を初回の送信時に読み込む（未インストールなら None で、requests をスレッドプールで使う）"""
+    try:
+        import aiohttp
+    except ImportError:
+        return None
+    return aiohttp
+
+
+class AsyncResponse:
+    """aiohttp / requests の応答を同じ形で扱うための薄いラッパー"""
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncClient:
+    """api_get などと同じ意味論（レート制限・リトライ・キャッシュ破棄）の非同期版。
+
+    aiohttp があればホストごとの ClientSession でイベントループから直接送信し、
+    なければ http_request（requests）をスレッドプールで実行する。
+    ステップ関数は run_sync() 経由の同期ヘルパーから、スクリーンショットの
+    アップロードは await で直接呼び、同時リクエスト数はスレッド数に縛られない。
+    """
+
+    def __init__(self):
+        self._sessions = {}
+        self._in_flight = None
+
+    def _session(self, url):
+        host = urlsplit(url).netloc
+        session = self._sessions.get(host)
+        if session is None:
+            kind = "api" if host == urlsplit(BASE_URL).netloc else "upload"
+            aiohttp = optional_aiohttp()
+            connector = aiohttp.TCPConnector(limit=HTTP_POOL_SIZE[kind])
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[host] = session
+        return session
+
+    async def request(self, method, url, **kwargs):
+        """http_request の非同期版"""
+        import asyncio
+
+        if READ_ONLY and method != "GET":
+            raise RuntimeError(f"読み取り専用モードで {method} {url} は送れません")
+        aiohttp = optional_aiohttp()
+        if aiohttp is None:
+            call = functools.partial(http_request, method, url, **kwargs)
+            context = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(None, context.run, call)
+
+        if self._in_flight is None:
+            self._in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+        is_api = _is_api_url(url)
+        started = time.perf_counter()
+        sent = _request_size(kwargs)
+        queue_wait = 0.0
+        for attempt in range(RETRY_MAX + 1):
+            if is_api:
+                delay = rate_limiter.reserve()
+                queue_wait += delay
+                await asyncio.sleep(delay)
+            try:
+                queued = time.perf_counter()
+                async with self._in_flight:
+                    queue_wait += time.perf_counter() - queued
+                    async with self._session(url).request(method, url, **kwargs) as raw:
+                        resp = AsyncResponse(raw.status, raw.headers, await raw.read())
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                connect_failed = isinstance(
+                    e, (aiohttp.ClientConnectorError, getattr(aiohttp, "ConnectionTimeoutError", ())))
+                if attempt == RETRY_MAX or not _is_retryable_error(method, connect_failed):
+                    tracer.record(method, url, started, None, sent, 0, attempt, queue_wait)
+                    raise
+                delay = _retry_delay(attempt)
+                rate_limiter.record_retry(delay)
+                await asyncio.sleep(delay)
+                continue
+
+            if is_api:
+                rate_limiter.update(resp)
+            if not _is_retryable(method, resp) or attempt == RETRY_MAX:
+                tracer.record(method, url, started, resp.status_code, sent, len(resp.content),
+                              attempt, queue_wait)
+                return resp
+
+            delay = _retry_delay(attempt, resp)
+            if resp.status_code == 429 and is_api:
+                rate_limiter.pause(delay)
+            rate_limiter.record_retry(delay)
+            await asyncio.sleep(delay)
+        return resp
+
+    async def _headers(self):
+        """headers() の非同期版。
+
+        署名（ファイルロック・ES256）が要るときは、イベントループを止めないようスレッドプールで待つ。
+        """
+        if STATIC_TOKEN or (_token is not None and _token_exp - time.time() >= TOKEN_MIN_VALIDITY):
+            return headers()
+        import asyncio
+
+        return await asyncio.get_running_loop().run_in_executor(None, headers)
+
+    async def get(self, path, params=None):
+        # links.next などの絶対 URL もそのまま受け付ける
+        url = path if path.startswith("http") else f"{BASE_URL}{path}"
+        resp = await self.request("GET", url, headers=await self._headers(), params=params or {})
+        if resp.status_code == 200:
+            return resp.json()
+        if resp.status_code == 404:
+            return None
+        print(f"  [ERROR] GET {path} -> {resp.status_code}: {resp.text[:300]}")
+        return None
+
+    async def post(self, path, payload):
+        url = f"{BASE_URL}{path}"
+        resp = await self.request("POST", url, headers=await self._headers(), json=payload)
+        if resp.status_code in (200, 201):
+            return resp.json()
+        if resp.status_code in ID_CACHE_REJECTED_STATUSES:
+            invalidate_current_id_cache(path, resp.status_code)
+        print(f"  [ERROR] POST {path} -> {resp.status_code}: {resp.text[:500]}")
+        return None
+
+    async def patch(self, path, payload):
+        url = f"{BASE_URL}{path}"
+        resp = await self.request("PATCH", url, headers=await self._headers(), json=payload)
+        if resp.status_code == 200:
+            return resp.json()
+        if resp.status_code == 204:
+            return {}
+        if resp.status_code in ID_CACHE_REJECTED_STATUSES:
+            invalidate_current_id_cache(path, resp.status_code)
+        print(f"  [ERROR] PATCH {path} -> {resp.status_code}: {resp.text[:500]}")
+        return None
+
+    async def delete(self, path):
+        url = f"{BASE_URL}{path}"
+        resp = await self.request("DELETE", url, headers=await self._headers())
+        if resp.status_code in (200, 204, 404):
+            return True
+        if resp.status_code in ID_CACHE_REJECTED_STATUSES:
+            invalidate_current_id_cache(path, resp.status_code)
+        print(f"  [ERROR] DELETE {path} -> {resp.status_code}: {resp.text[:300]}")
+        return False
+
+    async def put_binary(self, url, data, content_type):
+        """バイナリアップロード用"""
+        h = {"Content-Type": content_type}
+        resp = await self.request("PUT", url, headers=h, data=data)
+        if resp.status_code in (200, 201):
+            return True
+        print(f"  [ERROR] PUT -> {resp.status_code}: {resp.text[:300]}")
+        return False
+
+    async def close(self):
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions.clear()
+        self._in_flight = None
+
+
+async_client = AsyncClient()
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop():
+    """全リクエストを処理するイベントループ（専用スレッドで常駐）"""
+    import asyncio
+
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(
+                target=_loop.run_forever, name="asc-event-loop", daemon=True
+            )
+            _loop_thread.start()
+        return _loop
+
+
+async def _in_context(context, coro):
+    """呼び出し元スレッドの contextvars（ID キャッシュなど）を引き継いで実行する"""
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+def run_sync(coro):
+    """イベントループ上でコルーチンを実行し、結果を待って返す（同期ヘルパー用）"""
+    import asyncio
+
+    loop = get_event_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync() はイベントループ上からは呼べません（await を使う）")
+    future = asyncio.run_coroutine_threadsafe(
+        _in_context(contextvars.copy_context(), coro), loop
+    )
+    return future.result()
+
+
+def close_event_loop():
+    global _loop, _loop_thread
+    with _loop_lock:
+        loop, thread = _loop, _loop_thread
+        _loop = _loop_thread = None
+    if loop is None:
+        return
+    import asyncio
+
+    asyncio.run_coroutine_threadsafe(async_client.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+# ─────────────────────────────────────────────
+# リソース ID キャッシュ（store/.cache/resource_ids.json）
+# ─────────────────────────────────────────────
+_id_cache_entries = None
+_id_cache_lock = threading.Lock()
+_current_id_cache = contextvars.ContextVar("current_id_cache", default=None)
+
+
+def attributes_hash(attrs):
+    return hashlib.sha256(
+        json.dumps(attrs, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+
+def _load_id_cache_entries():
+    global _id_cache_entries
+    if _id_cache_entries is None:
+        try:
+            with open(ID_CACHE_PATH, "r", encoding="utf-8") as f:
+                _id_cache_entries = json.load(f)
+        except (OSError, ValueError):
+            _id_cache_entries = {}
+    return _id_cache_entries
+
+
+def save_id_cache():
+    """キャッシュをアトミックに書き出す（一時ファイル → rename）"""
+    with _id_cache_lock:
+        if _id_cache_entries is None:
+            return
+        os.makedirs(os.path.dirname(ID_CACHE_PATH), exist_ok=True)
+        tmp_path = f"{ID_CACHE_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_id_cache_entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, ID_CACHE_PATH)
+
+
+class IdCache:
+    """1 アプリ（bundle ID + 設定パス）分のリソース ID キャッシュ。
+
+    値は TTL 付きで保存し、--no-cache のときは読み出しだけを無効にして最新値で上書きする。
+    リモートで変わりうる値は get(name, ttl=ID_CACHE_STATE_TTL) で読む。
+    """
+
+    def __init__(self, key, read=True):
+        self.key = key
+        self.read = read
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, ttl=ID_CACHE_TTL):
+        with _id_cache_lock:
+            entry = _load_id_cache_entries().get(self.key, {}).get(name)
+            if not self.read or entry is None or time.time() - entry["savedAt"] > ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry["value"]
+
+    def put(self, name, value):
+        if value is None:
+            return
+        with _id_cache_lock:
+            app_entries = _load_id_cache_entries().setdefault(self.key, {})
+            app_entries[name] = {"value": value, "savedAt": time.time()}
+
+    def forget(self, name):
+        with _id_cache_lock:
+            _load_id_cache_entries().get(self.key, {}).pop(name, None)
+
+    def invalidate(self):
+        with _id_cache_lock:
+            _load_id_cache_entries().pop(self.key, None)
+
+
+def id_cache_key(bundle_id, config_path):
+    """bundle ID + 設定パスごとのキャッシュのキー"""
+    return f"{bundle_id}|{os.path.abspath(config_path)}"
+
+
+def current_id_cache():
+    cache = _current_id_cache.get()
+    return cache if cache is not None else IdCache("", read=False)
+
+
+def invalidate_current_id_cache(path, status):
+    """書き込みが拒否されたら（ID_CACHE_REJECTED_STATUSES）、このアプリのキャッシュを破棄する"""
+    cache = _current_id_cache.get()
+    if cache is not None:
+        print(f"  [CACHE] {path} -> {status}: ID キャッシュを破棄")
+        cache.invalidate()
+
+
+def cached_localizations(cache_key, desired):
+    """全ロケールのキャッシュ済みハッシュが desired と一致すれば {locale: id} を返す。
+
+    Web UI での編集を取りこぼさないよう、ハッシュは ID_CACHE_STATE_TTL の間しか信用しない。
+    """
+    cached = current_id_cache().get(cache_key, ttl=ID_CACHE_STATE_TTL)
+    if not cached or not desired:
+        return None
+    ids = {}
+    for locale, attrs in desired:
+        entry = cached.get(locale)
+        if not entry or entry["hash"] != attributes_hash(attrs):
+            return None
+        ids[locale] = entry["id"]
+    return ids
+
+
+def remember_localizations(cache_key, entries):
+    """entries: {locale: (loc_id, attrs)} をキャッシュに書き足す"""
+    cache = current_id_cache()
+    cached = dict(cache.get(cache_key) or {})
+    for locale, (loc_id, attrs) in entries.items():
+        cached[locale] = {"id": loc_id, "hash": attributes_hash(attrs)}
+    cache.put(cache_key, cached)
+
+
+def submit_in_context(pool, fn, *args):
+    """呼び出し元の contextvars（キャッシュなど）を引き継いでワーカーで実行する"""
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+# ─────────────────────────────────────────────
+# include= で先に取れた関連リソース（アプリ 1 件のラン内だけで使う）
+# ─────────────────────────────────────────────
+_current_prefetch = contextvars.ContextVar("current_prefetch", default=None)
+
+
+def remember_included(document, relationship, path_format):
+    """document の各リソースに include された relationship を、一覧 GET の結果として覚えておく。
+
+    path_format は "/v1/appInfos/{id}/appInfoLocalizations" のような後続ステップの GET パス。
+    件数が limit[...] を超えて切り詰められている関連は覚えない（後続ステップで全件取得する）。
+    """
+    prefetch = _current_prefetch.get()
+    if prefetch is None or not document:
+        return
+    included = {(r["type"], r["id"]): r for r in document.get("included") or []}
+    parents = document["data"] if isinstance(document["data"], list) else [document["data"]]
+    for parent in parents:
+        rel = ((parent or {}).get("relationships") or {}).get(relationship)
+        if not rel or "data" not in rel:
+            continue
+        refs = rel["data"]
+        if isinstance(refs, list):
+            total = ((rel.get("meta") or {}).get("paging") or {}).get("total", len(refs))
+            if total > len(refs) or any((r["type"], r["id"]) not in included for r in refs):
+                continue
+            value = {"data": [included[(r["type"], r["id"])] for r in refs]}
+        elif refs is None:
+            value = {"data": None}
+        elif (refs["type"], refs["id"]) in included:
+            value = {"data": included[(refs["type"], refs["id"])]}
+        else:
+            continue
+        prefetch[path_format.format(id=parent["id"])] = value
+
+
+def take_prefetched(path):
+    """先読み済みなら GET の代わりにその結果を返す（1 回だけ）"""
+    prefetch = _current_prefetch.get()
+    if prefetch is None:
+        return None
+    return prefetch.pop(path, None)
+
+
+# ─────────────────────────────────────────────
+# 再開用ジャーナル（store/.cache/journal/）
+# ─────────────────────────────────────────────
+class RunJournal:
+    """完了ステップの出力を記録する。
+
+    --resume 付きで再実行すると、完了済みステップは出力を復元してスキップする。
+    スクリーンショットはチェックサムの突き合わせで続きからアップロードされる。
+    設定ファイルの内容が変わっていればジャーナルは使わない。
+    """
+
+    def __init__(self, path, config_hash, resume=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.enabled = path is not None
+        self.data = {"configHash": config_hash, "steps": {}}
+        self.resumed = False
+        if not (self.enabled and resume):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("configHash") != config_hash:
+            print("  [WARN] 設定が変更されているためジャーナルを破棄して最初から実行します")
+            return
+        self.data = data
+        self.resumed = True
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def completed_step(self, name):
+        """完了済みステップの出力（未完了なら None）"""
+        with self.lock:
+            return self.data["steps"].get(name)
+
+    def record_step(self, name, outputs):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.data["steps"][name] = outputs
+            self._save()
+
+    def discard(self):
+        if not self.enabled:
+            return
+        with self.lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+# ─────────────────────────────────────────────
+# 差分同期
+# ─────────────────────────────────────────────
+def new_sync_counts():
+    return {"created": 0, "changed": 0, "unchanged": 0, "deleted": 0, "failed": 0}
+
+
+def attributes_match(desired, existing):
+    """desired の全属性が取得済みの existing と一致すれば True"""
+    return all(existing.get(key) == value for key, value in desired.items())
+
+
+def format_sync_counts(counts):
+    return (f"作成 {counts['created']} / 更新 {counts['changed']}"
+            f" / 変更なし {counts['unchanged']}"
+            + (f" / 削除 {counts['deleted']}" if counts.get("deleted") else "")
+            + (f" / 失敗 {counts['failed']}" if counts["failed"] else ""))
 
 
 # ─────────────────────────────────────────────
 # Step 1: Bundle ID 登録
 # ─────────────────────────────────────────────
-def register_bundle_id(config):
+def register_bundle_id(plan):
     print("\n=== Step 1: Bundle ID 登録 ===")
-    bundle_id = config["app"]["bundleId"]
+    bundle_id = plan["bundleId"]
+    cache = current_id_cache()
 
-    # 既存チェック
-    existing = api_get("/v1/bundleIds", {"filter[identifier]": bundle_id})
-    if existing and existing.get("data"):
-        bid = existing["data"][0]["id"]
-        print(f"  既存の Bundle ID を使用: {bid}")
+    bid = cache.get("bundleIdResourceId")
+    if bid:
+        print(f"  既存の Bundle ID を使用（キャッシュ）: {bid}")
         return bid
 
+    # 既存チェック（filter は前方一致の候補も返すので identifier で絞る）
+    for page in iter_pages("/v1/bundleIds", {
+        "filter[identifier]": bundle_id,
+        "fields[bundleIds]": "identifier",
+    }):
+        bid = next((b["id"] for b in page.get("data") or []
+                    if b["attributes"].get("identifier") == bundle_id), None)
+        if bid:
+            print(f"  既存の Bundle ID を使用: {bid}")
+            cache.put("bundleIdResourceId", bid)
+            return bid
+
     payload = {
         "data": {
             "type": "bundleIds",
-            "attributes": {
-                "identifier": bundle_id,
-                "name": config["app"]["sku"],
-                "platform": "IOS",
-            },
+            "attributes": dict(plan["bundleIdAttributes"]),
         }
     }
     result = api_post("/v1/bundleIds", payload)
     if result:
         bid = result["data"]["id"]
         print(f"  Bundle ID 登録完了: {bid}")
+        cache.put("bundleIdResourceId", bid)
         return bid
     print("  [FAIL] Bundle ID 登録失敗")
     return None
@@ -162,29 +1185,32 @@ def register_bundle_id(config):
 # ─────────────────────────────────────────────
 # Step 2: アプリ作成
 # ─────────────────────────────────────────────
-def create_app(config, bundle_id_resource_id):
+def create_app(plan, bundle_id_resource_id):
     print("\n=== Step 2: アプリ作成 ===")
-    bundle_id = config["app"]["bundleId"]
+    bundle_id = plan["bundleId"]
+    cache = current_id_cache()
 
-    # 既存チェック
-    existing = api_get("/v1/apps", {"filter[bundleId]": bundle_id})
-    if existing and existing.get("data"):
-        app_id = existing["data"][0]["id"]
-        print(f"  既存のアプリを使用: {app_id}")
+    app_id = cache.get("appId")
+    if app_id:
+        print(f"  既存のアプリを使用（キャッシュ）: {app_id}")
         return app_id
 
+    # 既存チェック
+    for page in iter_pages("/v1/apps", {
+        "filter[bundleId]": bundle_id,
+        "fields[apps]": "bundleId",
+    }):
+        app_id = next((a["id"] for a in page.get("data") or []
+                       if a["attributes"].get("bundleId") == bundle_id), None)
+        if app_id:
+            print(f"  既存のアプリを使用: {app_id}")
+            cache.put("appId", app_id)
+            return app_id
+
     payload = {
         "data": {
             "type": "apps",
-            "attributes": {
-                "name": config["app"]["name"],
-                "primaryLocale": config["app"].get("primaryLocale", "ja"),
-                "sku": config["app"]["sku"],
-                "bundleId": bundle_id,
-                "contentRightsDeclaration": config["app"].get(
-                    "contentRightsDeclaration", "DOES_NOT_USE_THIRD_PARTY_CONTENT"
-                ),
-            },
+            "attributes": dict(plan["appAttributes"]),
             "relationships": {
                 "bundleId": {
                     "data": {
@@ -199,6 +1225,7 @@ def create_app(config, bundle_id_resource_id):
     if result:
         app_id = result["data"]["id"]
         print(f"  アプリ作成完了: {app_id}")
+        cache.put("appId", app_id)
         return app_id
 
     # FORBIDDEN の場合は手動案内
@@ -206,28 +1233,40 @@ def create_app(config, bundle_id_resource_id):
     print("  App Store Connect Web で手動作成してください。")
     print("  https://appstoreconnect.apple.com/apps")
     print("  作成後、--app-id <APP_ID> オプションを付けて再実行してください。")
-    if DRY_RUN:
-        return "dry-run-app-id"
     return None
 
 
 # ─────────────────────────────────────────────
 # Step 3: App Info 取得 → カテゴリ設定
 # ─────────────────────────────────────────────
-def setup_app_info(config, app_id):
+def setup_app_info(plan, app_id):
     print("\n=== Step 3: App Info (カテゴリ設定) ===")
 
     # App Info 取得
-    app_data = api_get(f"/v1/apps/{app_id}/appInfos")
-    if not app_data or not app_data.get("data"):
+    cache = current_id_cache()
+    app_info_id = cache.get("appInfoId")
+    # Step 4 で使う localization も include で同時に取る
+    app_data = None if app_info_id else api_get(f"/v1/apps/{app_id}/appInfos", {
+        "fields[appInfos]": "appInfoLocalizations",
+        "include": "appInfoLocalizations",
+        "fields[appInfoLocalizations]": ",".join(["locale"] + APP_INFO_LOCALIZATION_FIELDS),
+        "limit[appInfoLocalizations]": 50,
+    })
+    if app_info_id:
+        pass
+    elif app_data and app_data.get("data"):
+        app_info_id = app_data["data"][0]["id"]
+        cache.put("appInfoId", app_info_id)
+        remember_included(app_data, "appInfoLocalizations",
+                          "/v1/appInfos/{id}/appInfoLocalizations")
+    else:
         print("  [FAIL] App Info 取得失敗")
         return None
 
-    app_info_id = app_data["data"][0]["id"]
     print(f"  App Info ID: {app_info_id}")
 
     # カテゴリ設定
-    category = config.get("appInfo", {}).get("primaryCategory", "EDUCATION")
+    category = plan["primaryCategory"]
     payload = {
         "data": {
             "type": "appInfos",
@@ -254,26 +1293,46 @@ def setup_app_info(config, app_id):
 # ─────────────────────────────────────────────
 # Step 4: App Info Localization 更新
 # ─────────────────────────────────────────────
-def setup_app_info_localizations(config, app_info_id):
+APP_INFO_LOCALIZATION_FIELDS = [
+    "name", "subtitle", "privacyPolicyUrl", "privacyChoicesUrl", "privacyPolicyText",
+]
+
+
+def setup_app_info_localizations(plan, app_info_id):
     print("\n=== Step 4: App Info Localization ===")
 
-    # 既存 localization 取得
-    existing = api_get(f"/v1/appInfos/{app_info_id}/appInfoLocalizations")
+    desired = [(locale, dict(attrs)) for locale, attrs in plan["appInfoLocalizations"]]
+
+    counts = new_sync_counts()
+    cache_key = f"appInfoLocalizations:{app_info_id}"
+    if cached_localizations(cache_key, desired) is not None:
+        for locale, _ in desired:
+            print(f"  [{locale}] 変更なし（キャッシュ）")
+            counts["unchanged"] += 1
+        return counts
+
+    # 既存 localization 取得（Step 3 で include 済みならそれを使う）
+    path = f"/v1/appInfos/{app_info_id}/appInfoLocalizations"
+    existing = take_prefetched(path) or api_get_all(path, {
+        "fields[appInfoLocalizations]": ",".join(["locale"] + APP_INFO_LOCALIZATION_FIELDS),
+        "limit": 50,
+    })
     existing_map = {}
     if existing and existing.get("data"):
         for loc in existing["data"]:
-            existing_map[loc["attributes"]["locale"]] = loc["id"]
-
-    for loc_config in config.get("appInfoLocalizations", []):
-        locale = loc_config["locale"]
-        attrs = {}
-        for key in ["name", "subtitle", "privacyPolicyUrl", "privacyChoicesUrl", "privacyPolicyText"]:
-            if key in loc_config and loc_config[key] is not None:
-                attrs[key] = loc_config[key]
+            existing_map[loc["attributes"]["locale"]] = loc
 
+    synced = {}
+    for locale, attrs in desired:
         if locale in existing_map:
+            loc_id = existing_map[locale]["id"]
+            if attributes_match(attrs, existing_map[locale]["attributes"]):
+                print(f"  [{locale}] 変更なし（スキップ）")
+                counts["unchanged"] += 1
+                synced[locale] = (loc_id, attrs)
+                continue
+
             # 更新
-            loc_id = existing_map[locale]
             payload = {
                 "data": {
                     "type": "appInfoLocalizations",
@@ -284,8 +1343,11 @@ def setup_app_info_localizations(config, app_info_id):
             result = api_patch(f"/v1/appInfoLocalizations/{loc_id}", payload)
             if result:
                 print(f"  [{locale}] 更新完了")
+                counts["changed"] += 1
+                synced[locale] = (loc_id, attrs)
             else:
                 print(f"  [{locale}] [WARN] 更新失敗（続行）")
+                counts["failed"] += 1
         else:
             # 新規作成
             payload = {
@@ -302,40 +1364,78 @@ def setup_app_info_localizations(config, app_info_id):
             result = api_post("/v1/appInfoLocalizations", payload)
             if result:
                 print(f"  [{locale}] 作成完了")
+                counts["created"] += 1
+                synced[locale] = (result["data"]["id"], attrs)
             else:
                 print(f"  [{locale}] [WARN] 作成失敗（続行）")
+                counts["failed"] += 1
+
+    remember_localizations(cache_key, synced)
+    return counts
 
 
 # ─────────────────────────────────────────────
 # Step 5: App Store Version 作成
 # ─────────────────────────────────────────────
-def create_version(config, app_id):
+# 既存バージョンとして再利用する（メタデータを編集できる）状態
+EDITABLE_VERSION_STATES = [
+    "PREPARE_FOR_SUBMISSION", "DEVELOPER_REJECTED", "REJECTED", "METADATA_REJECTED",
+    "WAITING_FOR_REVIEW", "IN_REVIEW",
+]
+
+
+def note_version_state(cache, version_string, version):
+    """バージョンの状態を読んだら、キャッシュの version エントリをそれに合わせる。
+
+    編集できない状態（審査提出後・リリース済み）になっていれば破棄し、次回は GET し直す。
+    """
+    cache_key = f"version:{version_string}"
+    state = ((version or {}).get("attributes") or {}).get("appStoreState")
+    if state in EDITABLE_VERSION_STATES:
+        # PREPARE_FOR_SUBMISSION で過去にリリース済みバージョンがなければ初回
+        cache.put(cache_key, [version["id"], state == "PREPARE_FOR_SUBMISSION"])
+    else:
+        cache.forget(cache_key)
+
+
+def create_version(plan, app_id):
     print("\n=== Step 5: App Store Version 作成 ===")
-    version_string = config["version"]["versionString"]
+    version_string = plan["versionAttributes"]["versionString"]
+    cache = current_id_cache()
+
+    cached = cache.get(f"version:{version_string}", ttl=ID_CACHE_STATE_TTL)
+    if cached:
+        ver_id, is_first = cached
+        print(f"  既存バージョン使用（キャッシュ）: {ver_id} (v{version_string})")
+        return ver_id, is_first
 
     # 既存バージョンチェック（編集可能なもの）
+    # Step 6 / 7 で使う localization と審査情報も include で同時に取る
     existing = api_get(f"/v1/apps/{app_id}/appStoreVersions", {
-        "filter[appStoreState]": "PREPARE_FOR_SUBMISSION,DEVELOPER_REJECTED,REJECTED,METADATA_REJECTED,WAITING_FOR_REVIEW,IN_REVIEW",
-        "fields[appStoreVersions]": "versionString,appStoreState",
+        "filter[appStoreState]": ",".join(EDITABLE_VERSION_STATES),
+        "fields[appStoreVersions]": "versionString,appStoreState,appStoreVersionLocalizations,appStoreReviewDetail",
+        "include": "appStoreVersionLocalizations,appStoreReviewDetail",
+        "fields[appStoreVersionLocalizations]": ",".join(["locale"] + VERSION_LOCALIZATION_FIELDS),
+        "fields[appStoreReviewDetails]": ",".join(REVIEW_DETAIL_FIELDS),
+        "limit[appStoreVersionLocalizations]": 50,
+        "limit": 1,
     })
     if existing and existing.get("data"):
+        remember_included(existing, "appStoreVersionLocalizations",
+                          "/v1/appStoreVersions/{id}/appStoreVersionLocalizations")
+        remember_included(existing, "appStoreReviewDetail",
+                          "/v1/appStoreVersions/{id}/appStoreReviewDetail")
         ver = existing["data"][0]
         ver_id = ver["id"]
         state = ver["attributes"]["appStoreState"]
         print(f"  既存バージョン使用: {ver_id} (v{ver['attributes']['versionString']}, {state})")
-        # PREPARE_FOR_SUBMISSION で過去にリリース済みバージョンがなければ初回
-        is_first = (state == "PREPARE_FOR_SUBMISSION")
-        return ver_id, is_first
+        note_version_state(cache, version_string, ver)
+        return ver_id, state == "PREPARE_FOR_SUBMISSION"
 
     payload = {
         "data": {
             "type": "appStoreVersions",
-            "attributes": {
-                "versionString": version_string,
-                "copyright": config["version"].get("copyright", "2026 ktwvai Inc."),
-                "releaseType": config["version"].get("releaseType", "AFTER_APPROVAL"),
-                "reviewType": config["version"].get("reviewType", "APP_STORE"),
-            },
+            "attributes": dict(plan["versionAttributes"]),
             "relationships": {
                 "app": {
                     "data": {"type": "apps", "id": app_id}
@@ -347,6 +1447,7 @@ def create_version(config, app_id):
     if result:
         ver_id = result["data"]["id"]
         print(f"  バージョン作成完了: {ver_id}")
+        cache.put(f"version:{version_string}", [ver_id, True])
         return ver_id, True
     print("  [FAIL] バージョン作成失敗")
     return None, False
@@ -355,28 +1456,52 @@ def create_version(config, app_id):
 # ─────────────────────────────────────────────
 # Step 6: Version Localization 更新
 # ─────────────────────────────────────────────
-def setup_version_localizations(config, version_id, is_first_version=False):
+VERSION_LOCALIZATION_FIELDS = [
+    "description", "keywords", "whatsNew", "promotionalText", "marketingUrl", "supportUrl",
+]
+
+
+def setup_version_localizations(plan, version_id, is_first_version=False):
     print("\n=== Step 6: Version Localization ===")
 
-    existing = api_get(f"/v1/appStoreVersions/{version_id}/appStoreVersionLocalizations")
+    # 初回バージョンには whatsNew を送れない
+    desired = [
+        (locale, {k: v for k, v in attrs.items() if k != "whatsNew" or not is_first_version})
+        for locale, attrs in plan["versionLocalizations"]
+    ]
+
+    counts = new_sync_counts()
+    cache_key = f"versionLocalizations:{version_id}"
+    localization_ids = cached_localizations(cache_key, desired)
+    if localization_ids is not None:
+        for locale, _ in desired:
+            print(f"  [{locale}] 変更なし（キャッシュ）")
+            counts["unchanged"] += 1
+        return localization_ids, counts
+
+    # Step 5 で include 済みならそれを使う
+    path = f"/v1/appStoreVersions/{version_id}/appStoreVersionLocalizations"
+    existing = take_prefetched(path) or api_get_all(path, {
+        "fields[appStoreVersionLocalizations]": ",".join(["locale"] + VERSION_LOCALIZATION_FIELDS),
+        "limit": 50,
+    })
     existing_map = {}
     if existing and existing.get("data"):
         for loc in existing["data"]:
-            existing_map[loc["attributes"]["locale"]] = loc["id"]
+            existing_map[loc["attributes"]["locale"]] = loc
 
     localization_ids = {}
-    for loc_config in config.get("versionLocalizations", []):
-        locale = loc_config["locale"]
-        attrs = {}
-        allowed_keys = ["description", "keywords", "whatsNew", "promotionalText", "marketingUrl", "supportUrl"]
-        if is_first_version:
-            allowed_keys.remove("whatsNew")
-        for key in allowed_keys:
-            if key in loc_config and loc_config[key] is not None:
-                attrs[key] = loc_config[key]
-
+    synced = {}
+    for locale, attrs in desired:
         if locale in existing_map:
-            loc_id = existing_map[locale]
+            loc_id = existing_map[locale]["id"]
+            if attributes_match(attrs, existing_map[locale]["attributes"]):
+                print(f"  [{locale}] 変更なし（スキップ）")
+                localization_ids[locale] = loc_id
+                counts["unchanged"] += 1
+                synced[locale] = (loc_id, attrs)
+                continue
+
             payload = {
                 "data": {
                     "type": "appStoreVersionLocalizations",
@@ -388,8 +1513,11 @@ def setup_version_localizations(config, version_id, is_first_version=False):
             if result:
                 print(f"  [{locale}] 更新完了")
                 localization_ids[locale] = loc_id
+                counts["changed"] += 1
+                synced[locale] = (loc_id, attrs)
             else:
                 print(f"  [{locale}] [WARN] 更新失敗（続行）")
+                counts["failed"] += 1
         else:
             payload = {
                 "data": {
@@ -407,34 +1535,55 @@ def setup_version_localizations(config, version_id, is_first_version=False):
                 loc_id = result["data"]["id"]
                 print(f"  [{locale}] 作成完了: {loc_id}")
                 localization_ids[locale] = loc_id
+                counts["created"] += 1
+                synced[locale] = (loc_id, attrs)
             else:
                 print(f"  [{locale}] [WARN] 作成失敗（続行）")
+                counts["failed"] += 1
 
-    return localization_ids
+    remember_localizations(cache_key, synced)
+    return localization_ids, counts
 
 
 # ─────────────────────────────────────────────
 # Step 7: 審査情報 設定
 # ─────────────────────────────────────────────
-def setup_review_detail(config, version_id):
-    print("\n=== Step 7: 審査情報 ===")
-    review = config.get("reviewDetail", {})
-    if not review:
-        print("  reviewDetail が未設定（スキップ）")
-        return
+REVIEW_DETAIL_FIELDS = [
+    "contactFirstName", "contactLastName", "contactEmail", "contactPhone",
+    "demoAccountName", "demoAccountPassword", "demoAccountRequired", "notes",
+]
 
-    attrs = {}
-    for key in [
-        "contactFirstName", "contactLastName", "contactEmail", "contactPhone",
-        "demoAccountName", "demoAccountPassword", "demoAccountRequired", "notes",
-    ]:
-        if key in review:
-            attrs[key] = review[key]
 
-    # 既存チェック
-    existing = api_get(f"/v1/appStoreVersions/{version_id}/appStoreReviewDetail")
+def setup_review_detail(plan, version_id):
+    print("\n=== Step 7: 審査情報 ===")
+    counts = new_sync_counts()
+    if plan["reviewDetail"] is None:
+        print("  reviewDetail が未設定（スキップ）")
+        return counts
+
+    attrs = dict(plan["reviewDetail"])
+
+    cache = current_id_cache()
+    cache_key = f"reviewDetail:{version_id}"
+    cached = cache.get(cache_key, ttl=ID_CACHE_STATE_TTL)
+    if cached and cached["hash"] == attributes_hash(attrs):
+        print("  審査情報: 変更なし（キャッシュ）")
+        counts["unchanged"] += 1
+        return counts
+
+    # 既存チェック（Step 5 で include 済みならそれを使う）
+    path = f"/v1/appStoreVersions/{version_id}/appStoreReviewDetail"
+    existing = take_prefetched(path) or api_get(path, {
+        "fields[appStoreReviewDetails]": ",".join(REVIEW_DETAIL_FIELDS),
+    })
     if existing and existing.get("data"):
         detail_id = existing["data"]["id"]
+        if attributes_match(attrs, existing["data"].get("attributes", {})):
+            print("  審査情報: 変更なし（スキップ）")
+            counts["unchanged"] += 1
+            cache.put(cache_key, {"id": detail_id, "hash": attributes_hash(attrs)})
+            return counts
+
         payload = {
             "data": {
                 "type": "appStoreReviewDetails",
@@ -445,9 +1594,12 @@ def setup_review_detail(config, version_id):
         result = api_patch(f"/v1/appStoreReviewDetails/{detail_id}", payload)
         if result:
             print("  審査情報更新完了")
+            counts["changed"] += 1
+            cache.put(cache_key, {"id": detail_id, "hash": attributes_hash(attrs)})
         else:
             print("  [WARN] 審査情報更新失敗（続行）")
-        return
+            counts["failed"] += 1
+        return counts
 
     # 新規作成
     payload = {
@@ -464,41 +1616,71 @@ def setup_review_detail(config, version_id):
     result = api_post("/v1/appStoreReviewDetails", payload)
     if result:
         print("  審査情報設定完了")
+        counts["created"] += 1
+        cache.put(cache_key, {"id": result["data"]["id"], "hash": attributes_hash(attrs)})
     else:
         print("  [WARN] 審査情報設定失敗（続行）")
+        counts["failed"] += 1
+    return counts
 
 
 # ─────────────────────────────────────────────
 # Step 8: IAP 作成
 # ─────────────────────────────────────────────
-def create_iap(config, app_id):
+def _find_existing_iaps(app_id, product_ids):
+    """未キャッシュの productId をまとめて 1 回の一覧取得で探す。{productId: iap_id}
+
+    Step 9 で使う localization も include で同時に取る。
+    """
+    if not product_ids:
+        return {}
+    existing = api_get_all(f"/v1/apps/{app_id}/inAppPurchasesV2", {
+        "filter[productId]": ",".join(product_ids),
+        "fields[inAppPurchases]": "productId,inAppPurchaseLocalizations",
+        "include": "inAppPurchaseLocalizations",
+        "fields[inAppPurchaseLocalizations]": "locale,name,description",
+        "limit[inAppPurchaseLocalizations]": 50,
+        "limit": 200,
+    })
+    if not existing:
+        return {}
+    remember_included(existing, "inAppPurchaseLocalizations",
+                      "/v2/inAppPurchases/{id}/inAppPurchaseLocalizations")
+    return {iap["attributes"]["productId"]: iap["id"] for iap in existing["data"]}
+
+
+def create_iap(plan, app_id):
+    """[(iap_id, productId)] を返す（IAP ごとの設定は plan["inAppPurchases"] から引く）"""
     print("\n=== Step 8: IAP 作成 ===")
     iap_ids = []
+    cache = current_id_cache()
+
+    found = _find_existing_iaps(
+        app_id, [pid for pid in plan["inAppPurchases"] if not cache.get(f"iap:{pid}")]
+    )
 
-    for iap_config in config.get("inAppPurchases", []):
-        product_id = iap_config["productId"]
+    for product_id, iap_plan in plan["inAppPurchases"].items():
         print(f"  --- {product_id} ---")
 
+        iap_id = cache.get(f"iap:{product_id}")
+        if iap_id:
+            print(f"  既存 IAP を使用（キャッシュ）: {iap_id}")
+            iap_ids.append((iap_id, product_id))
+            continue
+
         # 既存チェック
-        existing = api_get(f"/v1/apps/{app_id}/inAppPurchasesV2", {
-            "filter[productId]": product_id,
-        })
-        if existing and existing.get("data"):
-            iap_id = existing["data"][0]["id"]
+        iap_id = found.get(product_id)
+        if iap_id:
             print(f"  既存 IAP を使用: {iap_id}")
-            iap_ids.append((iap_id, iap_config))
+            cache.put(f"iap:{product_id}", iap_id)
+            iap_ids.append((iap_id, product_id))
             continue
 
         # 新規作成
         payload = {
             "data": {
                 "type": "inAppPurchases",
-                "attributes": {
-                    "name": iap_config["name"],
-                    "productId": product_id,
-                    "inAppPurchaseType": iap_config.get("type", "NON_CONSUMABLE"),
-                    "reviewNote": iap_config.get("reviewNote", ""),
-                },
+                "attributes": dict(iap_plan["attributes"]),
                 "relationships": {
                     "app": {
                         "data": {"type": "apps", "id": app_id}
@@ -510,7 +1692,8 @@ def create_iap(config, app_id):
         if result:
             iap_id = result["data"]["id"]
             print(f"  IAP 作成完了: {iap_id}")
-            iap_ids.append((iap_id, iap_config))
+            cache.put(f"iap:{product_id}", iap_id)
+            iap_ids.append((iap_id, product_id))
         else:
             print(f"  [FAIL] IAP 作成失敗: {product_id}")
 
@@ -520,31 +1703,45 @@ def create_iap(config, app_id):
 # ─────────────────────────────────────────────
 # Step 9: IAP ローカリゼーション
 # ─────────────────────────────────────────────
-def setup_iap_localizations(iap_ids):
+def setup_iap_localizations(plan, iap_ids):
     print("\n=== Step 9: IAP ローカリゼーション ===")
+    counts = new_sync_counts()
 
-    for iap_id, iap_config in iap_ids:
-        localizations = iap_config.get("localizations", [])
+    for iap_id, product_id in iap_ids:
+        localizations = plan["inAppPurchases"][product_id]["localizations"]
         if not localizations:
             print(f"  [{iap_id}] localizations 未設定（スキップ）")
             continue
 
-        # 既存取得
-        existing = api_get(f"/v2/inAppPurchases/{iap_id}/inAppPurchaseLocalizations")
+        desired = [(locale, dict(attrs)) for locale, attrs in localizations]
+        cache_key = f"iapLocalizations:{iap_id}"
+        if cached_localizations(cache_key, desired) is not None:
+            for locale, _ in desired:
+                print(f"  [{iap_id}][{locale}] 変更なし（キャッシュ）")
+                counts["unchanged"] += 1
+            continue
+
+        # 既存取得（Step 8 で include 済みならそれを使う）
+        path = f"/v2/inAppPurchases/{iap_id}/inAppPurchaseLocalizations"
+        existing = take_prefetched(path) or api_get_all(path, {
+            "fields[inAppPurchaseLocalizations]": "locale,name,description",
+            "limit": 50,
+        })
         existing_map = {}
         if existing and existing.get("data"):
             for loc in existing["data"]:
-                existing_map[loc["attributes"]["locale"]] = loc["id"]
-
-        for loc_config in localizations:
-            locale = loc_config["locale"]
-            attrs = {
-                "name": loc_config["name"],
-                "description": loc_config.get("description", ""),
-            }
+                existing_map[loc["attributes"]["locale"]] = loc
 
+        synced = {}
+        for locale, attrs in desired:
             if locale in existing_map:
-                loc_id = existing_map[locale]
+                loc_id = existing_map[locale]["id"]
+                if attributes_match(attrs, existing_map[locale]["attributes"]):
+                    print(f"  [{iap_id}][{locale}] 変更なし（スキップ）")
+                    counts["unchanged"] += 1
+                    synced[locale] = (loc_id, attrs)
+                    continue
+
                 payload = {
                     "data": {
                         "type": "inAppPurchaseLocalizations",
@@ -555,8 +1752,11 @@ def setup_iap_localizations(iap_ids):
                 result = api_patch(f"/v1/inAppPurchaseLocalizations/{loc_id}", payload)
                 if result:
                     print(f"  [{iap_id}][{locale}] 更新完了")
+                    counts["changed"] += 1
+                    synced[locale] = (loc_id, attrs)
                 else:
                     print(f"  [{iap_id}][{locale}] [WARN] 更新失敗（続行）")
+                    counts["failed"] += 1
             else:
                 payload = {
                     "data": {
@@ -572,19 +1772,132 @@ def setup_iap_localizations(iap_ids):
                 result = api_post("/v1/inAppPurchaseLocalizations", payload)
                 if result:
                     print(f"  [{iap_id}][{locale}] 作成完了")
+                    counts["created"] += 1
+                    synced[locale] = (result["data"]["id"], attrs)
                 else:
                     print(f"  [{iap_id}][{locale}] [WARN] 作成失敗（続行）")
+                    counts["failed"] += 1
+
+        remember_localizations(cache_key, synced)
+
+    return counts
 
 
 # ─────────────────────────────────────────────
 # Step 10: IAP 価格設定
 # ─────────────────────────────────────────────
-def setup_iap_price(config, iap_ids):
+_price_point_entries = None
+_price_point_indexes = {}
+_price_point_lock = threading.Lock()
+
+
+def _load_price_point_entries():
+    global _price_point_entries
+    if _price_point_entries is None:
+        try:
+            with open(PRICE_POINT_CACHE_PATH, "r", encoding="utf-8") as f:
+                _price_point_entries = json.load(f)
+        except (OSError, ValueError):
+            _price_point_entries = {}
+    return _price_point_entries
+
+
+def save_price_point_cache():
+    """価格ポイント表をアトミックに書き出す（一時ファイル → rename）"""
+    with _price_point_lock:
+        if _price_point_entries is None:
+            return
+        os.makedirs(os.path.dirname(PRICE_POINT_CACHE_PATH), exist_ok=True)
+        tmp_path = f"{PRICE_POINT_CACHE_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_price_point_entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, PRICE_POINT_CACHE_PATH)
+
+
+def _decode_price_point(point_id):
+    """価格ポイント ID（base64 の JSON {"s": IAP ID, "t": 地域, "p": ティア}）を dict にする。形式が違えば None"""
+    try:
+        fields = json.loads(base64.urlsafe_b64decode(point_id + "=" * (-len(point_id) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(fields, dict) or not {"s", "t", "p"} <= fields.keys():
+        return None
+    return fields
+
+
+def _encode_price_point(iap_id, territory, tier):
+    raw = json.dumps({"s": iap_id, "t": territory, "p": tier}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _price_point_ids(iap_id, territory, tiers):
+    return {price: _encode_price_point(iap_id, territory, tier) for price, tier in tiers.items()}
+
+
+def price_point_index(iap_id, territory):
+    """{Decimal(customerPrice): 価格ポイント ID}。取得できなければ None。
+
+    価格ポイント ID は IAP・地域・ティアを埋め込んだ値なので、地域ごとに
+    {customerPrice: ティア} の表を 1 回だけ全ページ取得し、各 IAP の ID は IAP ID を
+    差し替えて作る。表はプロセス内とディスクに TTL 付きで全 IAP・全アプリで共有する。
+    """
+    with _price_point_lock:
+        tiers = _price_point_indexes.get(territory)
+        if tiers is None:
+            entry = _load_price_point_entries().get(territory) if USE_ID_CACHE else None
+            if entry and time.time() - entry["savedAt"] <= PRICE_POINT_CACHE_TTL:
+                tiers = {Decimal(price): tier for price, tier in entry["points"]}
+                _price_point_indexes[territory] = tiers
+        if tiers is not None:
+            return _price_point_ids(iap_id, territory, tiers)
+
+    listing = api_get_all(f"/v2/inAppPurchases/{iap_id}/pricePoints", {
+        "filter[territory]": territory,
+        "fields[inAppPurchasePricePoints]": "customerPrice",
+        "limit": 200,
+    })
+    if not listing:
+        return None
+    points = [pp for pp in listing["data"] if pp["attributes"].get("customerPrice")]
+    index = {Decimal(pp["attributes"]["customerPrice"]): pp["id"] for pp in points}
+    decoded = [_decode_price_point(pp["id"]) for pp in points]
+    if any(fields is None or fields["s"] != iap_id or fields["t"] != territory for fields in decoded):
+        # ID の形式が想定と違えば差し替えられないので、この IAP の分だけ使う
+        print(f"  [WARN] {territory} の価格ポイント ID の形式が想定外（IAP 間で共有しない）")
+        return index
+    tiers = [[pp["attributes"]["customerPrice"], fields["p"]] for pp, fields in zip(points, decoded)]
+    with _price_point_lock:
+        _price_point_indexes[territory] = {Decimal(price): tier for price, tier in tiers}
+        _load_price_point_entries()[territory] = {"savedAt": time.time(), "points": tiers}
+    return index
+
+
+def forget_price_points(territory):
+    """価格設定が失敗したら、古いかもしれない表を捨てる"""
+    with _price_point_lock:
+        _price_point_indexes.pop(territory, None)
+        _load_price_point_entries().pop(territory, None)
+
+
+def target_prices(config):
+    """iapPrice（数値なら JPN の価格、{地域: 価格} なら複数地域）を ({地域: Decimal}, 基準地域) にする"""
+    prices = config.get("iapPrice")
+    if prices is None:
+        prices = 500
+    if not isinstance(prices, dict):
+        prices = {"JPN": prices}
+    base_territory = config.get("iapBaseTerritory") or next(iter(prices))
+    return {territory: Decimal(str(price)) for territory, price in prices.items()}, base_territory
+
+
+def setup_iap_price(plan, iap_ids):
     print("\n=== Step 10: IAP 価格設定 ===")
-    target_price = config.get("iapPrice", 500)
+    counts = new_sync_counts()
+    prices, base_territory = plan["prices"], plan["baseTerritory"]
+    label = ", ".join(f"{territory} {price}" for territory, price in prices.items())
 
-    for iap_id, iap_config in iap_ids:
-        print(f"  --- {iap_config['productId']} (¥{target_price}) ---")
+    for iap_id, product_id in iap_ids:
+        print(f"  --- {product_id} ({label}) ---")
 
         # 既存の価格スケジュールチェック
         existing_prices = api_get(
@@ -593,35 +1906,27 @@ def setup_iap_price(config, iap_ids):
         )
         if existing_prices and existing_prices.get("data"):
             print("  価格スケジュール設定済み（スキップ）")
+            counts["unchanged"] += 1
             continue
 
-        # 価格ポイント検索（JPY で target_price に一致するもの）
-        price_points = api_get(
-            f"/v2/inAppPurchases/{iap_id}/pricePoints",
-            {
-                "filter[territory]": "JPN",
-                "fields[inAppPurchasePricePoints]": "customerPrice,proceeds",
-                "limit": 200,
-            },
-        )
-        if not price_points or not price_points.get("data"):
-            print("  [WARN] 価格ポイント取得失敗（スキップ）")
-            continue
-
-        target_point_id = None
-        for pp in price_points["data"]:
-            customer_price = pp["attributes"].get("customerPrice")
-            if customer_price and float(customer_price) == float(target_price):
-                target_point_id = pp["id"]
+        # 地域ごとに価格ポイントを引く（表は Decimal の完全一致で索引済み）
+        point_ids = {}
+        for territory, price in prices.items():
+            index = price_point_index(iap_id, territory)
+            if index is None:
+                print(f"  [WARN] {territory} の価格ポイント取得失敗（スキップ）")
                 break
-
-        if not target_point_id:
-            print(f"  [WARN] ¥{target_price} の価格ポイントが見つかりません（スキップ）")
+            if price not in index:
+                print(f"  [WARN] {territory} {price} の価格ポイントが見つかりません（スキップ）")
+                break
+            point_ids[territory] = index[price]
+            print(f"  価格ポイント ({territory}): {index[price]}")
+        if len(point_ids) != len(prices):
+            counts["failed"] += 1
             continue
 
-        print(f"  価格ポイント: {target_point_id}")
-
         # 価格スケジュール設定
+        price_refs = [f"${{price{i}}}" for i in range(1, len(point_ids) + 1)]
         payload = {
             "data": {
                 "type": "inAppPurchasePriceSchedules",
@@ -631,18 +1936,18 @@ def setup_iap_price(config, iap_ids):
                     },
                     "manualPrices": {
                         "data": [
-                            {"type": "inAppPurchasePrices", "id": "${price1}"}
+                            {"type": "inAppPurchasePrices", "id": ref} for ref in price_refs
                         ]
                     },
                     "baseTerritory": {
-                        "data": {"type": "territories", "id": "JPN"}
+                        "data": {"type": "territories", "id": base_territory}
                     },
                 },
             },
             "included": [
                 {
                     "type": "inAppPurchasePrices",
-                    "id": "${price1}",
+                    "id": ref,
                     "attributes": {
                         "startDate": None,
                     },
@@ -650,275 +1955,1845 @@ def setup_iap_price(config, iap_ids):
                         "inAppPurchasePricePoint": {
                             "data": {
                                 "type": "inAppPurchasePricePoints",
-                                "id": target_point_id,
+                                "id": point_id,
                             }
                         },
                     },
                 }
+                for ref, point_id in zip(price_refs, point_ids.values())
             ],
         }
         result = api_post("/v1/inAppPurchasePriceSchedules", payload)
         if result:
             print("  価格設定完了")
+            counts["created"] += 1
         else:
             print("  [WARN] 価格設定失敗（続行）")
+            counts["failed"] += 1
+            for territory in point_ids:
+                forget_price_points(territory)
+    return counts
 
 
 # ─────────────────────────────────────────────
-# Step 11: スクリーンショットアップロード
+# スクリーンショット事前検証（プリフライト）
 # ─────────────────────────────────────────────
-def upload_screenshots(config, localization_ids, base_dir):
-    print("\n=== Step 11: スクリーンショットアップロード ===")
-    screenshot_dir = os.path.join(base_dir, config.get("screenshotDir", "screenshot"))
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_IEND = struct.pack(">I", 0) + b"IEND" + struct.pack(">I", zlib.crc32(b"IEND"))
 
-    if not os.path.exists(screenshot_dir):
-        print(f"  スクリーンショットディレクトリが見つかりません: {screenshot_dir}")
-        return
+# 検証結果・チェックサムのメモ。キーはファイルの実体（inode・サイズ・更新時刻）なので、
+# ロケール間の流用・シンボリックリンク・フリートの他アプリと共有する画像は 1 回しか読まない
+_preflight_memo = {}
+_preflight_memo_lock = threading.Lock()
 
-    # ja の localization ID を使う
-    ja_loc_id = localization_ids.get("ja")
-    if not ja_loc_id:
-        print("  [WARN] ja の Version Localization ID がありません（スキップ）")
-        return
 
-    for device_type, display_type in SCREENSHOT_DISPLAY_TYPES.items():
-        device_dir = os.path.join(screenshot_dir, device_type)
-        if not os.path.exists(device_dir):
-            print(f"  [{device_type}] ディレクトリなし（スキップ）")
-            continue
+class PreflightError(ValueError):
+    """スクリーンショットの事前検証に失敗（API を呼ぶ前に中断する）"""
+
 
-        # PNG ファイルを番号順にソート
-        files = sorted(
-            [f for f in os.listdir(device_dir) if f.lower().endswith(".png")],
-            key=lambda x: x,
+def file_identity(path):
+    stat = os.stat(path)
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _list_pngs(device_dir):
+    """ディレクトリ内の PNG（ファイル名順）。ディレクトリがなければ None"""
+    if not os.path.isdir(device_dir):
+        return None
+    files = sorted(f for f in os.listdir(device_dir) if f.lower().endswith(".png"))
+    return [os.path.join(device_dir, f) for f in files]
+
+
+def screenshot_matrix(plan, screenshot_dir):
+    """ロケール × 表示タイプごとに使う PNG を決める。
+
+    screenshot/<locale>/<device>/ がなければプライマリロケールの画像を流用する。
+    プライマリロケールはロケールのディレクトリがない従来の screenshot/<device>/ でもよい。
+    戻り値は [{"locale", "device", "display_type", "paths", "source"}]。
+    source は画像の出どころのロケール、paths は画像がなければ None。
+    """
+    primary = plan["screenshots"]["primaryLocale"]
+    locales = plan["screenshots"]["locales"]
+    display_types = plan["screenshots"]["displayTypes"]
+
+    matrix = []
+    for locale in locales:
+        for device_type, display_type in display_types.items():
+            source = locale
+            paths = _list_pngs(os.path.join(screenshot_dir, locale, device_type))
+            if paths is None and locale == primary:
+                paths = _list_pngs(os.path.join(screenshot_dir, device_type))
+            if paths is None and locale != primary:
+                source = primary
+                paths = _list_pngs(os.path.join(screenshot_dir, primary, device_type))
+                if paths is None:
+                    paths = _list_pngs(os.path.join(screenshot_dir, device_type))
+            matrix.append({
+                "locale": locale,
+                "device": device_type,
+                "display_type": display_type,
+                "paths": paths,
+                "source": source,
+            })
+    return matrix
+
+
+def _icc_color_space(data):
+    """iCCP チャンクのプロファイルから色空間（b"RGB " など）を取り出す"""
+    name_end = data.find(b"\x00")
+    if name_end < 0 or name_end + 2 > len(data):
+        return None
+    try:
+        header = zlib.decompressobj().decompress(data[name_end + 2:], 20)
+    except zlib.error:
+        return None
+    return header[16:20] if len(header) >= 20 else None
+
+
+def inspect_png(path):
+    """PNG のチャンクを読み、寸法・色形式・アルファ・カラープロファイル・MD5 を返す"""
+    info = {"path": path, "size": os.path.getsize(path), "error": None}
+    if info["size"] == 0:
+        info["error"] = "空のファイル"
+        return info
+    with open(path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            info["md5"] = _file_md5(view)
+            if bytes(view[:8]) != PNG_SIGNATURE:
+                info["error"] = "PNG ではない（シグネチャ不一致）"
+                return info
+            if bytes(view[-12:]) != PNG_IEND:
+                info["error"] = "IEND がない（ファイルが途中で切れている）"
+                return info
+
+            # IHDR と、IDAT より前に置かれる色関連のチャンクだけを見る
+            offset = 8
+            while offset + 8 <= len(view):
+                length, kind = struct.unpack(">I4s", view[offset:offset + 8])
+                data = bytes(view[offset + 8:offset + 8 + length])
+                crc = bytes(view[offset + 8 + length:offset + 12 + length])
+                if len(data) != length or len(crc) != 4:
+                    info["error"] = f"{kind.decode('latin-1')} チャンクが途中で切れている"
+                    return info
+                if kind == b"IHDR":
+                    if struct.unpack(">I", crc)[0] != zlib.crc32(kind + data):
+                        info["error"] = "IHDR の CRC 不一致"
+                        return info
+                    (info["width"], info["height"], info["bit_depth"],
+                     info["color_type"], _, _, info["interlace"]) = struct.unpack(">IIBBBBB", data)
+                elif kind == b"iCCP":
+                    info["icc"] = _icc_color_space(data)
+                elif kind == b"sRGB":
+                    info["srgb"] = True
+                elif kind == b"tRNS":
+                    info["trns"] = True
+                elif kind in (b"IDAT", b"IEND"):
+                    break
+                offset += 12 + length
+        finally:
+            view.release()
+    if "width" not in info:
+        info["error"] = "IHDR がない"
+    return info
+
+
+def check_screenshot(info, display_type):
+    """inspect_png の結果を表示タイプの要件と照合し (エラー, 警告, --fix で直せるか) を返す"""
+    if info["error"]:
+        return [info["error"]], [], False
+    errors, warnings = [], []
+
+    # 色形式・ファイルサイズは --fix（RGB 変換・再圧縮）で直せる
+    if info["color_type"] in (4, 6) or info.get("trns"):
+        errors.append("アルファチャンネルあり")
+    if info["color_type"] in (0, 4):
+        errors.append("グレースケール（RGB ではない）")
+    if info.get("icc") not in (None, b"RGB "):
+        icc = info["icc"].decode("latin-1").strip() if info["icc"] else "不明"
+        errors.append(f"カラープロファイルの色空間が {icc}（RGB ではない）")
+    if info["size"] > SCREENSHOT_MAX_BYTES:
+        errors.append(
+            f"ファイルサイズ {info['size'] / 1024 / 1024:.1f} MB"
+            f"（上限 {SCREENSHOT_MAX_BYTES / 1024 / 1024:.0f} MB）"
         )
-        if not files:
-            print(f"  [{device_type}] スクリーンショットなし（スキップ）")
+    if info["bit_depth"] == 16:
+        warnings.append("16 bit/チャンネル")
+    fixable = bool(errors)
+
+    width, height = info["width"], info["height"]
+    allowed = SCREENSHOT_DIMENSIONS.get(display_type, [])
+    if allowed and (width, height) not in allowed and (height, width) not in allowed:
+        sizes = ", ".join(f"{w}x{h}" for w, h in allowed)
+        errors.append(f"寸法 {width}x{height}（{display_type} は {sizes} または横向き）")
+    return errors, warnings, fixable
+
+
+def preflight_one(path, display_type):
+    """1 ファイル分の検証（プロセスプールのワーカーで実行する）"""
+    info = inspect_png(path)
+    info["errors"], info["warnings"], info["fixable"] = check_screenshot(info, display_type)
+    return info
+
+
+def fix_screenshot(path):
+    """アルファの除去・RGB 変換・再圧縮をしてその場で置き換える（Pillow が必要）"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return "Pillow が未インストール（pip install Pillow）"
+    try:
+        with Image.open(path) as image:
+            image.load()
+            if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+                rgba = image.convert("RGBA")
+                fixed = Image.new("RGB", rgba.size, (255, 255, 255))
+                fixed.paste(rgba, mask=rgba.getchannel("A"))
+            else:
+                fixed = image.convert("RGB")
+            icc_profile = image.info.get("icc_profile")
+            if image.mode not in ("RGB", "RGBA", "P", "PA"):
+                icc_profile = None  # グレースケール・CMYK 用のプロファイルは RGB に付けられない
+        tmp_path = path + ".tmp"
+        fixed.save(tmp_path, format="PNG", optimize=True, icc_profile=icc_profile)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        return repr(e)
+    return None
+
+
+def _run_preflight(pool, jobs):
+    """[(path, display_type)] を並列に検証し、同じ順の結果を返す。
+
+    検証済みの実体はメモを使い、同じ実体を指すパスは 1 回だけ読む。
+    """
+    keys = [(file_identity(path), display_type) for path, display_type in jobs]
+    found = {}
+    for key, job in zip(keys, jobs):
+        if key in found:
             continue
+        with _preflight_memo_lock:
+            memo = _preflight_memo.get(key)
+        found[key] = memo if memo is not None else pool.submit(preflight_one, *job)
+    for key, value in found.items():
+        if isinstance(value, dict):
+            continue
+        info = found[key] = value.result()
+        if not info["errors"]:
+            with _preflight_memo_lock:
+                _preflight_memo[key] = info
+    return [found[key] for key in keys]
+
+
+def preflight_screenshots(plan, base_dir):
+    """全スクリーンショットを API を呼ぶ前に検証し {path: MD5} を返す。
+
+    寸法・アルファ・色空間・サイズ・1 セットの枚数を確認し、問題があれば全件を表示してから
+    PreflightError を送出する。--fix のときはアルファ除去・RGB 変換を並列に行ってから再検証する。
+    """
+    screenshot_dir = os.path.join(base_dir, plan["screenshots"]["dir"])
+    if not os.path.isdir(screenshot_dir):
+        return {}
+
+    # ロケール間で流用する画像も表示タイプごとに 1 回だけ検証する
+    jobs = {}
+    set_errors = []
+    for entry in screenshot_matrix(plan, screenshot_dir):
+        if not entry["paths"]:
+            continue
+        if len(entry["paths"]) > SCREENSHOT_MAX_PER_SET:
+            message = (f"{entry['source']}/{entry['device']}: {len(entry['paths'])} 枚"
+                       f"（1 セット {SCREENSHOT_MAX_PER_SET} 枚まで）")
+            if message not in set_errors:
+                set_errors.append(message)
+        for path in entry["paths"]:
+            jobs[(path, entry["display_type"])] = True
+    jobs = list(jobs)
+    if not jobs:
+        return {}
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=min(PREFLIGHT_WORKERS, len(jobs))) as pool:
+        results = dict(zip(jobs, _run_preflight(pool, jobs)))
+        fixable = [job for job, info in results.items() if info["errors"] and info["fixable"]]
+        if fixable and FIX_SCREENSHOTS:
+            paths = list(dict.fromkeys(path for path, _ in fixable))
+            print(f"スクリーンショット修正: {len(paths)} 枚")
+            for path, problem in zip(paths, pool.map(fix_screenshot, paths)):
+                if problem:
+                    print(f"  [FAIL] {os.path.relpath(path, screenshot_dir)}: {problem}")
+            results.update(zip(fixable, _run_preflight(pool, fixable)))
+
+    problems = 0
+    for (path, display_type), info in results.items():
+        name = os.path.relpath(path, screenshot_dir)
+        for message in info["errors"]:
+            print(f"  [NG] {name}: {message}")
+            problems += 1
+        for message in info["warnings"]:
+            print(f"  [WARN] {name}: {message}")
+    for message in set_errors:
+        print(f"  [NG] {message}")
+        problems += 1
+
+    unique = len({info["md5"] for info in results.values() if info.get("md5")})
+    print(f"スクリーンショット事前検証: {len(jobs)} 枚（内容の異なる画像 {unique} 枚）"
+          f" {time.perf_counter() - started:.2f}s"
+          f"{f'  問題 {problems} 件' if problems else '  OK'}")
+    if problems:
+        hint = "" if FIX_SCREENSHOTS else "（アルファ・色形式は --fix で自動修正できます）"
+        raise PreflightError(f"スクリーンショットの事前検証で {problems} 件の問題{hint}")
+    return {path: info["md5"] for (path, _), info in results.items()}
 
-        print(f"\n  [{device_type}] {len(files)} 枚のスクリーンショット")
 
-        # Screenshot Set 作成（既存チェック）
+# ─────────────────────────────────────────────
+# Step 11: スクリーンショットアップロード
+# ─────────────────────────────────────────────
+async def _reserve_screenshot(screenshot_set_id, filename, filesize):
+    reserve_payload = {
+        "data": {
+            "type": "appScreenshots",
+            "attributes": {
+                "fileName": filename,
+                "fileSize": filesize,
+            },
+            "relationships": {
+                "appScreenshotSet": {
+                    "data": {
+                        "type": "appScreenshotSets",
+                        "id": screenshot_set_id,
+                    }
+                }
+            },
+        }
+    }
+    return await async_client.post("/v1/appScreenshots", reserve_payload)
+
+
+def _file_md5(view):
+    """mmap した画像の MD5 をブロック単位で計算する（全体コピーを作らない）"""
+    md5 = hashlib.md5()
+    for offset in range(0, len(view), HASH_BLOCK_SIZE):
+        md5.update(view[offset:offset + HASH_BLOCK_SIZE])
+    return md5.hexdigest()
+
+
+def _local_md5(filepath):
+    with open(filepath, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.md5().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                return _file_md5(view)
+            finally:
+                view.release()
+
+
+async def _upload_part(op, view, filesize):
+    url = op["url"]
+    offset = op.get("offset", 0)
+    length = op.get("length", filesize)
+    request_headers = {h["name"]: h["value"] for h in op.get("requestHeaders", [])}
+
+    # memoryview のスライスはコピーせずに mmap 上のバイト列を参照する
+    chunk = view[offset:offset + length]
+    try:
+        resp = await async_client.request("PUT", url, headers=request_headers, data=chunk)
+    finally:
+        chunk.release()
+    if resp.status_code not in (200, 201):
+        print(f"    [FAIL] Upload part: {resp.status_code}")
+        return False
+    return True
+
+
+async def _upload_one_screenshot(screenshot_set_id, filepath, md5_digest):
+    """Reserve → 全パート並列 PUT → Commit。成功時は screenshot ID を返す"""
+    import asyncio
+
+    filename = os.path.basename(filepath)
+    filesize = os.path.getsize(filepath)
+    if filesize == 0:
+        print(f"    [FAIL] 空のファイル: {filename}")
+        return None
+
+    print(f"    {filename} ({filesize} bytes)...")
+
+    # Reserve
+    reserve_result = await _reserve_screenshot(screenshot_set_id, filename, filesize)
+    if not reserve_result:
+        print(f"    [FAIL] Reserve 失敗: {filename}")
+        return None
+
+    screenshot_id = reserve_result["data"]["id"]
+    upload_ops = reserve_result["data"]["attributes"].get("uploadOperations", [])
+
+    if not upload_ops:
+        print(f"    [WARN] アップロード操作情報なし: {filename}")
+        return None
+
+    # Upload（各パートを並列 PUT）。MD5 は差分判定のため計算済み
+    with open(filepath, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            # view を解放する前に全パートの送信完了を待つ（失敗したパートがあっても）
+            results = await asyncio.gather(
+                *(_upload_part(op, view, filesize) for op in upload_ops),
+                return_exceptions=True,
+            )
+        finally:
+            view.release()
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    all_ok = all(results)
+
+    if not all_ok:
+        print(f"    [FAIL] Upload 失敗: {filename}")
+        return None
+
+    # Commit
+    commit_payload = {
+        "data": {
+            "type": "appScreenshots",
+            "id": screenshot_id,
+            "attributes": {
+                "uploaded": True,
+                "sourceFileChecksum": md5_digest,
+            },
+        }
+    }
+    commit_result = await async_client.patch(f"/v1/appScreenshots/{screenshot_id}", commit_payload)
+    if commit_result:
+        print(f"    {filename} アップロード完了")
+        return screenshot_id
+    print(f"    [WARN] Commit 失敗: {filename}")
+    return None
+
+
+def _reorder_screenshots(screenshot_set_id, screenshot_ids):
+    """並列 Reserve で崩れた表示順をファイル名順に揃える"""
+    payload = {
+        "data": [{"type": "appScreenshots", "id": sid} for sid in screenshot_ids],
+    }
+    result = api_patch(
+        f"/v1/appScreenshotSets/{screenshot_set_id}/relationships/appScreenshots", payload
+    )
+    if result is None:
+        print(f"  [WARN] 表示順の更新失敗: {screenshot_set_id}（続行）")
+
+
+def _prepare_screenshot_set(loc_id, display_type):
+    """Screenshot Set を取得または作成し (set_id, 既存 screenshot のリスト) を返す。
+
+    作成できなければ (None, None)。
+    """
+    cache = current_id_cache()
+    cache_key = f"screenshotSet:{loc_id}:{display_type}"
+    screenshot_set_id = cache.get(cache_key)
+    if screenshot_set_id:
+        print(f"  既存 Screenshot Set（キャッシュ）: {screenshot_set_id}")
+    else:
         existing_sets = api_get(
-            f"/v1/appStoreVersionLocalizations/{ja_loc_id}/appScreenshotSets",
-            {"filter[screenshotDisplayType]": display_type},
+            f"/v1/appStoreVersionLocalizations/{loc_id}/appScreenshotSets",
+            {
+                "filter[screenshotDisplayType]": display_type,
+                "fields[appScreenshotSets]": "screenshotDisplayType",
+                "limit": 1,
+            },
         )
-        screenshot_set_id = None
         if existing_sets and existing_sets.get("data"):
             screenshot_set_id = existing_sets["data"][0]["id"]
             print(f"  既存 Screenshot Set: {screenshot_set_id}")
+            cache.put(cache_key, screenshot_set_id)
 
-            # 既存スクリーンショット枚数チェック
-            existing_shots = api_get(
-                f"/v1/appScreenshotSets/{screenshot_set_id}/appScreenshots"
-            )
-            if existing_shots and existing_shots.get("data") and len(existing_shots["data"]) > 0:
-                print(f"  既に {len(existing_shots['data'])} 枚アップロード済み（スキップ）")
-                continue
-        else:
-            payload = {
-                "data": {
-                    "type": "appScreenshotSets",
-                    "attributes": {
-                        "screenshotDisplayType": display_type,
-                    },
-                    "relationships": {
-                        "appStoreVersionLocalization": {
-                            "data": {
-                                "type": "appStoreVersionLocalizations",
-                                "id": ja_loc_id,
-                            }
-                        }
-                    },
+    if screenshot_set_id:
+        # 既存スクリーンショット（表示順）。チェックサムで差分を取る
+        existing_shots = api_get_all(
+            f"/v1/appScreenshotSets/{screenshot_set_id}/appScreenshots",
+            {
+                "fields[appScreenshots]": "fileName,sourceFileChecksum,assetDeliveryState",
+                "limit": 50,
+            },
+        )
+        existing = (existing_shots or {}).get("data") or []
+        if existing:
+            print(f"  既存 {len(existing)} 枚")
+        return screenshot_set_id, existing
+
+    payload = {
+        "data": {
+            "type": "appScreenshotSets",
+            "attributes": {
+                "screenshotDisplayType": display_type,
+            },
+            "relationships": {
+                "appStoreVersionLocalization": {
+                    "data": {
+                        "type": "appStoreVersionLocalizations",
+                        "id": loc_id,
+                    }
                 }
-            }
-            result = api_post("/v1/appScreenshotSets", payload)
-            if result:
-                screenshot_set_id = result["data"]["id"]
-                print(f"  Screenshot Set 作成: {screenshot_set_id}")
-            else:
-                print(f"  [FAIL] Screenshot Set 作成失敗（スキップ）")
+            },
+        }
+    }
+    result = api_post("/v1/appScreenshotSets", payload)
+    if result:
+        screenshot_set_id = result["data"]["id"]
+        print(f"  Screenshot Set 作成: {screenshot_set_id}")
+        cache.put(cache_key, screenshot_set_id)
+        return screenshot_set_id, []
+    print(f"  [FAIL] Screenshot Set 作成失敗（スキップ）")
+    return None, None
+
+
+def _reconcile_screenshot_set(paths, checksums, existing):
+    """ローカルの PNG と既存 screenshot をチェックサムで突き合わせる。
+
+    戻り値は (そのまま使う {fileName: id}, アップロードする [(path, 既存の有無)],
+    削除する screenshot ID)。
+    """
+    # Commit まで済んだものだけが再利用候補。Reserve だけのものは作り直す
+    usable = {}
+    for shot in existing:
+        attrs = shot.get("attributes") or {}
+        state = (attrs.get("assetDeliveryState") or {}).get("state")
+        if state in ("UPLOAD_COMPLETE", "COMPLETE") and attrs.get("sourceFileChecksum"):
+            usable[shot["id"]] = attrs
+    existing_names = {(shot.get("attributes") or {}).get("fileName") for shot in existing}
+
+    # 同名・同内容を先に確定させ、残りは内容が同じもの（リネーム）を使う
+    kept = {}
+    for same_name in (True, False):
+        for path in paths:
+            filename = os.path.basename(path)
+            if filename in kept:
                 continue
+            match = next(
+                (sid for sid, attrs in usable.items()
+                 if attrs["sourceFileChecksum"] == checksums[path]
+                 and (attrs.get("fileName") == filename or not same_name)),
+                None,
+            )
+            if match:
+                kept[filename] = match
+                del usable[match]
 
-        # 各画像をアップロード
-        for filename in files:
-            filepath = os.path.join(device_dir, filename)
-            filesize = os.path.getsize(filepath)
+    pending = [
+        (path, os.path.basename(path) in existing_names)
+        for path in paths if os.path.basename(path) not in kept
+    ]
 
-            with open(filepath, "rb") as f:
-                file_data = f.read()
+    kept_ids = set(kept.values())
+    stale = [shot["id"] for shot in existing if shot["id"] not in kept_ids]
+    return kept, pending, stale
 
-            md5_digest = hashlib.md5(file_data).hexdigest()
 
-            print(f"    {filename} ({filesize} bytes)...")
+async def _upload_pending(uploads):
+    """[(set_id, path, md5)] を 1 つのイベントループ上で並列アップロードする"""
+    import asyncio
 
-            # Reserve
-            reserve_payload = {
-                "data": {
-                    "type": "appScreenshots",
-                    "attributes": {
-                        "fileName": filename,
-                        "fileSize": filesize,
-                    },
-                    "relationships": {
-                        "appScreenshotSet": {
-                            "data": {
-                                "type": "appScreenshotSets",
-                                "id": screenshot_set_id,
-                            }
-                        }
-                    },
-                }
-            }
-            reserve_result = api_post("/v1/appScreenshots", reserve_payload)
-            if not reserve_result:
-                print(f"    [FAIL] Reserve 失敗: {filename}")
-                continue
+    slots = asyncio.Semaphore(UPLOAD_CONCURRENCY)
 
-            screenshot_id = reserve_result["data"]["id"]
-            upload_ops = reserve_result["data"]["attributes"].get("uploadOperations", [])
+    async def upload(screenshot_set_id, path, md5_digest):
+        async with slots:
+            return await _upload_one_screenshot(screenshot_set_id, path, md5_digest)
 
-            if not upload_ops:
-                print(f"    [WARN] アップロード操作情報なし: {filename}")
-                continue
+    return await asyncio.gather(
+        *(upload(*item) for item in uploads), return_exceptions=True
+    )
 
-            # Upload（各パートを PUT）
-            all_ok = True
-            for op in upload_ops:
-                url = op["url"]
-                offset = op.get("offset", 0)
-                length = op.get("length", filesize)
-                request_headers = {h["name"]: h["value"] for h in op.get("requestHeaders", [])}
-                chunk = file_data[offset:offset + length]
-
-                content_type = request_headers.get("Content-Type", "image/png")
-                if DRY_RUN:
-                    print(f"    [DRY-RUN] PUT {url[:80]}... ({length} bytes)")
-                    continue
 
-                resp = requests.put(url, headers=request_headers, data=chunk)
-                if resp.status_code not in (200, 201):
-                    print(f"    [FAIL] Upload part: {resp.status_code}")
-                    all_ok = False
-                    break
+def upload_screenshots(plan, localization_ids, base_dir, checksums=None):
+    print("\n=== Step 11: スクリーンショットアップロード ===")
+    screenshot_dir = os.path.join(base_dir, plan["screenshots"]["dir"])
 
-            if not all_ok:
-                continue
+    if not os.path.exists(screenshot_dir):
+        print(f"  スクリーンショットディレクトリが見つかりません: {screenshot_dir}")
+        return new_sync_counts()
 
-            # Commit
-            commit_payload = {
-                "data": {
-                    "type": "appScreenshots",
-                    "id": screenshot_id,
-                    "attributes": {
-                        "uploaded": True,
-                        "sourceFileChecksum": md5_digest,
-                    },
-                }
-            }
-            commit_result = api_patch(f"/v1/appScreenshots/{screenshot_id}", commit_payload)
-            if commit_result:
-                print(f"    {filename} アップロード完了")
+    counts = new_sync_counts()
+
+    # ロケール × 表示タイプの各セットを並列に用意する
+    targets = []
+    for entry in screenshot_matrix(plan, screenshot_dir):
+        label = f"{entry['locale']}/{entry['device']}"
+        if not entry["paths"]:
+            print(f"  [{label}] スクリーンショットなし（スキップ）")
+            continue
+        loc_id = localization_ids.get(entry["locale"])
+        if not loc_id:
+            # セットごと送れなかった分も失敗に数え、ステップを失敗にして --resume でやり直す
+            print(f"  [FAIL] [{label}] Version Localization ID がありません（スキップ）")
+            counts["failed"] += len(entry["paths"])
+            continue
+        borrowed = f"、{entry['source']} から流用" if entry["source"] != entry["locale"] else ""
+        print(f"  [{label}] {len(entry['paths'])} 枚のスクリーンショット{borrowed}")
+        targets.append((loc_id, entry["display_type"], entry["paths"]))
+
+    # (screenshot_set_id, [filepath, ...], 既存 screenshot) のリスト
+    upload_sets = []
+    with ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY) as pool:
+        futures = [
+            submit_in_context(pool, _prepare_screenshot_set, loc_id, display_type)
+            for loc_id, display_type, _ in targets
+        ]
+        for (_, _, paths), future in zip(targets, futures):
+            screenshot_set_id, existing = future.result()
+            if screenshot_set_id:
+                upload_sets.append((screenshot_set_id, paths, existing))
             else:
-                print(f"    [WARN] Commit 失敗: {filename}")
+                counts["failed"] += len(paths)
+
+    if not upload_sets:
+        return counts
+
+    # 事前検証で計算済みのチェックサムを使い、足りない分だけ計算する
+    checksums = dict(checksums or {})
+    all_paths = list(dict.fromkeys(
+        path for _, paths, _ in upload_sets for path in paths if path not in checksums
+    ))
+    if all_paths:
+        with ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY) as hash_pool:
+            checksums.update(zip(all_paths, hash_pool.map(_local_md5, all_paths)))
+
+    # 差分を取り、古い screenshot を先に削除する（セットの枚数上限に当たらないように）
+    plans = []
+    for screenshot_set_id, paths, existing in upload_sets:
+        kept, pending, stale = _reconcile_screenshot_set(paths, checksums, existing)
+        counts["unchanged"] += len(kept)
+        leftover = []
+        for screenshot_id in stale:
+            if api_delete(f"/v1/appScreenshots/{screenshot_id}"):
+                counts["deleted"] += 1
+            else:
+                counts["failed"] += 1
+                leftover.append(screenshot_id)
+        plans.append((screenshot_set_id, paths, existing, kept, pending, stale, leftover))
+
+    # 新規・変更分だけを並列アップロード（Reserve / PUT / Commit）
+    uploads = [
+        (screenshot_set_id, path, checksums[path])
+        for screenshot_set_id, _, _, _, pending, _, _ in plans
+        for path, _ in pending
+    ]
+    results = []
+    if uploads:
+        print(f"\n  並列アップロード開始（{len(uploads)} 枚、同時 {UPLOAD_CONCURRENCY} 件）")
+        results = run_sync(_upload_pending(uploads))
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    results = iter(results)
+
+    for screenshot_set_id, paths, existing, kept, pending, stale, leftover in plans:
+        for path, replaced in pending:
+            screenshot_id = next(results)
+            if screenshot_id:
+                kept[os.path.basename(path)] = screenshot_id
+                counts["changed" if replaced else "created"] += 1
+            else:
+                counts["failed"] += 1
+
+        # 表示順をファイル名順に揃える（削除に失敗した古いものは末尾に残る）
+        ordered = [kept[os.path.basename(p)] for p in paths if os.path.basename(p) in kept]
+        ordered += leftover
+        current = [shot["id"] for shot in existing]
+        if pending or stale or ordered != current[:len(ordered)]:
+            if len(ordered) > 1:
+                _reorder_screenshots(screenshot_set_id, ordered)
+        else:
+            print(f"  {screenshot_set_id}: 変更なし")
+
+    return counts
 
 
 # ─────────────────────────────────────────────
-# メイン処理
+# 設定の検証と実行計画
 # ─────────────────────────────────────────────
-def main():
-    global DRY_RUN
+# 設定ファイルのスキーマ。"type" は Python の型、"required" は必須、"fields" は dict のキー、
+# "values" はキーが自由な dict の値、"items" はリストの要素、"enum" は取りうる値。
+# 必須でない値は null でもよく、"_" で始まるキー（_comment など）は無視する
+_TEXT = {"type": str}
+_NUMBER = {"type": (int, float)}
+_LOCALE = {"type": str, "required": True}
+CONFIG_SCHEMA = {"type": dict, "fields": {
+    "app": {"type": dict, "required": True, "fields": {
+        "name": {"type": str, "required": True},
+        "bundleId": {"type": str, "required": True},
+        "sku": {"type": str, "required": True},
+        "primaryLocale": _TEXT,
+        "contentRightsDeclaration": {
+            "type": str,
+            "enum": ["DOES_NOT_USE_THIRD_PARTY_CONTENT", "USES_THIRD_PARTY_CONTENT"],
+        },
+    }},
+    "appInfo": {"type": dict, "fields": {
+        "primaryCategory": _TEXT,
+        "appStoreAgeRating": _TEXT,
+        "brazilAgeRating": _TEXT,
+        "kidsAgeBand": _TEXT,
+    }},
+    "appInfoLocalizations": {"type": list, "items": {"type": dict, "fields": {
+        "locale": _LOCALE, **{key: _TEXT for key in APP_INFO_LOCALIZATION_FIELDS},
+    }}},
+    "version": {"type": dict, "required": True, "fields": {
+        "versionString": {"type": str, "required": True},
+        "copyright": _TEXT,
+        "releaseType": {"type": str, "enum": ["MANUAL", "AFTER_APPROVAL", "SCHEDULED"]},
+        "reviewType": {"type": str, "enum": ["APP_STORE", "NOTARIZATION"]},
+    }},
+    "versionLocalizations": {"type": list, "items": {"type": dict, "fields": {
+        "locale": _LOCALE, **{key: _TEXT for key in VERSION_LOCALIZATION_FIELDS},
+    }}},
+    "reviewDetail": {"type": dict, "fields": {
+        **{key: _TEXT for key in REVIEW_DETAIL_FIELDS}, "demoAccountRequired": {"type": bool},
+    }},
+    "inAppPurchases": {"type": list, "items": {"type": dict, "fields": {
+        "name": {"type": str, "required": True},
+        "productId": {"type": str, "required": True},
+        "type": {"type": str, "enum": ["CONSUMABLE", "NON_CONSUMABLE", "NON_RENEWING_SUBSCRIPTION"]},
+        "reviewNote": _TEXT,
+        "localizations": {"type": list, "items": {"type": dict, "fields": {
+            "locale": _LOCALE,
+            "name": {"type": str, "required": True},
+            "description": _TEXT,
+        }}},
+    }}},
+    "iapPrice": {"type": (int, float, dict), "values": _NUMBER},
+    "iapBaseTerritory": _TEXT,
+    "screenshotDir": _TEXT,
+    "screenshotLocales": {"type": list, "items": {"type": str, "required": True}},
+    "screenshotDisplayTypes": {"type": dict, "values": {"type": str, "required": True}},
+}}
+
+class ConfigError(ValueError):
+    """設定ファイルがスキーマに合わない（API を呼ぶ前に中断する）"""
+
+
+def _type_name(expected):
+    names = {str: "文字列", int: "整数", float: "数値", bool: "真偽値", dict: "オブジェクト",
+             list: "配列"}
+    if isinstance(expected, tuple):
+        return " / ".join(names[t] for t in expected)
+    return names[expected]
+
+
+def check_schema(value, schema, path, errors):
+    """value を schema と照合し、問題を "パス: 内容" の形で errors に追加する"""
+    if value is None:
+        if schema.get("required"):
+            errors.append(f"{path}: 必須です")
+        return
+    expected = schema["type"]
+    # bool は int のサブクラスなので、数値の位置に true / false が来たら弾く
+    if not isinstance(value, expected) or (isinstance(value, bool) and expected is not bool):
+        errors.append(f"{path}: {_type_name(expected)}が必要です（{type(value).__name__}）")
+        return
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: {value!r} は {' / '.join(schema['enum'])} のいずれか")
+    if isinstance(value, dict) and "fields" in schema:
+        for key, child in schema["fields"].items():
+            check_schema(value.get(key), child, f"{path}.{key}" if path else key, errors)
+        for key in value:
+            if key not in schema["fields"] and not key.startswith("_"):
+                name = f"{path}.{key}" if path else key
+                errors.append(f"{name}: 未知のキーです（綴りを確認）")
+    elif isinstance(value, dict) and "values" in schema:
+        for key, child in value.items():
+            check_schema(child, schema["values"], f"{path}.{key}", errors)
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            check_schema(item, schema["items"], f"{path}[{i}]", errors)
+
+
+def _duplicates(values):
+    seen = set()
+    return sorted({v for v in values if v in seen or seen.add(v)})
+
+
+def validate_config_schema(config):
+    """スキーマと、スキーマで書けない整合性（重複・参照先）を確認し、問題のリストを返す"""
+    errors = []
+    check_schema(config, CONFIG_SCHEMA, "", errors)
+    if errors:
+        return errors
+
+    for key in ("appInfoLocalizations", "versionLocalizations"):
+        for locale in _duplicates(loc["locale"] for loc in config.get(key) or []):
+            errors.append(f"{key}: ロケール {locale} が重複しています")
+    iaps = config.get("inAppPurchases") or []
+    for product_id in _duplicates(iap["productId"] for iap in iaps):
+        errors.append(f"inAppPurchases: productId {product_id} が重複しています")
+    for i, iap in enumerate(iaps):
+        for locale in _duplicates(loc["locale"] for loc in iap.get("localizations") or []):
+            errors.append(f"inAppPurchases[{i}].localizations: ロケール {locale} が重複しています")
+
+    prices = config.get("iapPrice")
+    base_territory = config.get("iapBaseTerritory")
+    if isinstance(prices, dict):
+        if not prices:
+            errors.append("iapPrice: 地域が 1 つもありません")
+        elif base_territory and base_territory not in prices:
+            errors.append(f"iapBaseTerritory: {base_territory} が iapPrice にありません")
+
+    version_locales = {loc["locale"] for loc in config.get("versionLocalizations") or []}
+    for locale in config.get("screenshotLocales") or []:
+        if locale not in version_locales:
+            errors.append(f"screenshotLocales: {locale} が versionLocalizations にありません")
+    return errors
+
+
+def freeze(value):
+    """dict は読み取り専用ビュー、list は tuple にして、実行計画を途中で書き換えられないようにする"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def _present(source, fields):
+    """fields のうち値が null でないものだけを取り出す"""
+    return {key: source[key] for key in fields if source.get(key) is not None}
+
+
+def compile_plan(config):
+    """検証済みの設定から、各ステップが送る属性を前計算した読み取り専用の実行計画を作る"""
+    app = config["app"]
+    primary = app.get("primaryLocale") or "ja"
+    version = config["version"]
+    review = config.get("reviewDetail")
+    prices, base_territory = target_prices(config)
+    version_localizations = [
+        (loc["locale"], _present(loc, VERSION_LOCALIZATION_FIELDS))
+        for loc in config.get("versionLocalizations") or []
+    ]
+
+    plan = {
+        "name": app["name"],
+        "bundleId": app["bundleId"],
+        "bundleIdAttributes": {"identifier": app["bundleId"], "name": app["sku"], "platform": "IOS"},
+        "appAttributes": {
+            "name": app["name"],
+            "primaryLocale": primary,
+            "sku": app["sku"],
+            "bundleId": app["bundleId"],
+            "contentRightsDeclaration":
+                app.get("contentRightsDeclaration") or "DOES_NOT_USE_THIRD_PARTY_CONTENT",
+        },
+        "primaryCategory": (config.get("appInfo") or {}).get("primaryCategory") or "EDUCATION",
+        "appInfoLocalizations": [
+            (loc["locale"], _present(loc, APP_INFO_LOCALIZATION_FIELDS))
+            for loc in config.get("appInfoLocalizations") or []
+        ],
+        "versionAttributes": {
+            "versionString": version["versionString"],
+            "copyright": version.get("copyright") or "2026 ktwvai Inc.",
+            "releaseType": version.get("releaseType") or "AFTER_APPROVAL",
+            "reviewType": version.get("reviewType") or "APP_STORE",
+        },
+        "versionLocalizations": version_localizations,
+        "reviewDetail": (
+            {key: review[key] for key in REVIEW_DETAIL_FIELDS if key in review} if review else None
+        ),
+        "inAppPurchases": {
+            iap["productId"]: {
+                "attributes": {
+                    "name": iap["name"],
+                    "productId": iap["productId"],
+                    "inAppPurchaseType": iap.get("type") or "NON_CONSUMABLE",
+                    "reviewNote": iap.get("reviewNote") or "",
+                },
+                "localizations": [
+                    (loc["locale"], {"name": loc["name"], "description": loc.get("description") or ""})
+                    for loc in iap.get("localizations") or []
+                ],
+            }
+            for iap in config.get("inAppPurchases") or []
+        },
+        "prices": prices,
+        "baseTerritory": base_territory,
+        "screenshots": {
+            "dir": config.get("screenshotDir") or "screenshot",
+            "primaryLocale": primary,
+            "locales": config.get("screenshotLocales")
+            or [locale for locale, _ in version_localizations] or [primary],
+            "displayTypes": config.get("screenshotDisplayTypes") or SCREENSHOT_DISPLAY_TYPES,
+        },
+    }
+    plan["operations"] = plan_operations(plan)
+    # 計画の中身のハッシュ（ジャーナルの照合用。_comment などの変更では変わらない）
+    plan["hash"] = attributes_hash({**plan, "prices": {t: str(p) for t, p in prices.items()}})
+    return freeze(plan)
+
+
+def plan_operations(plan):
+    """dry-run で表示する操作の一覧 [(ステップ, メソッド, パス, 属性)]。
+
+    dry-run は API を呼ばないので既存リソースは引かず、実際に送るかどうかはリモートの状態しだい。
+    PATCH|POST は既存があれば更新・なければ作成（内容が同じなら送らない）、POST|skip は既存が
+    あればそれを使い、なければ作成する。初回バージョンでは whatsNew を送らない。
+    """
+    operations = [
+        ("Step 1", "POST|skip", "/v1/bundleIds", plan["bundleIdAttributes"]),
+        ("Step 2", "POST|skip", "/v1/apps", plan["appAttributes"]),
+        ("Step 3", "PATCH", "/v1/appInfos/{appInfoId}", {"primaryCategory": plan["primaryCategory"]}),
+    ]
+    operations += [
+        ("Step 4", "PATCH|POST", f"/v1/appInfoLocalizations [{locale}]", attrs)
+        for locale, attrs in plan["appInfoLocalizations"]
+    ]
+    operations.append(("Step 5", "POST|skip", "/v1/appStoreVersions", plan["versionAttributes"]))
+    operations += [
+        ("Step 6", "PATCH|POST", f"/v1/appStoreVersionLocalizations [{locale}]", attrs)
+        for locale, attrs in plan["versionLocalizations"]
+    ]
+    if plan["reviewDetail"] is not None:
+        operations.append(("Step 7", "PATCH|POST", "/v1/appStoreReviewDetails", plan["reviewDetail"]))
+    for product_id, iap in plan["inAppPurchases"].items():
+        operations.append(("Step 8", "POST|skip", "/v2/inAppPurchases", iap["attributes"]))
+        operations += [
+            ("Step 9", "PATCH|POST", f"/v1/inAppPurchaseLocalizations [{product_id} {locale}]", attrs)
+            for locale, attrs in iap["localizations"]
+        ]
+        operations.append((
+            "Step 10", "POST|skip", f"/v1/inAppPurchasePriceSchedules [{product_id}]",
+            {**{t: str(p) for t, p in plan["prices"].items()}, "baseTerritory": plan["baseTerritory"]},
+        ))
+    return operations
+
+
+def load_plan(config_path):
+    """設定を読み、検証してコンパイルする。
+
+    計画はキャッシュしない（1 回の起動で同じ設定を読み直すことはなく、コンパイルは
+    キャッシュのキーにする設定全体のハッシュと同じくらいの手間なので）。
+    """
+    config = load_config(config_path)
+    errors = validate_config_schema(config)
+    if errors:
+        for message in errors:
+            print(f"  [NG] {message}")
+        raise ConfigError(f"設定エラー {len(errors)} 件")
+    return compile_plan(config)
+
+
+def _short(value, width=48):
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= width else text[:width - 1] + "…"
+
+
+def print_plan(plan, base_dir):
+    """--dry-run: コンパイル済みの計画と、アップロード対象のスクリーンショットを表示する"""
+    print(f"=== 実行計画: {plan['name']} ({plan['bundleId']})  plan {plan['hash'][:12]} ===")
+    print("  （既存リソースは引かないので、実際に送るかはリモートの状態しだい。"
+          "PATCH|POST = 更新か作成、POST|skip = 既存があれば使う、UPLOAD = チェックサムが違う分だけ）")
+    for step, method, path, attrs in plan["operations"]:
+        print(f"  {step:<8} {method:<10} {path}")
+        for key, value in attrs.items():
+            print(f"             {key} = {_short(value)}")
+
+    screenshot_dir = os.path.join(base_dir, plan["screenshots"]["dir"])
+    if os.path.isdir(screenshot_dir):
+        for entry in screenshot_matrix(plan, screenshot_dir):
+            if not entry["paths"]:
+                continue
+            borrowed = f"（{entry['source']} から流用）" if entry["source"] != entry["locale"] else ""
+            print(f"  {'Step 11':<8} {'UPLOAD':<10} [{entry['locale']}/{entry['device']}]"
+                  f" {entry['display_type']} {len(entry['paths'])} 枚{borrowed}")
+    print()
 
-    if len(sys.argv) < 2:
-        print("Usage: python3 register_app.py <config.json> [--dry-run] [--app-id APP_ID]")
-        sys.exit(1)
 
-    config_path = sys.argv[1]
-    DRY_RUN = "--dry-run" in sys.argv
+# ─────────────────────────────────────────────
+# ステップ依存グラフ（DAG）
+# ─────────────────────────────────────────────
+def _step_create_app(plan, bundle_id_resource_id, forced_app_id):
+    if forced_app_id:
+        print(f"\n=== Step 2: アプリ作成 ===")
+        print(f"  --app-id で指定: {forced_app_id}")
+        return {"app_id": forced_app_id}
+    app_id = create_app(plan, bundle_id_resource_id)
+    if not app_id:
+        print("\n❌ アプリ作成失敗。")
+        print("  App Store Connect Web で手動作成後、--app-id オプションで再実行してください。")
+    return {"app_id": app_id}
+
+
+def _step_create_version(plan, app_id):
+    version_id, is_first_version = create_version(plan, app_id)
+    return {"version_id": version_id, "is_first_version": is_first_version}
+
+
+def _step_version_localizations(plan, version_id, is_first_version):
+    localization_ids, counts = setup_version_localizations(plan, version_id, is_first_version)
+    return {"localization_ids": localization_ids, "sync": counts}
+
+
+def _step_iap_localizations(plan, iap_ids):
+    if not iap_ids:
+        return {}
+    return {"sync": setup_iap_localizations(plan, iap_ids)}
+
+
+def _step_upload_screenshots(plan, localization_ids, project_root, screenshot_checksums):
+    counts = upload_screenshots(plan, localization_ids, project_root, screenshot_checksums)
+    if counts["failed"]:
+        # 失敗を残したまま完了扱いにすると --resume で再開できないため、ステップを失敗にする
+        raise RuntimeError(f"スクリーンショット {counts['failed']} 枚のアップロードに失敗")
+    return {"sync": counts}
+
+
+def _step_iap_price(plan, iap_ids):
+    if not iap_ids:
+        return {}
+    return {"sync": setup_iap_price(plan, iap_ids)}
+
+
+# 各ステップは inputs の値をキーワード引数で受け取り、outputs をキーとする dict を返す。
+# 出力が None のステップは失敗扱いとなり、その出力に依存する下流ステップだけがスキップされる。
+# "sync" キーは差分同期の件数としてサマリに表示される。failed が 1 件以上なら出力は下流に渡すが、
+# ステップは失敗扱いでジャーナルに記録しない（--resume で失敗したロケール・価格をやり直す）。
+STEPS = [
+    {
+        "name": "Step 1: Bundle ID",
+        "inputs": ["plan"],
+        "outputs": ["bundle_id_resource_id"],
+        "run": lambda plan: {"bundle_id_resource_id": register_bundle_id(plan)},
+    },
+    {
+        "name": "Step 2: アプリ作成",
+        "inputs": ["plan", "bundle_id_resource_id", "forced_app_id"],
+        "outputs": ["app_id"],
+        "run": _step_create_app,
+    },
+    {
+        "name": "Step 3: App Info",
+        "inputs": ["plan", "app_id"],
+        "outputs": ["app_info_id"],
+        "run": lambda plan, app_id: {"app_info_id": setup_app_info(plan, app_id)},
+    },
+    {
+        "name": "Step 4: App Info Localization",
+        "inputs": ["plan", "app_info_id"],
+        "outputs": [],
+        "run": lambda plan, app_info_id: {
+            "sync": setup_app_info_localizations(plan, app_info_id),
+        },
+    },
+    {
+        "name": "Step 5: Version 作成",
+        "inputs": ["plan", "app_id"],
+        "outputs": ["version_id", "is_first_version"],
+        "run": _step_create_version,
+    },
+    {
+        "name": "Step 6: Version Localization",
+        "inputs": ["plan", "version_id", "is_first_version"],
+        "outputs": ["localization_ids"],
+        "run": _step_version_localizations,
+    },
+    {
+        "name": "Step 7: 審査情報",
+        "inputs": ["plan", "version_id"],
+        "outputs": [],
+        "run": lambda plan, version_id: {"sync": setup_review_detail(plan, version_id)},
+    },
+    {
+        "name": "Step 8: IAP 作成",
+        "inputs": ["plan", "app_id"],
+        "outputs": ["iap_ids"],
+        "run": lambda plan, app_id: {"iap_ids": create_iap(plan, app_id)},
+    },
+    {
+        "name": "Step 9: IAP ローカリゼーション",
+        "inputs": ["plan", "iap_ids"],
+        "outputs": [],
+        "run": _step_iap_localizations,
+    },
+    {
+        "name": "Step 10: IAP 価格設定",
+        "inputs": ["plan", "iap_ids"],
+        "outputs": [],
+        "run": _step_iap_price,
+    },
+    {
+        "name": "Step 11: スクリーンショット",
+        "inputs": ["plan", "localization_ids", "project_root", "screenshot_checksums"],
+        "outputs": [],
+        "run": _step_upload_screenshots,
+    },
+]
+
+
+def _run_step(step, kwargs):
+    _current_step.set(step["name"])
+    started = time.perf_counter()
+    try:
+        outputs = step["run"](**kwargs)
+        error = None
+    except Exception as e:
+        outputs, error = None, e
+    return outputs, error, time.perf_counter() - started
+
+
+def run_step_graph(steps, context, journal=None):
+    """依存が揃ったステップから並列に実行する。
+
+    context は初期入力を含む dict で、各ステップの出力が書き足される。
+    journal に完了記録があるステップは実行せずに出力を復元する。
+    戻り値はステップ名 → {"status": "ok" | "failed" | "skipped", "seconds": float}。
+    """
+    producers = {key: step["name"] for step in steps for key in step["outputs"]}
+    results = {}
+    pending = list(steps)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=STEP_CONCURRENCY) as pool:
+        while pending or running:
+            for step in list(pending):
+                missing = [key for key in step["inputs"] if key not in context]
+                if not missing and journal is not None and \
+                        journal.completed_step(step["name"]) is not None:
+                    context.update(journal.completed_step(step["name"]))
+                    results[step["name"]] = {"status": "ok", "seconds": 0.0, "resumed": True}
+                    pending.remove(step)
+                elif not missing:
+                    kwargs = {key: context[key] for key in step["inputs"]}
+                    running[submit_in_context(pool, _run_step, step, kwargs)] = step
+                    pending.remove(step)
+                elif any(
+                    key not in producers or results.get(producers[key], {}).get("status")
+                    in ("failed", "skipped")
+                    for key in missing
+                ):
+                    results[step["name"]] = {"status": "skipped", "seconds": 0.0}
+                    pending.remove(step)
+
+            if not running:
+                continue
 
-    # --app-id オプション（アプリ作成が API 不可の場合に手動指定）
-    forced_app_id = None
-    if "--app-id" in sys.argv:
-        idx = sys.argv.index("--app-id")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                outputs, error, seconds = future.result()
+                if error is not None:
+                    print(f"\n  [FAIL] {step['name']}: {error!r}")
+                    status = "failed"
+                elif any(outputs.get(key) is None for key in step["outputs"]):
+                    status = "failed"
+                elif (outputs.get("sync") or {}).get("failed"):
+                    # 一部のロケール・価格が失敗: 出力は下流に渡すが、--resume でやり直すよう記録しない
+                    status = "partial"
+                else:
+                    status = "ok"
+                results[step["name"]] = {
+                    "status": "failed" if status == "partial" else status, "seconds": seconds,
+                }
+                if status in ("ok", "partial"):
+                    sync = outputs.pop("sync", None)
+                    if sync:
+                        results[step["name"]]["sync"] = sync
+                    context.update(outputs)
+                if status == "ok" and journal is not None:
+                    journal.record_step(step["name"], outputs)
+
+    return {step["name"]: results[step["name"]] for step in steps}
+
+
+def pad(text, width):
+    """全角文字を 2 桁として左寄せする"""
+    used = sum(2 if unicodedata.east_asian_width(ch) in "WF" else 1 for ch in text)
+    return text + " " * max(0, width - used)
+
+
+def print_step_timings(results):
+    marks = {"ok": "✓", "failed": "✗", "skipped": "-"}
+    print("  ステップ別所要時間:")
+    for name, result in results.items():
+        if result["status"] == "skipped":
+            detail = "(スキップ)"
+        elif result.get("resumed"):
+            detail = "(ジャーナルから再開)"
+        else:
+            detail = f"{result['seconds']:6.2f}s"
+            if result["status"] == "failed":
+                detail += "  (失敗)"
+            if result.get("sync"):
+                detail += f"  {format_sync_counts(result['sync'])}"
+        print(f"    {marks[result['status']]} {pad(name, 32)} {detail}")
+
+
+# ─────────────────────────────────────────────
+# メイン処理
+# ─────────────────────────────────────────────
+def option_value(name, default=None):
+    """`--name VALUE` 形式のオプション値を返す"""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
         if idx + 1 < len(sys.argv):
-            forced_app_id = sys.argv[idx + 1]
+            return sys.argv[idx + 1]
+    return default
 
-    if DRY_RUN:
-        print("🔍 DRY-RUN モード: API コールは実行されません\n")
 
-    # テンプレート読み込み
+def load_config(config_path):
     with open(config_path, "r", encoding="utf-8") as f:
-        config = json.load(f)
-
-    base_dir = os.path.dirname(os.path.abspath(config_path))
-    # screenshotDir が相対パスの場合、プロジェクトルート基準
-    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return json.load(f)
+
+
+def validate_config(config_path):
+    """設定とスクリーンショットを API を呼ばずに検証する（--validate）。問題がなければ True"""
+    try:
+        plan = load_plan(config_path)
+        preflight_screenshots(plan, PROJECT_ROOT)
+    except (OSError, ValueError) as e:
+        print(f"  [NG] {config_path}: {e}")
+        return False
+    print(f"  [OK] {config_path}")
+    return True
+
+
+def list_configs(config_dir):
+    return sorted(
+        os.path.join(config_dir, f) for f in os.listdir(config_dir) if f.endswith(".json")
+    )
+
+
+def run_app(config_path, forced_app_id=None):
+    """1 アプリ分の登録を実行し、結果レポートを返す"""
+    # テンプレートを読み、検証して実行計画にする（設定の誤りはここで止まる）
+    plan = load_plan(config_path)
+
+    # bundle ID + 設定パスごとのリソース ID キャッシュ
+    id_cache = IdCache(id_cache_key(plan["bundleId"], config_path), read=USE_ID_CACHE)
+    _current_id_cache.set(id_cache)
+    _current_app.set(plan["bundleId"])
+    _current_prefetch.set({})
+
+    # 再開用ジャーナル（実行計画のハッシュが一致するときだけ --resume で再利用）
+    config_key = hashlib.sha1(os.path.abspath(config_path).encode("utf-8")).hexdigest()[:8]
+    journal = RunJournal(
+        os.path.join(JOURNAL_DIR, f"{plan['bundleId']}-{config_key}.json"),
+        plan["hash"],
+        resume=RESUME,
+    )
+    if journal.resumed:
+        print("ジャーナルから再開します")
+
+    project_root = PROJECT_ROOT
 
     print(f"=== App Store Connect 自動登録 ===")
-    print(f"アプリ名:    {config['app']['name']}")
-    print(f"Bundle ID:  {config['app']['bundleId']}")
-    print(f"SKU:        {config['app']['sku']}")
+    print(f"アプリ名:    {plan['name']}")
+    print(f"Bundle ID:  {plan['bundleId']}")
+    print(f"SKU:        {plan['appAttributes']['sku']}")
     print(f"設定ファイル: {config_path}")
 
+    # Apple に弾かれる画像はアップロード前に全部見つけて止める（API は 1 回も呼ばない）
+    screenshot_checksums = preflight_screenshots(plan, project_root)
+
+    context = {
+        "plan": plan,
+        "forced_app_id": forced_app_id,
+        "project_root": project_root,
+        "screenshot_checksums": screenshot_checksums,
+    }
+    started = time.perf_counter()
+    results = run_step_graph(STEPS, context, journal)
+    elapsed = time.perf_counter() - started
+
     summary = {}
+    for label, key in [
+        ("Bundle ID", "bundle_id_resource_id"),
+        ("App ID", "app_id"),
+        ("App Info ID", "app_info_id"),
+        ("Version ID", "version_id"),
+    ]:
+        if context.get(key):
+            summary[label] = context[key]
 
-    # Step 1: Bundle ID
-    bundle_id_resource_id = register_bundle_id(config)
-    if not bundle_id_resource_id:
-        print("\n❌ Bundle ID 登録失敗。中断します。")
-        sys.exit(1)
-    summary["Bundle ID"] = bundle_id_resource_id
+    failed = [name for name, result in results.items() if result["status"] == "failed"]
+    if not failed:
+        journal.discard()
 
-    # Step 2: アプリ作成
-    if forced_app_id:
-        app_id = forced_app_id
-        print(f"\n=== Step 2: アプリ作成 ===")
-        print(f"  --app-id で指定: {app_id}")
-    else:
-        app_id = create_app(config, bundle_id_resource_id)
-        if not app_id:
-            print("\n❌ アプリ作成失敗。中断します。")
-            print("  App Store Connect Web で手動作成後、--app-id オプションで再実行してください。")
-            sys.exit(1)
-    summary["App ID"] = app_id
+    return {
+        "config_path": config_path,
+        "name": plan["name"],
+        "bundleId": plan["bundleId"],
+        "summary": summary,
+        "results": results,
+        "elapsed": elapsed,
+        "failed": failed,
+        "error": None,
+        "cache": {"hits": id_cache.hits, "misses": id_cache.misses},
+    }
 
-    # Step 3: App Info (カテゴリ設定)
-    app_info_id = setup_app_info(config, app_id)
-    if app_info_id:
-        summary["App Info ID"] = app_info_id
 
-        # Step 4: App Info Localization
-        setup_app_info_localizations(config, app_info_id)
+def print_app_summary(report):
+    print("\n" + "=" * 50)
+    print("❌ 登録サマリ（失敗あり）" if report["failed"] else "✅ 登録完了サマリ")
+    print("=" * 50)
+    for key, value in report["summary"].items():
+        print(f"  {key}: {value}")
+    print()
+    print_step_timings(report["results"])
+    print(f"  合計: {report['elapsed']:.2f}s")
+    print(f"  ID キャッシュ: ヒット {report['cache']['hits']} / ミス {report['cache']['misses']}")
+    print()
+    print_trace_summary(report["bundleId"])
+    print()
+    print_rate_limit_stats()
+    print()
+
+
+# ─────────────────────────────────────────────
+# フリートモード（複数アプリを 1 プロセスで処理）
+# ─────────────────────────────────────────────
+def _run_fleet_app(config_path):
+    try:
+        return run_app(config_path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"\n  [FAIL] {config_path}: {e!r}")
+        return {
+            "config_path": config_path,
+            "name": os.path.basename(config_path),
+            "bundleId": "-",
+            "summary": {},
+            "results": {},
+            "elapsed": 0.0,
+            "failed": [],
+            "error": repr(e),
+            "cache": {"hits": 0, "misses": 0},
+        }
+
 
-    # Step 5: Version 作成
-    version_id, is_first_version = create_version(config, app_id)
-    if version_id:
-        summary["Version ID"] = version_id
+def run_fleet(config_dir):
+    """ディレクトリ内の全設定を並列に処理する（トークン・接続プールは共有）"""
+    config_paths = list_configs(config_dir)
+    if not config_paths:
+        print(f"設定ファイルが見つかりません: {config_dir}")
+        return []
+
+    print(f"=== フリートモード: {len(config_paths)} アプリ（同時 {FLEET_CONCURRENCY} 件）===\n")
+    with ThreadPoolExecutor(max_workers=FLEET_CONCURRENCY) as pool:
+        reports = list(pool.map(_run_fleet_app, config_paths))
+    return reports
+
+
+def print_fleet_summary(reports, elapsed):
+    print("\n" + "=" * 78)
+    print("フリート サマリ")
+    print("=" * 78)
+    print(f"  {pad('アプリ', 24)} {pad('Bundle ID', 28)} {'ok/ng/skip':>11} {'時間':>5}")
+    for report in reports:
+        counts = {"ok": 0, "failed": 0, "skipped": 0}
+        for result in report["results"].values():
+            counts[result["status"]] += 1
+        if report["error"]:
+            status = "✗ 設定エラー"
+        elif report["failed"]:
+            status = "✗ " + ", ".join(report["failed"])
+        else:
+            status = "✓"
+        print(
+            f"  {pad(report['name'][:12], 24)} {pad(report['bundleId'], 28)}"
+            f" {counts['ok']:>4}/{counts['failed']}/{counts['skipped']:<4}"
+            f" {report['elapsed']:6.1f}s  {status}"
+        )
+    ok = sum(1 for r in reports if not r["failed"] and not r["error"])
+    print(f"\n  成功 {ok}/{len(reports)} アプリ  合計 {elapsed:.1f}s\n")
+    print_trace_summary()
+    print()
+    print_rate_limit_stats()
+    print()
 
-        # Step 6: Version Localization
-        localization_ids = setup_version_localizations(config, version_id, is_first_version)
 
-        # Step 7: 審査情報
-        setup_review_detail(config, version_id)
+# ─────────────────────────────────────────────
+# リモート状態のエクスポート（読み取り専用。--export）
+# ─────────────────────────────────────────────
+# スクリーンショットは設定に書けないので、スナップショットの _screenshots に残す
+SCREENSHOT_EXPORT_FIELDS = ["fileName", "fileSize", "sourceFileChecksum", "assetDeliveryState"]
 
-        # Step 11: スクリーンショット（Version Localization が必要）
-        if localization_ids:
-            upload_screenshots(config, localization_ids, project_root)
 
-    # Step 8-10: IAP
-    iap_ids = create_iap(config, app_id)
-    if iap_ids:
-        setup_iap_localizations(iap_ids)
-        setup_iap_price(config, iap_ids)
+def _schema_fields(key):
+    """CONFIG_SCHEMA の key（dict）のフィールド名。スナップショットを設定と同じ形にするのに使う"""
+    return list(CONFIG_SCHEMA["fields"][key]["fields"])
 
-    # 完了サマリ
-    print("\n" + "=" * 50)
-    print("✅ 登録完了サマリ")
-    print("=" * 50)
-    for key, value in summary.items():
-        print(f"  {key}: {value}")
+
+def _attributes(resource, fields):
+    """fields の属性を取り出す（ない属性は null にして、設定との差分で見えるようにする）"""
+    attrs = (resource or {}).get("attributes") or {}
+    return {key: attrs.get(key) for key in fields}
+
+
+def _related_id(resource, relationship):
+    return ((((resource or {}).get("relationships") or {}).get(relationship) or {}).get("data") or {}).get("id")
+
+
+def _price_number(text):
+    """"600.0" → 600、"4.99" → 4.99（設定の iapPrice と同じ書き方）"""
+    value = Decimal(text)
+    return int(value) if value == value.to_integral_value() else float(value)
+
+
+def _fetch_children(path, params):
+    """include で先読み済みならそれを、なければ全ページを取得して data を返す"""
+    document = take_prefetched(path) or api_get_all(path, params)
+    return (document or {}).get("data") or []
+
+
+def _find_app(bundle_id):
+    for page in iter_pages("/v1/apps", {
+        "filter[bundleId]": bundle_id,
+        "fields[apps]": ",".join(_schema_fields("app")),
+    }):
+        app = next((a for a in page.get("data") or []
+                    if a["attributes"].get("bundleId") == bundle_id), None)
+        if app:
+            return app
+    return None
+
+
+def _export_app_info(app_id):
+    """(App Info, [App Info Localization])"""
+    _current_step.set("export: App Info")
+    document = api_get(f"/v1/apps/{app_id}/appInfos", {
+        "fields[appInfos]": ",".join(_schema_fields("appInfo") + ["appInfoLocalizations"]),
+        "include": "appInfoLocalizations,primaryCategory",
+        "fields[appInfoLocalizations]": ",".join(["locale"] + APP_INFO_LOCALIZATION_FIELDS),
+        "limit[appInfoLocalizations]": 50,
+    })
+    if not document or not document.get("data"):
+        return None, []
+    remember_included(document, "appInfoLocalizations", "/v1/appInfos/{id}/appInfoLocalizations")
+    app_info = document["data"][0]
+    localizations = _fetch_children(f"/v1/appInfos/{app_info['id']}/appInfoLocalizations", {
+        "fields[appInfoLocalizations]": ",".join(["locale"] + APP_INFO_LOCALIZATION_FIELDS),
+        "limit": 50,
+    })
+    return app_info, localizations
+
+
+def _export_version(app_id):
+    """編集中のバージョン（なければ最新のバージョン）→ (Version, [Version Localization], 審査情報)"""
+    _current_step.set("export: Version")
+    path = f"/v1/apps/{app_id}/appStoreVersions"
+    params = {
+        "fields[appStoreVersions]": ",".join(
+            _schema_fields("version")
+            + ["appStoreState", "appStoreVersionLocalizations", "appStoreReviewDetail"]),
+        "include": "appStoreVersionLocalizations,appStoreReviewDetail",
+        "fields[appStoreVersionLocalizations]": ",".join(["locale"] + VERSION_LOCALIZATION_FIELDS),
+        "fields[appStoreReviewDetails]": ",".join(REVIEW_DETAIL_FIELDS),
+        "limit[appStoreVersionLocalizations]": 50,
+        "limit": 1,
+    }
+    document = api_get(path, {**params, "filter[appStoreState]": ",".join(EDITABLE_VERSION_STATES)})
+    if not document or not document.get("data"):
+        document = api_get(path, params)
+    if not document or not document.get("data"):
+        return None, [], None
+    remember_included(document, "appStoreVersionLocalizations",
+                      "/v1/appStoreVersions/{id}/appStoreVersionLocalizations")
+    remember_included(document, "appStoreReviewDetail",
+                      "/v1/appStoreVersions/{id}/appStoreReviewDetail")
+    version = document["data"][0]
+
+    localizations = _fetch_children(f"/v1/appStoreVersions/{version['id']}/appStoreVersionLocalizations", {
+        "fields[appStoreVersionLocalizations]": ",".join(["locale"] + VERSION_LOCALIZATION_FIELDS),
+        "limit": 50,
+    })
+    review_path = f"/v1/appStoreVersions/{version['id']}/appStoreReviewDetail"
+    review = take_prefetched(review_path) or api_get(review_path, {
+        "fields[appStoreReviewDetails]": ",".join(REVIEW_DETAIL_FIELDS),
+    })
+    return version, localizations, (review or {}).get("data")
+
+
+def _export_iaps(app_id):
+    _current_step.set("export: IAP")
+    document = api_get_all(f"/v1/apps/{app_id}/inAppPurchasesV2", {
+        "fields[inAppPurchases]": "name,productId,inAppPurchaseType,reviewNote,inAppPurchaseLocalizations",
+        "include": "inAppPurchaseLocalizations",
+        "fields[inAppPurchaseLocalizations]": "locale,name,description",
+        "limit[inAppPurchaseLocalizations]": 50,
+        "limit": 200,
+    })
+    if not document:
+        return []
+    remember_included(document, "inAppPurchaseLocalizations",
+                      "/v2/inAppPurchases/{id}/inAppPurchaseLocalizations")
+    return document["data"]
+
+
+def _export_iap_localizations(iap_id):
+    _current_step.set("export: IAP Localization")
+    return _fetch_children(f"/v2/inAppPurchases/{iap_id}/inAppPurchaseLocalizations", {
+        "fields[inAppPurchaseLocalizations]": "locale,name,description",
+        "limit": 50,
+    })
+
+
+def _export_iap_prices(iap_id):
+    """いま有効な手動価格 → ({地域: 価格}, 基準地域)。価格スケジュールがなければ ({}, None)"""
+    _current_step.set("export: IAP 価格")
+    schedule = api_get(f"/v2/inAppPurchases/{iap_id}/iapPriceSchedule", {
+        "fields[inAppPurchasePriceSchedules]": "baseTerritory,manualPrices",
+        "include": "baseTerritory",
+    })
+    if not schedule or not schedule.get("data"):
+        return {}, None
+    document = api_get_all(f"/v1/inAppPurchasePriceSchedules/{schedule['data']['id']}/manualPrices", {
+        "fields[inAppPurchasePrices]": "startDate,endDate,inAppPurchasePricePoint,territory",
+        "include": "inAppPurchasePricePoint,territory",
+        "fields[inAppPurchasePricePoints]": "customerPrice",
+        "limit": 200,
+    }) or {}
+    points = {r["id"]: r for r in document.get("included") or [] if r["type"] == "inAppPurchasePricePoints"}
+
+    # 予約済みの値上げ・終了した価格は除く（日付は YYYY-MM-DD なので文字列で比べられる）
+    today = time.strftime("%Y-%m-%d")
+    prices = {}
+    for price in document.get("data") or []:
+        attrs = price.get("attributes") or {}
+        if (attrs.get("startDate") or "") > today or (attrs.get("endDate") or "9999") < today:
+            continue
+        territory = _related_id(price, "territory")
+        point = points.get(_related_id(price, "inAppPurchasePricePoint"))
+        if territory and point:
+            prices[territory] = _price_number(point["attributes"]["customerPrice"])
+    return prices, _related_id(schedule["data"], "baseTerritory")
+
+
+def _export_screenshot_sets(loc_id):
+    """{表示タイプ: [スクリーンショット]}（表示順）"""
+    _current_step.set("export: Screenshots")
+    document = api_get_all(f"/v1/appStoreVersionLocalizations/{loc_id}/appScreenshotSets", {
+        "fields[appScreenshotSets]": "screenshotDisplayType,appScreenshots",
+        "include": "appScreenshots",
+        "fields[appScreenshots]": ",".join(SCREENSHOT_EXPORT_FIELDS),
+        "limit[appScreenshots]": 50,
+        "limit": 50,
+    })
+    if not document:
+        return {}
+    remember_included(document, "appScreenshots", "/v1/appScreenshotSets/{id}/appScreenshots")
+    shot_sets = {}
+    for shot_set in document["data"]:
+        shots = _fetch_children(f"/v1/appScreenshotSets/{shot_set['id']}/appScreenshots", {
+            "fields[appScreenshots]": ",".join(SCREENSHOT_EXPORT_FIELDS),
+            "limit": 50,
+        })
+        shot_sets[shot_set["attributes"]["screenshotDisplayType"]] = [
+            {
+                **_attributes(shot, ["fileName", "fileSize", "sourceFileChecksum"]),
+                "state": (shot["attributes"].get("assetDeliveryState") or {}).get("state"),
+            }
+            for shot in shots
+        ]
+    return shot_sets
+
+
+def fetch_remote_state(bundle_id):
+    """bundleId のアプリの現状を並列に取得する（GET だけ）。アプリがなければ None。
+
+    アプリを引いた後、App Info・Version・IAP の各系列を同時に取り、それぞれの子
+    （Localization・価格・スクリーンショット）は親が取れしだい投げる。
+    """
+    app = _find_app(bundle_id)
+    if app is None:
+        return None
+
+    with ThreadPoolExecutor(max_workers=EXPORT_CONCURRENCY) as pool:
+        app_info_future = submit_in_context(pool, _export_app_info, app["id"])
+        version_future = submit_in_context(pool, _export_version, app["id"])
+        iaps = submit_in_context(pool, _export_iaps, app["id"]).result()
+        iap_futures = [
+            (
+                iap,
+                submit_in_context(pool, _export_iap_localizations, iap["id"]),
+                submit_in_context(pool, _export_iap_prices, iap["id"]),
+            )
+            for iap in iaps
+        ]
+        version, version_localizations, review_detail = version_future.result()
+        screenshot_futures = [
+            (loc["attributes"]["locale"], submit_in_context(pool, _export_screenshot_sets, loc["id"]))
+            for loc in version_localizations
+        ]
+        app_info, app_info_localizations = app_info_future.result()
+
+        return {
+            "app": app,
+            "appInfo": app_info,
+            "appInfoLocalizations": app_info_localizations,
+            "version": version,
+            "versionLocalizations": version_localizations,
+            "reviewDetail": review_detail,
+            "inAppPurchases": [
+                (iap, localizations.result(), prices.result())
+                for iap, localizations, prices in iap_futures
+            ],
+            "screenshots": [(locale, future.result()) for locale, future in screenshot_futures],
+        }
+
+
+def _sorted_localizations(resources, fields, primary):
+    """主言語を先頭に、あとはロケール順"""
+    entries = [{"locale": r["attributes"]["locale"], **_attributes(r, fields)} for r in resources]
+    return sorted(entries, key=lambda loc: (loc["locale"] != primary, loc["locale"]))
+
+
+def build_snapshot(remote, config):
+    """取得結果を設定ファイルと同じ形にする。
+
+    screenshotDir・screenshotDisplayTypes のディレクトリ名はローカルの設定なので config から引き継ぐ。
+    設定に書けない情報（リソース ID・状態・スクリーンショットの中身）は "_" で始まるキーに入れる
+    （スキーマでは無視されるので、そのまま設定の雛形にも使える）。
+    """
+    app = remote["app"]
+    primary = app["attributes"].get("primaryLocale") or "ja"
+    version = remote["version"]
+
+    snapshot = {
+        "_comment": f"App Store Connect から書き出した現状（{time.strftime('%Y-%m-%d %H:%M:%S')}）",
+        "_export": {
+            "appId": app["id"],
+            "appInfoId": (remote["appInfo"] or {}).get("id"),
+            "versionId": (version or {}).get("id"),
+            "appStoreState": ((version or {}).get("attributes") or {}).get("appStoreState"),
+        },
+        "app": _attributes(app, _schema_fields("app")),
+    }
+    if remote["appInfo"]:
+        snapshot["appInfo"] = {
+            "primaryCategory": _related_id(remote["appInfo"], "primaryCategory"),
+            **_attributes(remote["appInfo"],
+                          [key for key in _schema_fields("appInfo") if key != "primaryCategory"]),
+        }
+    snapshot["appInfoLocalizations"] = _sorted_localizations(
+        remote["appInfoLocalizations"], APP_INFO_LOCALIZATION_FIELDS, primary)
+    if version:
+        snapshot["version"] = _attributes(version, _schema_fields("version"))
+    snapshot["versionLocalizations"] = _sorted_localizations(
+        remote["versionLocalizations"], VERSION_LOCALIZATION_FIELDS, primary)
+
+    iaps = sorted(remote["inAppPurchases"], key=lambda entry: entry[0]["attributes"]["productId"])
+    snapshot["inAppPurchases"] = [
+        {
+            "name": iap["attributes"].get("name"),
+            "productId": iap["attributes"]["productId"],
+            "type": iap["attributes"].get("inAppPurchaseType"),
+            "reviewNote": iap["attributes"].get("reviewNote"),
+            "localizations": _sorted_localizations(localizations, ["name", "description"], primary),
+        }
+        for iap, localizations, _ in iaps
+    ]
+
+    # iapPrice は全 IAP 共通。IAP ごとに違えば先頭のものを使い、全 IAP 分を _iapPrices に残す
+    priced = [(iap["attributes"]["productId"], prices) for iap, _, prices in iaps if prices[0]]
+    if priced:
+        prices, base_territory = priced[0][1]
+        prices = dict(sorted(prices.items(), key=lambda item: (item[0] != base_territory, item[0])))
+        if list(prices) == ["JPN"] and base_territory in (None, "JPN"):
+            snapshot["iapPrice"] = prices["JPN"]
+        else:
+            snapshot["iapPrice"] = prices
+            snapshot["iapBaseTerritory"] = base_territory
+        if any(entry != priced[0][1] for _, entry in priced[1:]):
+            snapshot["_iapPrices"] = {
+                product_id: {"prices": entry[0], "baseTerritory": entry[1]} for product_id, entry in priced
+            }
+
+    screenshots = {locale: shot_sets for locale, shot_sets in remote["screenshots"] if shot_sets}
+    if config.get("screenshotDir"):
+        snapshot["screenshotDir"] = config["screenshotDir"]
+    if screenshots:
+        directories = {
+            display_type: directory
+            for directory, display_type in (config.get("screenshotDisplayTypes") or SCREENSHOT_DISPLAY_TYPES).items()
+        }
+        display_types = sorted({display_type for shot_sets in screenshots.values() for display_type in shot_sets})
+        snapshot["screenshotLocales"] = [
+            loc["locale"] for loc in snapshot["versionLocalizations"] if loc["locale"] in screenshots
+        ]
+        snapshot["screenshotDisplayTypes"] = {
+            directories.get(display_type, display_type.lower()): display_type for display_type in display_types
+        }
+
+    if remote["reviewDetail"]:
+        snapshot["reviewDetail"] = _attributes(remote["reviewDetail"], REVIEW_DETAIL_FIELDS)
+    if screenshots:
+        snapshot["_screenshots"] = screenshots
+    return snapshot
+
+
+def write_snapshot(snapshot, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def export_app(config_path, export_dir):
+    """設定の bundleId のアプリの現状を export_dir/<設定ファイル名> に書き出し、結果レポートを返す"""
+    report = {"config_path": config_path, "bundleId": "-", "output": None, "elapsed": 0.0,
+              "error": None, "warnings": []}
+    started = time.perf_counter()
+    try:
+        config = load_config(config_path)
+        report["bundleId"] = config["app"]["bundleId"]
+        _current_app.set(report["bundleId"])
+        _current_step.set("export: App")
+        _current_prefetch.set({})
+        remote = fetch_remote_state(report["bundleId"])
+        if remote is None:
+            report["error"] = "App Store Connect にアプリがありません"
+        else:
+            # 読んだバージョンの状態で、登録用の ID キャッシュも更新しておく
+            note_version_state(IdCache(id_cache_key(report["bundleId"], config_path)),
+                               config["version"]["versionString"], remote["version"])
+            snapshot = build_snapshot(remote, config)
+            report["warnings"] = validate_config_schema(snapshot)
+            report["output"] = os.path.join(export_dir, os.path.basename(config_path))
+            write_snapshot(snapshot, report["output"])
+    except (OSError, ValueError, KeyError, TypeError, RuntimeError) as e:
+        report["error"] = repr(e)
+    report["elapsed"] = time.perf_counter() - started
+
+    if report["error"]:
+        print(f"  [NG] {config_path}: {report['error']}")
+    else:
+        print(f"  [OK] {config_path} → {report['output']}（{report['elapsed']:.1f}s）")
+    # スキーマに合わない = App Store Connect 側が設定として不完全（バージョンがないなど）
+    for warning in report["warnings"]:
+        print(f"  [WARN] {config_path}: {warning}")
+    return report
+
+
+def run_export(config_paths, export_dir):
+    """複数アプリを FLEET_CONCURRENCY 件ずつ並列に書き出す"""
+    print(f"=== エクスポート: {len(config_paths)} アプリ（同時 {FLEET_CONCURRENCY} 件）→ {export_dir} ===\n")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=FLEET_CONCURRENCY) as pool:
+        reports = list(pool.map(functools.partial(export_app, export_dir=export_dir), config_paths))
+    ok = sum(1 for r in reports if not r["error"])
+    print(f"\n  書き出し {ok}/{len(reports)} アプリ  合計 {time.perf_counter() - started:.1f}s\n")
+    print_trace_summary()
     print()
+    print_rate_limit_stats()
+    print()
+    return reports
+
+
+def main():
+    global DRY_RUN, UPLOAD_CONCURRENCY, FLEET_CONCURRENCY, USE_ID_CACHE, RESUME, \
+        MAX_IN_FLIGHT, FIX_SCREENSHOTS, READ_ONLY, _in_flight
+
+    if len(sys.argv) < 2:
+        print("Usage: python3 register_app.py <config.json> [--dry-run] [--app-id APP_ID]"
+              " [--upload-concurrency N] [--no-cache] [--resume] [--fix] [--trace out.json]")
+        print("       python3 register_app.py --fleet <config_dir> [--dry-run]"
+              " [--fleet-concurrency N] [--max-in-flight N] [--trace out.json]")
+        print("       python3 register_app.py <config.json> --validate")
+        print("       python3 register_app.py --fleet <config_dir> --validate")
+        print("       python3 register_app.py <config.json> --export [out_dir]")
+        print("       python3 register_app.py --fleet <config_dir> --export [out_dir]")
+        sys.exit(1)
+
+    config_path = sys.argv[1]
+    DRY_RUN = "--dry-run" in sys.argv
 
+    # --no-cache オプション（ID キャッシュを読まずに全件再取得）
+    USE_ID_CACHE = "--no-cache" not in sys.argv
+
+    # --resume オプション（前回失敗したランの続きから実行）
+    RESUME = "--resume" in sys.argv
+
+    # --fleet オプション（ディレクトリ内の全設定を一括処理）
+    fleet_dir = option_value("--fleet")
+    FLEET_CONCURRENCY = max(1, int(option_value("--fleet-concurrency", FLEET_CONCURRENCY)))
+
+    # --max-in-flight オプション（全アプリ合計の同時 API リクエスト数）
+    MAX_IN_FLIGHT = max(1, int(option_value("--max-in-flight", MAX_IN_FLIGHT)))
+    _in_flight = threading.BoundedSemaphore(MAX_IN_FLIGHT)
+
+    # --trace オプション（全 API 呼び出しのタイミングを書き出す。.jsonl なら JSON Lines）
+    trace_path = option_value("--trace")
+
+    # --app-id オプション（アプリ作成が API 不可の場合に手動指定）
+    forced_app_id = option_value("--app-id")
+
+    # --fix オプション（事前検証で見つかったアルファ・色形式の問題を Pillow で自動修正）
+    FIX_SCREENSHOTS = "--fix" in sys.argv
+
+    # --upload-concurrency オプション（スクリーンショット同時アップロード数）
+    UPLOAD_CONCURRENCY = max(1, int(option_value("--upload-concurrency", UPLOAD_CONCURRENCY)))
+
+    # --validate オプション（設定とスクリーンショットだけを検証。API もトークンも使わない）
+    if "--validate" in sys.argv:
+        config_paths = list_configs(fleet_dir) if fleet_dir else [config_path]
+        results = [validate_config(path) for path in config_paths]
+        print(f"\n検証: {sum(results)}/{len(results)} 件 OK")
+        sys.exit(0 if results and all(results) else 1)
+
+    # --export オプション（App Store Connect の現状を設定と同じ形の JSON に書き出す。GET だけを送る）
+    if "--export" in sys.argv:
+        export_dir = option_value("--export")
+        if export_dir is None or export_dir.startswith("--"):
+            export_dir = EXPORT_DIR
+        READ_ONLY = True
+        config_paths = list_configs(fleet_dir) if fleet_dir else [config_path]
+        reports = run_export(config_paths, export_dir)
+        save_id_cache()
+        close_sessions()
+        write_trace(trace_path)
+        sys.exit(0 if reports and not any(r["error"] for r in reports) else 1)
+
+    # --dry-run オプション（コンパイル済みの実行計画を表示するだけ。API もトークンも使わない）
+    if DRY_RUN:
+        print("🔍 DRY-RUN モード: API コールは実行されません\n")
+        config_paths = list_configs(fleet_dir) if fleet_dir else [config_path]
+        ok = True
+        for path in config_paths:
+            try:
+                print_plan(load_plan(path), PROJECT_ROOT)
+            except (OSError, ValueError) as e:
+                print(f"  [NG] {path}: {e}")
+                ok = False
+        sys.exit(0 if config_paths and ok else 1)
+
+    if fleet_dir:
+        started = time.perf_counter()
+        reports = run_fleet(fleet_dir)
+        print_fleet_summary(reports, time.perf_counter() - started)
+        save_id_cache()
+        save_price_point_cache()
+        close_sessions()
+        write_trace(trace_path)
+        if not reports or any(r["failed"] or r["error"] for r in reports):
+            sys.exit(1)
+        return
+
+    try:
+        report = run_app(config_path, forced_app_id)
+    except (ConfigError, PreflightError) as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
+    print_app_summary(report)
+
+    save_id_cache()
+    save_price_point_cache()
+    close_sessions()
+    write_trace(trace_path)
+    if report["failed"]:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
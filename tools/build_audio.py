@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""ディクテーション音声 ビルドスクリプト
+
+Assets/Audio/Dictation/levelN_NNN.mp3 を問題データ（Assets/Dictation/level*.json）と突き合わせ、
+ffprobe で長さ・ビットレートを測る。--encode でラウドネスを揃えて目標ビットレートに再エンコードした
+ものを build/audio/ に書き出し（Assets/ の元ファイルは書き換えない）、--pack で 1 ファイルの音声パック
+（オフセット索引つき）を書き出す。
+
+音声パックの既定の出力先は、アプリ（AudioPlaybackManager）が読む Assets/Audio/dictation_audio.pack。
+生成物なのでコミットせず、build_ipa.sh がアーカイブの前に --encode --pack で作り直す。パックがあれば
+バンドルからは個別の MP3（Assets/Audio/Dictation）を外す（project.yml の postBuildScripts）。
+
+- 問題に音声がない / 音声に対応する問題がない → [NG]
+- 計測・エンコード結果は元ファイルの SHA-256 と一緒に tools/audio_manifest.json（ローカルのキャッシュ）に残し、
+  中身が変わっていないファイルは ffprobe / ffmpeg を呼ばない。マニフェストがなくても作り直すだけ
+- ffprobe / ffmpeg はプロセスプールで並列に実行する
+- --encode と --pack を一緒に指定すると、パックにはエンコード後の音声を入れる
+
+音声パックのフォーマット（数値はリトルエンディアン）:
+    "DCAU" | version u32 | ヘッダー長 u32 | ヘッダー JSON {"version", "files": {名前: [offset, length]}} | 本体
+
+Usage:
+    python3 tools/build_audio.py
+    python3 tools/build_audio.py --encode
+    python3 tools/build_audio.py --encode --bitrate 48k --workers 8
+    python3 tools/build_audio.py --encode --pack
+    python3 tools/build_audio.py --pack /tmp/dictation_audio.pack
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import struct
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from build_content_pack import CONTENT_DIR, LEVEL_FILES, PROJECT_ROOT, PackError, load_level, option_value
+
+AUDIO_DIR = os.path.join(PROJECT_ROOT, "Assets", "Audio", "Dictation")
+ENCODED_DIR = os.path.join(PROJECT_ROOT, "build", "audio")
+# AudioPlaybackManager の AudioPack が読むパス
+PACK_PATH = os.path.join(PROJECT_ROOT, "Assets", "Audio", "dictation_audio.pack")
+MANIFEST_PATH = os.path.join(PROJECT_ROOT, "tools", "audio_manifest.json")
+
+# エンコード設定（変えると全ファイルが再エンコード対象になる）
+TARGET_BITRATE = "64k"
+TARGET_SAMPLE_RATE = 44100
+TARGET_CHANNELS = 1
+LOUDNORM = "I=-16:TP=-1.5:LRA=11"
+
+# 長さがこの範囲を外れる音声は [WARN]（無音・別の音声の取り違えなど）
+MIN_DURATION = 0.5
+MAX_DURATION = 20.0
+
+WORKERS = os.cpu_count() or 4
+
+AUDIO_PACK_MAGIC = b"DCAU"
+# AudioPlaybackManager の AudioPack.supportedVersion と一致させる（違えばアプリは個別の MP3 を読む）
+AUDIO_PACK_VERSION = 1
+
+LFS_POINTER_PREFIX = b"version https://git-lfs"
+
+
+# ─────────────────────────────────────────────
+# 突き合わせ
+# ─────────────────────────────────────────────
+def expected_audio_files():
+    """問題データから、DictationDataLoader と同じ規則で音声ファイル名を作る"""
+    names = {}
+    for level_file in LEVEL_FILES:
+        level, questions = load_level(os.path.join(CONTENT_DIR, f"{level_file}.json"))
+        for q in questions:
+            names[f"{level}_{q['id']:03d}.mp3"] = f"{level} #{q['id']}"
+    return names
+
+
+def cross_check(expected, on_disk):
+    """(問題はあるのに音声がない, 音声はあるのに問題がない)"""
+    missing = sorted(set(expected) - set(on_disk))
+    orphans = sorted(set(on_disk) - set(expected))
+    return missing, orphans
+
+
+# ─────────────────────────────────────────────
+# 計測・エンコード（ワーカープロセスで実行）
+# ─────────────────────────────────────────────
+def encode_settings(bitrate):
+    return f"{bitrate}/{TARGET_SAMPLE_RATE}/{TARGET_CHANNELS}/loudnorm={LOUDNORM}"
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_lfs_pointer(path):
+    with open(path, "rb") as f:
+        return f.read(len(LFS_POINTER_PREFIX)) == LFS_POINTER_PREFIX
+
+
+def probe(path):
+    """ffprobe で (秒, bps) を測る"""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration,bit_rate", "-of", "json", path],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"ffprobe 終了コード {result.returncode}")
+    fmt = json.loads(result.stdout).get("format", {})
+    return float(fmt.get("duration", 0)), int(fmt.get("bit_rate", 0))
+
+
+def encode(path, output, bitrate):
+    """ラウドネスを揃えて output に再エンコードする（元のファイルはそのまま）"""
+    tmp_path = output + ".tmp.mp3"
+    result = subprocess.run(
+        ["ffmpeg", "-v", "error", "-y", "-i", path,
+         "-af", f"loudnorm={LOUDNORM}",
+         "-ar", str(TARGET_SAMPLE_RATE), "-ac", str(TARGET_CHANNELS),
+         "-b:a", bitrate, "-map_metadata", "-1", tmp_path],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise RuntimeError(result.stderr.strip() or f"ffmpeg 終了コード {result.returncode}")
+    os.replace(tmp_path, output)
+
+
+def _measure(path):
+    duration, bit_rate = probe(path)
+    return {"bytes": os.path.getsize(path), "duration": round(duration, 3), "bitRate": bit_rate}
+
+
+def process_one(job):
+    """job: (元ファイル, 出力先, ビットレート) → マニフェストのエントリ、またはエラー。出力先が None なら計測だけ"""
+    path, output, bitrate = job
+    try:
+        entry = {"sha256": _sha256(path), **_measure(path)}
+        if output:
+            encode(path, output, bitrate)
+            entry["encoded"] = {"settings": encode_settings(bitrate), **_measure(output)}
+    except (OSError, RuntimeError, ValueError) as e:
+        return {"error": str(e)}
+    return entry
+
+
+# ─────────────────────────────────────────────
+# マニフェスト・音声パック
+# ─────────────────────────────────────────────
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(manifest):
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(manifest.items())), f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def write_audio_pack(names, source_dir, output):
+    """source_dir の音声を名前順に連結し、先頭に {名前: [offset, length]} の索引を置く"""
+    files = {}
+    offset = 0
+    for name in names:
+        length = os.path.getsize(os.path.join(source_dir, name))
+        files[name] = [offset, length]
+        offset += length
+    header = json.dumps({"version": AUDIO_PACK_VERSION, "files": files},
+                        separators=(",", ":")).encode("utf-8")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(AUDIO_PACK_MAGIC + struct.pack("<II", AUDIO_PACK_VERSION, len(header)) + header)
+        for name in names:
+            with open(os.path.join(source_dir, name), "rb") as f:
+                shutil.copyfileobj(f, out)
+    os.replace(tmp_path, output)
+    return 12 + len(header) + offset
+
+
+# ─────────────────────────────────────────────
+# メイン
+# ─────────────────────────────────────────────
+def main():
+    bitrate = option_value("--bitrate", TARGET_BITRATE)
+    workers = int(option_value("--workers", WORKERS))
+    do_encode = "--encode" in sys.argv
+    pack_path = option_value("--pack")
+    if "--pack" in sys.argv and (pack_path is None or pack_path.startswith("--")):
+        pack_path = PACK_PATH
+
+    try:
+        expected = expected_audio_files()
+    except (OSError, PackError) as e:
+        print(f"[FAIL] 問題データ: {e}")
+        sys.exit(1)
+    on_disk = sorted(name for name in os.listdir(AUDIO_DIR) if name.endswith(".mp3"))
+    missing, orphans = cross_check(expected, on_disk)
+    for name in missing:
+        print(f"[NG] 音声がない: {name}（{expected[name]}）")
+    for name in orphans:
+        print(f"[NG] 対応する問題がない: {name}")
+
+    pointers = {name for name in on_disk if _is_lfs_pointer(os.path.join(AUDIO_DIR, name))}
+    if pointers:
+        print(f"[NG] Git LFS のポインタのまま: {len(pointers)} 件（git lfs pull で取得する）")
+
+    tools = ["ffmpeg", "ffprobe"] if do_encode else ["ffprobe"]
+    unavailable = [tool for tool in tools if shutil.which(tool) is None]
+    if unavailable and do_encode:
+        print(f"[FAIL] {', '.join(unavailable)} が見つからない")
+        sys.exit(1)
+    if unavailable:
+        print("[WARN] ffprobe が見つからないので、長さ・ビットレートの計測を省く")
+
+    # 中身（SHA-256）が前回と同じで、必要なエンコード出力も残っているファイルは飛ばす
+    readable = set(on_disk) - pointers
+    manifest = {name: entry for name, entry in load_manifest().items() if name in readable}
+    settings = encode_settings(bitrate)
+    if do_encode:
+        os.makedirs(ENCODED_DIR, exist_ok=True)
+    jobs = []
+    skipped = 0
+    for name in on_disk:
+        if name in pointers:
+            continue
+        path = os.path.join(AUDIO_DIR, name)
+        output = os.path.join(ENCODED_DIR, name)
+        entry = manifest.get(name)
+        unchanged = entry is not None and entry["sha256"] == _sha256(path)
+        encoded = unchanged and (entry.get("encoded") or {}).get("settings") == settings \
+            and os.path.exists(output)
+        if unchanged and (not do_encode or encoded):
+            skipped += 1
+            continue
+        jobs.append((name, path, output if do_encode else None))
+
+    errors = 0
+    if jobs and not unavailable:
+        print(f"{'エンコード' if do_encode else '計測'}: {len(jobs)} 件（変更なし {skipped} 件）")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(process_one, [(path, output, bitrate) for _, path, output in jobs],
+                               chunksize=8)
+            for (name, _, _), result in zip(jobs, results):
+                if "error" in result:
+                    print(f"[NG] {name}: {result['error']}")
+                    errors += 1
+                    continue
+                # 計測だけのときは、元ファイルが同じなら前回のエンコード結果を引き継ぐ
+                if not do_encode and manifest.get(name, {}).get("sha256") == result["sha256"]:
+                    result["encoded"] = manifest[name].get("encoded")
+                manifest[name] = result
+        save_manifest(manifest)
+    elif skipped:
+        print(f"変更なし: {skipped} 件")
+
+    measured = [manifest[name] for name in on_disk if name in manifest]
+    for name in on_disk:
+        duration = manifest.get(name, {}).get("duration")
+        if duration is not None and not MIN_DURATION <= duration <= MAX_DURATION:
+            print(f"[WARN] {name}: 長さ {duration:.2f}s（{MIN_DURATION}〜{MAX_DURATION}s の範囲外）")
+    if measured:
+        bit_rates = sorted(entry["bitRate"] for entry in measured)
+        total_bytes = sum(entry["bytes"] for entry in measured)
+        total_seconds = sum(entry["duration"] for entry in measured)
+        print(f"音声 {len(measured)} 件: 合計 {total_seconds / 60:.1f} 分 / {total_bytes / 1e6:.1f} MB"
+              f" / ビットレート 中央値 {bit_rates[len(bit_rates) // 2] // 1000}kbps"
+              f" 最大 {bit_rates[-1] // 1000}kbps")
+
+    if pack_path:
+        if pointers:
+            print("[FAIL] LFS ポインタのままのファイルがあるので、音声パックは作らない")
+            sys.exit(1)
+        if do_encode and errors:
+            print("[FAIL] エンコードに失敗したファイルがあるので、音声パックは作らない")
+            sys.exit(1)
+        source_dir = ENCODED_DIR if do_encode else AUDIO_DIR
+        size = write_audio_pack([name for name in on_disk if name in expected], source_dir, pack_path)
+        print(f"[OK] 音声パック {os.path.relpath(pack_path, PROJECT_ROOT)}: {size:,} bytes"
+              f"（{os.path.relpath(source_dir, PROJECT_ROOT)}）")
+
+    if missing or orphans or pointers or errors:
+        sys.exit(1)
+    print("[OK] 音声と問題データは一致")
+
+
+if __name__ == "__main__":
+    main()
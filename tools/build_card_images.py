@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""カード画像 派生サイズ生成スクリプト
+
+Assets/Cards/card_list.csv とディスク上の画像を突き合わせ、各カードの原寸 JPG から
+サムネイル（コレクション一覧用）と表示用（ガチャ画面用）の縮小版を並列に生成する。
+--atlas でサムネイルを 1 枚に詰めたアトラス画像と、フレーム索引の JSON も書き出す。
+
+- CSV にあるのに画像がない / 画像があるのに CSV にない / 番号・ファイル名の重複 → [NG]
+- 元画像の SHA-256 と生成設定を tools/card_manifest.json に残し、変わったカードだけ作り直す
+- 縮小は Pillow で行う（生成するカードがあるときだけ読み込む）
+
+出力（生成物なのでコミットしない。build_ipa.sh がアーカイブの前に作り直す）:
+    Assets/Cards/thumb/<filename>     サムネイル（CardImageView の .thumbnail）
+    Assets/Cards/display/<filename>   表示用（CardImageView の .display）
+    Assets/Cards/thumb_atlas.jpg / thumb_atlas.json（--atlas のとき）
+
+Usage:
+    python3 tools/build_card_images.py
+    python3 tools/build_card_images.py --atlas
+    python3 tools/build_card_images.py --force --workers 8
+"""
+
+import csv
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from build_content_pack import PROJECT_ROOT, option_value
+
+CARDS_DIR = os.path.join(PROJECT_ROOT, "Assets", "Cards")
+CARD_LIST_PATH = os.path.join(CARDS_DIR, "card_list.csv")
+MANIFEST_PATH = os.path.join(PROJECT_ROOT, "tools", "card_manifest.json")
+
+# 派生サイズ（サブディレクトリ → (幅, JPEG 品質)）。高さは元画像の縦横比（AppConfig.cardAspectRatio）に従う
+VARIANTS = {
+    "thumb": (512, 80),
+    "display": (768, 85),
+}
+
+# アトラス（1 セルの幅、1 行のセル数、JPEG 品質）
+ATLAS_CELL_WIDTH = 128
+ATLAS_COLUMNS = 16
+ATLAS_QUALITY = 80
+ATLAS_IMAGE = "thumb_atlas.jpg"
+ATLAS_INDEX = "thumb_atlas.json"
+
+WORKERS = os.cpu_count() or 4
+
+LFS_POINTER_PREFIX = b"version https://git-lfs"
+
+
+# ─────────────────────────────────────────────
+# 突き合わせ
+# ─────────────────────────────────────────────
+def load_card_list():
+    """card_list.csv → [{no, filename, ...}]（BOM つきでも読めるように utf-8-sig）"""
+    with open(CARD_LIST_PATH, "r", encoding="utf-8-sig", newline="") as f:
+        return [row for row in csv.DictReader(f) if (row.get("no") or "").strip()]
+
+
+def cross_check(cards):
+    """(エラー, 生成対象のファイル名)"""
+    errors = []
+    seen_no = set()
+    seen_filename = set()
+    for row in cards:
+        no, filename = row["no"].strip(), (row.get("filename") or "").strip()
+        if no in seen_no:
+            errors.append(f"番号が重複: {no}")
+        if filename in seen_filename:
+            errors.append(f"ファイル名が重複: {filename}（{no}）")
+        seen_no.add(no)
+        seen_filename.add(filename)
+
+    on_disk = {
+        name for name in os.listdir(CARDS_DIR)
+        if name.lower().endswith((".jpg", ".jpeg", ".png")) and name != ATLAS_IMAGE
+    }
+    for name in sorted(seen_filename - on_disk):
+        errors.append(f"画像がない: {name}")
+    for name in sorted(on_disk - seen_filename):
+        errors.append(f"card_list.csv にない画像: {name}")
+    return errors, sorted(seen_filename & on_disk)
+
+
+# ─────────────────────────────────────────────
+# 生成（ワーカープロセスで実行）
+# ─────────────────────────────────────────────
+def variant_settings():
+    """設定が変わったら全カードを作り直すためのキー"""
+    return ";".join(f"{name}={width}@{quality}" for name, (width, quality) in sorted(VARIANTS.items()))
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_lfs_pointer(path):
+    with open(path, "rb") as f:
+        return f.read(len(LFS_POINTER_PREFIX)) == LFS_POINTER_PREFIX
+
+
+def _save_jpeg(image, path, quality):
+    tmp_path = path + ".tmp"
+    image.save(tmp_path, "JPEG", quality=quality, optimize=True)
+    os.replace(tmp_path, path)
+
+
+def build_variants(filename):
+    """1 枚分の派生サイズを書き出す → {"size": [w, h]} またはエラー"""
+    from PIL import Image
+
+    try:
+        with Image.open(os.path.join(CARDS_DIR, filename)) as source:
+            source = source.convert("RGB")
+            for name, (width, quality) in VARIANTS.items():
+                os.makedirs(os.path.join(CARDS_DIR, name), exist_ok=True)
+                # 拡大はしない
+                scale = min(1.0, width / source.width)
+                size = (round(source.width * scale), round(source.height * scale))
+                _save_jpeg(source.resize(size, Image.LANCZOS),
+                           os.path.join(CARDS_DIR, name, filename), quality)
+            return {"size": [source.width, source.height]}
+    except OSError as e:
+        return {"error": str(e)}
+
+
+def build_atlas(filenames):
+    """サムネイルを行優先で詰め、フレーム索引 {filename: [x, y, w, h]} と一緒に書き出す"""
+    from PIL import Image
+
+    cells = []
+    for filename in filenames:
+        with Image.open(os.path.join(CARDS_DIR, "thumb", filename)) as thumb:
+            scale = ATLAS_CELL_WIDTH / thumb.width
+            cells.append((filename, thumb.convert("RGB").resize(
+                (ATLAS_CELL_WIDTH, round(thumb.height * scale)), Image.LANCZOS)))
+    cell_height = max(image.height for _, image in cells)
+    rows = (len(cells) + ATLAS_COLUMNS - 1) // ATLAS_COLUMNS
+    atlas = Image.new("RGB", (ATLAS_CELL_WIDTH * min(len(cells), ATLAS_COLUMNS), cell_height * rows))
+    frames = {}
+    for i, (filename, image) in enumerate(cells):
+        x, y = (i % ATLAS_COLUMNS) * ATLAS_CELL_WIDTH, (i // ATLAS_COLUMNS) * cell_height
+        atlas.paste(image, (x, y))
+        frames[filename] = [x, y, image.width, image.height]
+
+    _save_jpeg(atlas, os.path.join(CARDS_DIR, ATLAS_IMAGE), ATLAS_QUALITY)
+    index_path = os.path.join(CARDS_DIR, ATLAS_INDEX)
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"image": ATLAS_IMAGE, "size": list(atlas.size), "frames": frames},
+                  f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(index_path + ".tmp", index_path)
+    return atlas.size
+
+
+# ─────────────────────────────────────────────
+# マニフェスト
+# ─────────────────────────────────────────────
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(manifest):
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(manifest.items())), f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def _outputs_exist(filename):
+    return all(os.path.exists(os.path.join(CARDS_DIR, name, filename)) for name in VARIANTS)
+
+
+# ─────────────────────────────────────────────
+# メイン
+# ─────────────────────────────────────────────
+def main():
+    workers = int(option_value("--workers", WORKERS))
+    force = "--force" in sys.argv
+    with_atlas = "--atlas" in sys.argv
+
+    try:
+        cards = load_card_list()
+    except OSError as e:
+        print(f"[FAIL] card_list.csv: {e}")
+        sys.exit(1)
+    errors, filenames = cross_check(cards)
+    for error in errors:
+        print(f"[NG] {error}")
+
+    pointers = {name for name in filenames if _is_lfs_pointer(os.path.join(CARDS_DIR, name))}
+    if pointers:
+        print(f"[NG] Git LFS のポインタのまま: {len(pointers)} 件（git lfs pull で取得する）")
+
+    # 元画像と設定が前回と同じで、出力も残っているカードは飛ばす
+    settings = variant_settings()
+    readable = [name for name in filenames if name not in pointers]
+    readable_set = set(readable)
+    manifest = {name: entry for name, entry in load_manifest().items() if name in readable_set}
+    hashes = {name: _sha256(os.path.join(CARDS_DIR, name)) for name in readable}
+    stale = [
+        name for name in readable
+        if force
+        or manifest.get(name, {}).get("sha256") != hashes[name]
+        or manifest.get(name, {}).get("settings") != settings
+        or not _outputs_exist(name)
+    ]
+    print(f"カード {len(cards)} 枚: 生成 {len(stale)} 枚（変更なし {len(readable) - len(stale)} 枚）")
+
+    failed = 0
+    if stale:
+        if importlib.util.find_spec("PIL") is None:
+            print("[FAIL] 縮小には Pillow が必要（pip install Pillow）")
+            sys.exit(1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for name, result in zip(stale, pool.map(build_variants, stale, chunksize=4)):
+                if "error" in result:
+                    print(f"[NG] {name}: {result['error']}")
+                    failed += 1
+                    continue
+                manifest[name] = {"sha256": hashes[name], "settings": settings, "size": result["size"]}
+        save_manifest(manifest)
+
+    if with_atlas:
+        if pointers or failed or not readable:
+            print("[FAIL] サムネイルが揃っていないので、アトラスは作らない")
+            sys.exit(1)
+        width, height = build_atlas(readable)
+        print(f"[OK] アトラス {ATLAS_IMAGE}: {width}x{height}（{len(readable)} 枚）")
+
+    if errors or pointers or failed:
+        sys.exit(1)
+    print("[OK] カード画像と card_list.csv は一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""問題データ コンテンツパック生成スクリプト
+
+Assets/Dictation/level*.json（編集用の元データ）から、アプリが読み込む
+1 ファイルのコンテンツパック（Assets/Dictation/dictation.pack）を生成する。
+
+- アプリが読まないフィールド（source・問題ごとの level・total）は落とす
+- pattern / explanation のうち 2 回以上出てくる文字列は文字列テーブルに集約し、番号で参照する
+- レベル × セットごとのオフセット索引を先頭に置き、セット単位で遅延デコードできるようにする
+
+フォーマット（数値はリトルエンディアン）:
+    "DCPK" | version u32 | ヘッダー長 u32 | ヘッダー JSON | 本体
+    ヘッダー: {"version", "questionsPerSet", "strings": [...],
+               "levels": [{"level", "count", "sets": [[setIndex, offset, length, count], ...]}]}
+    本体: セットごとの JSON 配列。offset は本体先頭からのバイト位置
+    問題: [id, question_text, answer_text, blanks, japanese, pattern, explanation]
+          pattern / explanation は文字列テーブルの番号、または（1 回しか出てこなければ）文字列そのもの
+
+Usage:
+    python3 tools/build_content_pack.py
+    python3 tools/build_content_pack.py --check
+    python3 tools/build_content_pack.py --output /tmp/dictation.pack
+"""
+
+import json
+import os
+import struct
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONTENT_DIR = os.path.join(PROJECT_ROOT, "Assets", "Dictation")
+PACK_PATH = os.path.join(CONTENT_DIR, "dictation.pack")
+
+# AppConfig.levelFiles と同じ順序
+LEVEL_FILES = ["level1", "level2", "level3"]
+
+# AppConstants.questionsPerSet と一致させる（アプリ側で照合し、違えば元 JSON にフォールバック）
+QUESTIONS_PER_SET = 5
+
+PACK_MAGIC = b"DCPK"
+PACK_VERSION = 1
+
+# 文字列テーブルに集約するフィールド
+INTERNED_FIELDS = ("pattern", "explanation")
+REQUIRED_FIELDS = ("id", "question_text", "answer_text", "blanks", "japanese") + INTERNED_FIELDS
+
+
+class PackError(ValueError):
+    """元データがパックにできない（フィールド欠落・ID 重複など）"""
+
+
+# ─────────────────────────────────────────────
+# 元データの読み込み
+# ─────────────────────────────────────────────
+def load_level(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    level = data.get("level")
+    if not level:
+        raise PackError(f"{os.path.basename(path)}: level がない")
+
+    seen = set()
+    for q in data.get("questions", []):
+        missing = [k for k in REQUIRED_FIELDS if k not in q]
+        if missing:
+            raise PackError(f"{level} #{q.get('id')}: フィールドがない: {', '.join(missing)}")
+        if not isinstance(q["id"], int) or q["id"] < 1:
+            raise PackError(f"{level}: id が正の整数でない: {q['id']!r}")
+        if q["id"] in seen:
+            raise PackError(f"{level}: id が重複: {q['id']}")
+        seen.add(q["id"])
+    return level, sorted(data.get("questions", []), key=lambda q: q["id"])
+
+
+# ─────────────────────────────────────────────
+# パック生成
+# ─────────────────────────────────────────────
+class StringTable:
+    """繰り返し出てくる文字列に出現順で番号を振る（同じ入力なら同じパックになるように）
+
+    1 回しか出てこない文字列はテーブルに入れず、そのまま返す（索引を小さく保つため）
+    """
+
+    def __init__(self, levels):
+        self.strings = []
+        self.index = {}
+        self.counts = {}
+        for _, questions in levels:
+            for q in questions:
+                for field in INTERNED_FIELDS:
+                    self.counts[q[field]] = self.counts.get(q[field], 0) + 1
+
+    def intern(self, value):
+        if self.counts.get(value, 0) < 2:
+            return value
+        if value not in self.index:
+            self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return self.index[value]
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def build_pack(levels):
+    """levels: [(level, questions)] → パックのバイト列と統計"""
+    strings = StringTable(levels)
+    body = bytearray()
+    index = []
+    for level, questions in levels:
+        sets = {}
+        for q in questions:
+            sets.setdefault((q["id"] - 1) // QUESTIONS_PER_SET + 1, []).append([
+                q["id"],
+                q["question_text"],
+                q["answer_text"],
+                q["blanks"],
+                q["japanese"],
+                strings.intern(q["pattern"]),
+                strings.intern(q["explanation"]),
+            ])
+        entries = []
+        for set_index in sorted(sets):
+            chunk = _dumps(sets[set_index]).encode("utf-8")
+            entries.append([set_index, len(body), len(chunk), len(sets[set_index])])
+            body += chunk
+        index.append({"level": level, "count": len(questions), "sets": entries})
+
+    header = _dumps({
+        "version": PACK_VERSION,
+        "questionsPerSet": QUESTIONS_PER_SET,
+        "strings": strings.strings,
+        "levels": index,
+    }).encode("utf-8")
+    pack = PACK_MAGIC + struct.pack("<II", PACK_VERSION, len(header)) + header + bytes(body)
+    stats = {
+        "questions": sum(entry["count"] for entry in index),
+        "sets": sum(len(entry["sets"]) for entry in index),
+        "strings": len(strings.strings),
+        "header": len(header),
+    }
+    return pack, stats
+
+
+def read_pack(pack):
+    """パックを元の問題リストに戻す（検証用。アプリの読み込みと同じ手順）"""
+    if pack[:4] != PACK_MAGIC:
+        raise PackError("マジックが一致しない")
+    version, header_length = struct.unpack_from("<II", pack, 4)
+    if version != PACK_VERSION:
+        raise PackError(f"未対応のバージョン: {version}")
+    header = json.loads(pack[12:12 + header_length])
+    body = pack[12 + header_length:]
+    strings = header["strings"]
+
+    def resolve(value):
+        return strings[value] if isinstance(value, int) else value
+
+    levels = []
+    for entry in header["levels"]:
+        questions = []
+        for _, offset, length, _ in entry["sets"]:
+            for qid, question, answer, blanks, japanese, pattern, explanation in \
+                    json.loads(body[offset:offset + length]):
+                questions.append({
+                    "id": qid,
+                    "question_text": question,
+                    "answer_text": answer,
+                    "blanks": blanks,
+                    "japanese": japanese,
+                    "pattern": resolve(pattern),
+                    "explanation": resolve(explanation),
+                })
+        levels.append((entry["level"], questions))
+    return levels
+
+
+def verify_pack(pack, levels):
+    """パックから戻した内容が、元データのうちアプリが読むフィールドと一致するか"""
+    expected = [(level, [{k: q[k] for k in REQUIRED_FIELDS} for q in questions])
+                for level, questions in levels]
+    if read_pack(pack) != expected:
+        raise PackError("パックを読み戻した内容が元データと一致しない")
+
+
+# ─────────────────────────────────────────────
+# メイン
+# ─────────────────────────────────────────────
+def option_value(name, default=None):
+    """`--name VALUE` 形式のオプション値を返す"""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+def main():
+    output = option_value("--output", PACK_PATH)
+    check_only = "--check" in sys.argv
+
+    try:
+        levels = [load_level(os.path.join(CONTENT_DIR, f"{name}.json")) for name in LEVEL_FILES]
+        pack, stats = build_pack(levels)
+        verify_pack(pack, levels)
+    except (OSError, PackError) as e:
+        print(f"[FAIL] {e}")
+        sys.exit(1)
+
+    source_bytes = sum(os.path.getsize(os.path.join(CONTENT_DIR, f"{name}.json")) for name in LEVEL_FILES)
+    print(f"問題 {stats['questions']} / セット {stats['sets']} / 文字列テーブル {stats['strings']} 件")
+    print(f"元 JSON {source_bytes:,} bytes → パック {len(pack):,} bytes"
+          f"（索引 {stats['header']:,} bytes）")
+
+    if check_only:
+        try:
+            with open(output, "rb") as f:
+                current = f.read()
+        except FileNotFoundError:
+            current = None
+        if current != pack:
+            print(f"[NG] {os.path.relpath(output, PROJECT_ROOT)} が古い。"
+                  f"python3 tools/build_content_pack.py で作り直す")
+            sys.exit(1)
+        print(f"[OK] {os.path.relpath(output, PROJECT_ROOT)} は最新")
+        return
+
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(pack)
+    os.replace(tmp_path, output)
+    print(f"[OK] {os.path.relpath(output, PROJECT_ROOT)} を書き出した")
+
+
+if __name__ == "__main__":
+    main()
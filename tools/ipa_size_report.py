@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""IPA サイズレポート
+
+IPA（zip）・ビルド済みの .app・または Assets/ を走査して、ファイルごとのサイズを
+カテゴリ（音声・カード・問題データ・効果音・バイナリ・その他）に振り分けて集計する。
+
+- 圧縮後サイズ（IPA なら zip 内の実サイズ、ディレクトリなら zlib で見積もり）をダウンロードサイズの目安にする
+- tools/size_baseline.json（--update-baseline で更新）と比べ、カテゴリ・ファイル単位で増減を出す
+- SIZE_BUDGETS を超えたカテゴリがあれば [NG] で終了コード 1
+- --record で tools/size_history.jsonl に 1 行追記（バージョンごとの推移をグラフにする用）
+
+Usage:
+    python3 tools/ipa_size_report.py build/output/ipa/Dictation.ipa
+    python3 tools/ipa_size_report.py build/output/ipa/Dictation.ipa --record
+    python3 tools/ipa_size_report.py --app build/Build/Products/Release-iphoneos/Dictation.app
+    python3 tools/ipa_size_report.py                      # Assets/ だけ（ビルド前の見積もり）
+    python3 tools/ipa_size_report.py Dictation.ipa --update-baseline --top 20
+"""
+
+import json
+import os
+import plistlib
+import sys
+import time
+import zipfile
+import zlib
+
+from build_content_pack import PROJECT_ROOT, option_value
+
+ASSETS_DIR = os.path.join(PROJECT_ROOT, "Assets")
+BASELINE_PATH = os.path.join(PROJECT_ROOT, "tools", "size_baseline.json")
+HISTORY_PATH = os.path.join(PROJECT_ROOT, "tools", "size_history.jsonl")
+
+APP_NAME = "Dictation"
+
+# カテゴリ判定（.app 直下からの相対パスの先頭一致。上から順に見る）
+CATEGORY_RULES = [
+    ("audio", ("Assets/Audio/",)),
+    ("cards", ("Assets/Cards/",)),
+    ("levels", ("Assets/Dictation/",)),
+    ("sounds", ("Assets/Sounds/",)),
+    ("binary", (APP_NAME, "Frameworks/", "PlugIns/")),
+]
+CATEGORY_LABELS = {
+    "audio": "音声",
+    "cards": "カード",
+    "levels": "問題データ",
+    "sounds": "効果音",
+    "binary": "バイナリ",
+    "other": "その他",
+    "total": "合計",
+}
+
+# 圧縮後サイズの上限（bytes）。超えたら [NG]
+SIZE_BUDGETS = {
+    "audio": 40 * 1024 * 1024,
+    "cards": 40 * 1024 * 1024,
+    "levels": 2 * 1024 * 1024,
+    "sounds": 2 * 1024 * 1024,
+    "binary": 20 * 1024 * 1024,
+    "total": 150 * 1024 * 1024,
+}
+
+# ベースラインからの増減をファイル単位で出す件数
+TOP_FILES = 10
+
+
+# ─────────────────────────────────────────────
+# 走査
+# ─────────────────────────────────────────────
+def categorize(path):
+    for category, prefixes in CATEGORY_RULES:
+        for prefix in prefixes:
+            if path == prefix or (prefix.endswith("/") and path.startswith(prefix)):
+                return category
+    return "other"
+
+
+def scan_ipa(ipa_path):
+    """IPA → ({.app からの相対パス: (サイズ, 圧縮後サイズ)}, Info.plist)"""
+    entries = {}
+    info = {}
+    with zipfile.ZipFile(ipa_path) as ipa:
+        for item in ipa.infolist():
+            parts = item.filename.split("/")
+            if item.is_dir() or len(parts) < 3 or parts[0] != "Payload" or not parts[1].endswith(".app"):
+                continue
+            path = "/".join(parts[2:])
+            entries[path] = (item.file_size, item.compress_size)
+            if path == "Info.plist":
+                info = plistlib.loads(ipa.read(item))
+    return entries, info
+
+
+def scan_dir(root, prefix=""):
+    """ディレクトリ → {prefix + 相対パス: (サイズ, zlib での圧縮後サイズの見積もり)}"""
+    entries = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            full = os.path.join(dirpath, filename)
+            if os.path.islink(full):
+                continue
+            with open(full, "rb") as f:
+                data = f.read()
+            relative = os.path.relpath(full, root).replace(os.sep, "/")
+            entries[prefix + relative] = (len(data), min(len(data), len(zlib.compress(data, 6))))
+    return entries
+
+
+def scan_app(app_path):
+    info_path = os.path.join(app_path, "Info.plist")
+    info = {}
+    if os.path.exists(info_path):
+        with open(info_path, "rb") as f:
+            info = plistlib.load(f)
+    return scan_dir(app_path), info
+
+
+def summarize(entries):
+    """{カテゴリ: {"files", "bytes", "compressed"}}（"total" つき）"""
+    summary = {category: {"files": 0, "bytes": 0, "compressed": 0} for category in CATEGORY_LABELS}
+    for path, (size, compressed) in entries.items():
+        for category in (categorize(path), "total"):
+            summary[category]["files"] += 1
+            summary[category]["bytes"] += size
+            summary[category]["compressed"] += compressed
+    return summary
+
+
+# ─────────────────────────────────────────────
+# 表示
+# ─────────────────────────────────────────────
+def human(size):
+    sign = "-" if size < 0 else ""
+    size = abs(size)
+    for unit in ("B", "KB", "MB"):
+        if size < 1024 or unit == "MB":
+            return f"{sign}{size:.0f}{unit}" if unit == "B" else f"{sign}{size:.1f}{unit}"
+        size /= 1024
+
+
+def _display_width(text):
+    return sum(2 if ord(c) > 0x7F else 1 for c in text)
+
+
+def pad(text, width):
+    """全角文字を 2 桁として左寄せ"""
+    return text + " " * max(0, width - _display_width(text))
+
+
+def rpad(text, width):
+    """全角文字を 2 桁として右寄せ"""
+    return " " * max(0, width - _display_width(text)) + text
+
+
+def print_summary(summary, baseline):
+    base = (baseline or {}).get("summary", {})
+    print(f"  {pad('カテゴリ', 12)} {rpad('ファイル', 8)} {rpad('サイズ', 10)} {rpad('圧縮後', 10)}"
+          f" {rpad('増減', 10)} {rpad('上限', 10)}")
+    for category, label in CATEGORY_LABELS.items():
+        row = summary[category]
+        if not row["files"] and category != "total":
+            continue
+        delta = row["compressed"] - base[category]["compressed"] if category in base else None
+        budget = SIZE_BUDGETS.get(category)
+        print(f"  {pad(label, 12)} {row['files']:>8} {human(row['bytes']):>10} {human(row['compressed']):>10}"
+              f" {human(delta) if delta is not None else '-':>10} {human(budget) if budget else '-':>10}")
+
+
+def print_file_changes(entries, baseline, top):
+    """ベースラインから増えた（または新しく入った）ファイルの上位"""
+    base_files = (baseline or {}).get("files", {})
+    changes = []
+    for path, (_, compressed) in entries.items():
+        delta = compressed - base_files.get(path, 0)
+        if delta > 0:
+            changes.append((delta, path, path not in base_files))
+    removed = sum(size for path, size in base_files.items() if path not in entries)
+    if not changes and not removed:
+        return
+    print(f"\n  ベースラインから増えたファイル（上位 {top} 件）")
+    for delta, path, added in sorted(changes, reverse=True)[:top]:
+        print(f"    +{human(delta):>9}  {path}{'（新規）' if added else ''}")
+    if removed:
+        print(f"    -{human(removed):>9}  削除されたファイルの合計")
+
+
+def print_largest(entries, top):
+    print(f"\n  大きいファイル（上位 {top} 件、圧縮後）")
+    for path, (_, compressed) in sorted(entries.items(), key=lambda item: -item[1][1])[:top]:
+        print(f"    {human(compressed):>10}  {path}")
+
+
+# ─────────────────────────────────────────────
+# ベースライン・履歴
+# ─────────────────────────────────────────────
+def load_baseline():
+    try:
+        with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(source, version, summary, entries):
+    tmp_path = BASELINE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "source": source,
+            "version": version,
+            "summary": summary,
+            "files": {path: compressed for path, (_, compressed) in sorted(entries.items())},
+        }, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    os.replace(tmp_path, BASELINE_PATH)
+
+
+def append_history(source, version, summary):
+    record = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "source": source,
+        "version": version,
+        "categories": {category: row["compressed"] for category, row in summary.items()},
+        "bytes": summary["total"]["bytes"],
+    }
+    with open(HISTORY_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+# ─────────────────────────────────────────────
+# メイン
+# ─────────────────────────────────────────────
+def main():
+    app_path = option_value("--app")
+    top = int(option_value("--top", TOP_FILES))
+    positional = [arg for i, arg in enumerate(sys.argv[1:], 1)
+                  if not arg.startswith("--") and sys.argv[i - 1] not in ("--app", "--top")]
+
+    try:
+        if positional:
+            source = "ipa"
+            entries, info = scan_ipa(positional[0])
+        elif app_path:
+            source = "app"
+            entries, info = scan_app(app_path)
+        else:
+            source = "assets"
+            entries, info = scan_dir(ASSETS_DIR, prefix="Assets/"), {}
+    except (OSError, zipfile.BadZipFile) as e:
+        print(f"[FAIL] {e}")
+        sys.exit(1)
+    if not entries:
+        print("[FAIL] ファイルが見つからない")
+        sys.exit(1)
+
+    version = None
+    if info:
+        version = f"{info.get('CFBundleShortVersionString', '?')} ({info.get('CFBundleVersion', '?')})"
+
+    summary = summarize(entries)
+    baseline = load_baseline()
+    if baseline and baseline.get("source") != source:
+        print(f"[WARN] ベースラインは {baseline.get('source')} から作ったもの（今回は {source}）。増減は参考値")
+
+    print(f"=== サイズレポート: {source}{f' {version}' if version else ''} ===")
+    if baseline:
+        print(f"  ベースライン: {baseline.get('version') or baseline.get('source')}")
+    print_summary(summary, baseline)
+    if baseline:
+        print_file_changes(entries, baseline, top)
+    print_largest(entries, top)
+
+    if "--record" in sys.argv:
+        append_history(source, version, summary)
+        print(f"\n履歴に追記: {os.path.relpath(HISTORY_PATH, PROJECT_ROOT)}")
+    if "--update-baseline" in sys.argv:
+        save_baseline(source, version, summary, entries)
+        print(f"ベースラインを更新: {os.path.relpath(BASELINE_PATH, PROJECT_ROOT)}")
+
+    over = [
+        (category, summary[category]["compressed"], budget)
+        for category, budget in SIZE_BUDGETS.items()
+        if summary[category]["compressed"] > budget
+    ]
+    print()
+    for category, size, budget in over:
+        print(f"[NG] {CATEGORY_LABELS[category]}: {human(size)}（上限 {human(budget)}）")
+    if over:
+        sys.exit(1)
+    print("[OK] すべてのカテゴリが上限内")
+
+
+if __name__ == "__main__":
+    main()